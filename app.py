@@ -2,19 +2,38 @@ import os
 import json
 import logging
 import secrets
-import subprocess
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_from_directory, send_file
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_file
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 import atexit
+import copy
+from contextlib import contextmanager
 
-from stats import get_user_stats, update_user_stats, get_match_stats_html
+from stats import (get_user_stats, update_user, reset_user, load_stories, save_stories,
+                   get_user_record, get_recent_matchdays, get_cycle_ledger, get_user_totals, load_user_records)
 from market import MarketManager, assign_market_farmers_to_roles, run_market_matchday
 from trading import TradingManager
 from chat import ChatManager
+from core import load_leagues, update_leagues
+from request_cache import cached_load, invalidates
+import request_cache
+import db
+import file_cache
+import storage
+import leader
+import narrative
+import streams
+from tasks import TABLE_STATS, TASK_CATALOGUE, task_distribution, best_role
+from matchday import (get_league_matchday, start_league_clock, due_leagues, run_leagues_matchday, run_league_matchday,
+                      create_brackets, record_playoff_results, league_is_active, MATCHDAY_INTERVAL)
+from projection import get_projection, refresh_projection
+from matchup_odds import current_cycle_odds
+from leaderboard import LEADERBOARD_PAGE_SIZE, LEADERBOARD_SIZE, board_page, global_board, league_board
+from farmer_index import farmer_summaries, farmer_summary
+from match_stats import match_stats_html
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -47,6 +66,14 @@ def nl2br_filter(text):
 def inject_user_profile():
     return dict(get_user_profile=get_user_profile)
 
+@app.after_request
+def log_store_loads(response):
+    """Report how many store loads the request cache saved"""
+    loads, avoided = request_cache.report()
+    if loads or avoided:
+        logging.debug(f"{request.method} {request.path}: {loads} store load(s), {avoided} avoided by the request cache")
+    return response
+
 # Initialize managers
 market_manager = MarketManager()
 trading_manager = TradingManager()
@@ -55,21 +82,18 @@ chat_manager = ChatManager()
 # Load farmer pool
 def load_farmer_pool(league_code=None):
     """Load farmer pool, optionally league-specific"""
-    if league_code:
+    if league_code and db.enabled():
+        pool = db.load_farmer_pool(league_code)
+        if pool is not None:
+            return pool
+    elif league_code:
         # Try to load league-specific farmer pool first
-        league_pool_file = f"farmer_pool_{league_code}.json"
-        try:
-            with open(league_pool_file, "r") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            pass  # Fall back to default pool
+        league_pool = file_cache.load_json(f"farmer_pool_{league_code}.json")
+        if league_pool is not None:
+            return league_pool
 
-    # Load default farmer pool
-    try:
-        with open("farmer_pool.json", "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+    # Fall back to the default farmer pool
+    return file_cache.load_json("farmer_pool.json", [])
 
 def load_farmer_pool_with_prev_stats(league_code):
     """Load farmer pool and attach previous season stats if available"""
@@ -77,17 +101,15 @@ def load_farmer_pool_with_prev_stats(league_code):
     farmers = load_farmer_pool(league_code)
 
     # Try to load previous season stats for this league
-    prev_stats_file = f"previous_szn_stats_{league_code}.json"
-    prev_stats = {}
-
-    try:
-        with open(prev_stats_file, "r") as f:
-            prev_stats = json.load(f)
-    except FileNotFoundError:
-        pass
+    if db.enabled():
+        prev_stats = db.load_previous_season_stats(league_code) or {}
+    else:
+        prev_stats = file_cache.load_json(f"previous_szn_stats_{league_code}.json", {})
 
-    # Attach previous season stats to each farmer
+    # Attach previous season stats to a copy of each farmer (the pool is shared)
+    farmers_with_stats = []
     for farmer in farmers:
+        farmer = dict(farmer)
         farmer_name = farmer["name"]
         if farmer_name in prev_stats:
             stats = prev_stats[farmer_name]
@@ -99,23 +121,40 @@ def load_farmer_pool_with_prev_stats(league_code):
             }
         else:
             farmer["prev_season_stats"] = None
+        farmers_with_stats.append(farmer)
 
-    return farmers
+    return farmers_with_stats
 
 FARMER_POOL = load_farmer_pool()  # Default pool for general use
 
 # User management
 USERS_FILE = "users.json"
 
+@cached_load("users")
 def load_users():
-    if not os.path.exists(USERS_FILE):
-        return {}
-    with open(USERS_FILE, "r") as f:
-        return json.load(f)
+    if db.enabled():
+        return db.load_users()
+    return file_cache.load_json(USERS_FILE, {})
 
+@invalidates("users")
 def save_users(users):
-    with open(USERS_FILE, "w") as f:
-        json.dump(users, f, indent=4)
+    if db.enabled():
+        return db.save_users(users)
+    storage.write_json(USERS_FILE, users)
+    file_cache.invalidate(USERS_FILE)
+
+@contextmanager
+def update_users():
+    """Load, modify and save the users under one lock; yields the users dict"""
+    if db.enabled():
+        users = db.load_users()
+        yield users
+        db.save_users(users)
+    else:
+        with storage.transaction(USERS_FILE, {}) as users:
+            yield users
+        file_cache.invalidate(USERS_FILE)
+    request_cache.invalidate("users")
 
 def get_user_profile(username):
     """Get user profile information including team name, profile picture, and team chant"""
@@ -129,35 +168,22 @@ def get_user_profile(username):
 
 def update_user_profile(username, team_name=None, profile_pic=None, team_chant=None):
     """Update user profile information"""
-    users = load_users()
-    if username not in users:
+    if username not in load_users():
         return False
 
-    if team_name is not None:
-        users[username]["team_name"] = team_name
-    if profile_pic is not None:
-        users[username]["profile_pic"] = profile_pic
-    if team_chant is not None:
-        users[username]["team_chant"] = team_chant
-
-    save_users(users)
+    with update_users() as users:
+        if team_name is not None:
+            users[username]["team_name"] = team_name
+        if profile_pic is not None:
+            users[username]["profile_pic"] = profile_pic
+        if team_chant is not None:
+            users[username]["team_chant"] = team_chant
     return True
 
 # League management
-LEAGUES_FILE = "leagues.json"
-
-def load_leagues():
-    if not os.path.exists(LEAGUES_FILE):
-        return {}
-    with open(LEAGUES_FILE, "r") as f:
-        return json.load(f)
-
-def save_leagues(leagues):
-    with open(LEAGUES_FILE, "w") as f:
-        json.dump(leagues, f, indent=4)
-
-def get_user_league(username):
-    leagues = load_leagues()
+def get_user_league(username, leagues=None):
+    if leagues is None:
+        leagues = load_leagues()
     for code, league in leagues.items():
         if username in league["players"]:
             return league
@@ -169,8 +195,7 @@ def initialize_league_market(league_code):
     market_file = f"market_{league_code}.json"
     if not os.path.exists(market_file):
         # Create an empty market file for the league
-        with open(market_file, "w") as f:
-            json.dump([], f)
+        storage.write_json(market_file, [], indent=None)
 
 def get_league_market_data(league_code):
     """Load market data for a specific league."""
@@ -183,9 +208,7 @@ def get_league_market_data(league_code):
 
 def save_league_market_data(league_code, data):
     """Save market data for a specific league."""
-    market_file = f"market_{league_code}.json"
-    with open(market_file, "w") as f:
-        json.dump(data, f, indent=4)
+    storage.write_json(f"market_{league_code}.json", data)
 
 def reset_league_market(league_code):
     """Reset the market for a specific league (empty the file)."""
@@ -194,10 +217,11 @@ def reset_league_market(league_code):
         os.remove(market_file)
         logging.info(f"Market reset for league {league_code}")
 
-# Scheduler for automated matchdays
+# Scheduler for automated matchdays; every worker runs one, the lease holder does the work
 scheduler = BackgroundScheduler()
 scheduler.start()
 atexit.register(lambda: scheduler.shutdown())
+atexit.register(leader.release)
 
 def get_current_matchup(username, league):
     """Get the current opponent for a user in a playoff league"""
@@ -208,11 +232,11 @@ def get_current_matchup(username, league):
     if len(players) < 2:
         return None
 
-    # Use global matchday to determine which 3-game cycle we're in
-    global_matchday = get_global_matchday()
+    # Use the league's matchday to determine which 3-game cycle we're in
+    league_matchday = get_league_matchday(league)
 
     # Each matchup lasts 3 matchdays
-    cycle = global_matchday // 3
+    cycle = league_matchday // 3
 
     if username not in players:
         return None
@@ -221,7 +245,7 @@ def get_current_matchup(username, league):
     bracket_creation_point = matchdays_limit // 2
 
     # Check if we're in the bracket phase
-    if global_matchday >= bracket_creation_point and league.get("brackets_created", False):
+    if league_matchday >= bracket_creation_point and league.get("brackets_created", False):
         # Use bracket schedules
         brackets = league.get("playoff_brackets", {})
         bracket_schedules = league.get("bracket_schedules", {})
@@ -244,11 +268,12 @@ def get_current_matchup(username, league):
         # Use regular pre-bracket schedule
         # Get or initialize matchup schedule for this league
         if "matchup_schedule" not in league:
-            league["matchup_schedule"] = generate_matchup_schedule(league)
-            # Save the updated league data
-            leagues = load_leagues()
-            leagues[league["code"]] = league
-            save_leagues(leagues)
+            # Save the schedule unless another request stored one first
+            with update_leagues() as leagues:
+                stored = leagues.get(league["code"], league)
+                if "matchup_schedule" not in stored:
+                    stored["matchup_schedule"] = generate_matchup_schedule(stored)
+                league["matchup_schedule"] = stored["matchup_schedule"]
 
         # Find the opponent for this user and cycle
         schedule = league["matchup_schedule"]
@@ -279,9 +304,6 @@ def generate_matchup_schedule(league):
         return schedule
 
     # Create round-robin rotation
-    import random
-    random.seed(hash(league["code"]))  # Consistent seeding based on league
-
     # If odd number of players, one player gets a bye each cycle
     has_bye = len(players) % 2 == 1
 
@@ -327,11 +349,8 @@ def get_matchup_progress(username, league):
     if not league.get("use_playoffs", True):
         return None
 
-    # Use global matchday to determine progress
-    global_matchday = get_global_matchday()
-
-    # Determine progress in current 3-game cycle
-    games_in_cycle = global_matchday % 3
+    # Use the league's matchday to determine progress
+    games_in_cycle = get_league_matchday(league) % 3
     return {
         "games_played": games_in_cycle,
         "games_remaining": 3 - games_in_cycle if games_in_cycle > 0 else 3
@@ -339,249 +358,17 @@ def get_matchup_progress(username, league):
 
 def create_playoff_brackets(league_code):
     """Create playoff brackets after half the matchdays are completed"""
-    leagues = load_leagues()
-    if league_code not in leagues:
-        return
-
-    league = leagues[league_code]
-    if not league.get("use_playoffs", True):
-        return
-
-    players = league.get("players", [])
-    matchdays_limit = league.get("matchdays", 30)
-    global_matchday = get_global_matchday()
-
-    # Create brackets after half the season
-    bracket_creation_point = matchdays_limit // 2
-
-    if global_matchday >= bracket_creation_point and not league.get("brackets_created", False):
-        playoff_records = league.get("playoff_records", {})
-
-        # Sort players by wins (descending), then by total points as tiebreaker
-        def get_total_points(username):
-            user_data = get_user_stats(username)
-            total_points = sum(
-                sum(farmer["points_after_catastrophe"] for farmer in day["farmers"])
-                for day in user_data.get("data", [])
-            )
-            return total_points
-
-        sorted_players = sorted(players, key=lambda p: (
-            playoff_records.get(p, {"wins": 0})["wins"],
-            get_total_points(p)
-        ), reverse=True)
-
-        # Split into brackets
-        mid_point = len(sorted_players) // 2
-        winners_bracket = sorted_players[:mid_point]
-        losers_bracket = sorted_players[mid_point:]
-
-        league["playoff_brackets"] = {
-            "winners": winners_bracket,
-            "losers": losers_bracket
-        }
-        league["brackets_created"] = True
-
-        # Generate new round-robin schedules for each bracket
-        league["bracket_schedules"] = {
-            "winners": generate_bracket_schedule(winners_bracket, matchdays_limit - bracket_creation_point),
-            "losers": generate_bracket_schedule(losers_bracket, matchdays_limit - bracket_creation_point)
-        }
-
-        leagues[league_code] = league
-        save_leagues(leagues)
-
-        logging.info(f"Playoff brackets created for league {league_code}")
-        logging.info(f"Winners bracket: {winners_bracket}")
-        logging.info(f"Losers bracket: {losers_bracket}")
-
-def generate_bracket_schedule(players, remaining_matchdays):
-    """Generate round-robin schedule for a bracket"""
-    if len(players) < 2:
-        return {players[0]: [None] * (remaining_matchdays // 3)} if players else {}
-
-    schedule = {}
-    for player in players:
-        schedule[player] = []
-
-    total_cycles = remaining_matchdays // 3
-    has_bye = len(players) % 2 == 1
-
-    for cycle in range(total_cycles):
-        available_players = players.copy()
-
-        # Handle bye week for odd number of players
-        if has_bye:
-            bye_player = available_players[cycle % len(available_players)]
-            available_players.remove(bye_player)
-            schedule[bye_player].append(None)
-
-        # Create round-robin pairings
-        while len(available_players) >= 2:
-            if cycle == 0:
-                player1 = available_players.pop(0)
-                player2 = available_players.pop(0)
-            else:
-                player1 = available_players.pop(0)
-                opponent_index = cycle % len(available_players) if available_players else 0
-                if opponent_index >= len(available_players):
-                    opponent_index = 0
-                player2 = available_players.pop(opponent_index)
-
-            schedule[player1].append(player2)
-            schedule[player2].append(player1)
-
-    return schedule
+    with update_leagues() as leagues:
+        if league_code in leagues:
+            league = leagues[league_code]
+            create_brackets(league, load_user_records(), get_league_matchday(league))
 
 def update_playoff_records(league_code):
     """Update win/loss/tie records after completing a 3-game matchup"""
-    leagues = load_leagues()
-    if league_code not in leagues:
-        return
-
-    league = leagues[league_code]
-    if not league.get("use_playoffs", True):
-        return
-
-    players = league.get("players", [])
-
-    # Initialize playoff records for all players
-    if "playoff_records" not in league:
-        league["playoff_records"] = {}
-
-    for player in players:
-        if player not in league["playoff_records"]:
-            league["playoff_records"][player] = {"wins": 0, "losses": 0, "ties": 0}
-
-    # Track which matchups have been recorded to avoid duplicates
-    if "recorded_matchups" not in league:
-        league["recorded_matchups"] = []
-
-    # Create brackets if needed
-    create_playoff_brackets(league_code)
-
-    # Reload league data after potential bracket creation
-    leagues = load_leagues()
-    league = leagues[league_code]
-
-    # Use global matchday for consistency
-    global_matchday = get_global_matchday()
-
-    # Only process if we just completed a 3-game cycle
-    if global_matchday > 0 and global_matchday % 3 == 0:
-        current_cycle = global_matchday // 3 - 1  # The cycle that was just completed (0-indexed)
-
-        # Calculate points for a specific 3-game cycle
-        def get_cycle_points(username, cycle_num):
-            try:
-                user_data = get_user_stats(username)
-                all_data = user_data.get("data", [])
-
-                # Get the 3 games from this specific cycle
-                start_idx = cycle_num * 3
-                end_idx = start_idx + 3
-                cycle_data = all_data[start_idx:end_idx] if start_idx < len(all_data) else []
-
-                total_points = 0
-                for day_data in cycle_data:
-                    for farmer in day_data.get("farmers", []):
-                        total_points += farmer.get("points_after_catastrophe", 0)
-                return total_points
-            except Exception as e:
-                print(f"[ERROR] Error getting cycle points for {username}: {e}")
-                return 0
-
-        # Process each player for this completed cycle
-        processed_matchups = set()
-
-        for player in players:
-            try:
-                # Get opponent for this cycle using the appropriate schedule
-                opponent = None
-                matchdays_limit = league.get("matchdays", 30)
-                bracket_creation_point = matchdays_limit // 2
-
-                if global_matchday < bracket_creation_point:
-                    # Use regular matchup schedule before brackets
-                    if "matchup_schedule" in league and player in league["matchup_schedule"]:
-                        schedule = league["matchup_schedule"][player]
-                        if current_cycle < len(schedule):
-                            opponent = schedule[current_cycle]
-                else:
-                    # Use bracket schedules after bracket creation
-                    brackets = league.get("playoff_brackets", {})
-                    bracket_schedules = league.get("bracket_schedules", {})
-
-                    # Find which bracket the player is in
-                    player_bracket = None
-                    if player in brackets.get("winners", []):
-                        player_bracket = "winners"
-                    elif player in brackets.get("losers", []):
-                        player_bracket = "losers"
-
-                    if player_bracket and player_bracket in bracket_schedules:
-                        bracket_schedule = bracket_schedules[player_bracket]
-                        if player in bracket_schedule:
-                            # Adjust cycle index for bracket phase
-                            bracket_cycle = current_cycle - (bracket_creation_point // 3)
-                            if bracket_cycle >= 0 and bracket_cycle < len(bracket_schedule[player]):
-                                opponent = bracket_schedule[player][bracket_cycle]
-
-                # Handle bye week (no opponent)
-                if opponent is None:
-                    bye_matchup_id = f"{player}_bye_cycle_{current_cycle}"
-                    if bye_matchup_id not in league["recorded_matchups"]:
-                        league["playoff_records"][player]["wins"] += 1
-                        league["recorded_matchups"].append(bye_matchup_id)
-                        print(f"[DEBUG] {player} gets bye week win for cycle {current_cycle}")
-                    continue
-
-                # Ensure opponent exists in playoff records
-                if opponent not in league["playoff_records"]:
-                    league["playoff_records"][opponent] = {"wins": 0, "losses": 0, "ties": 0}
-
-                # Create consistent matchup ID (alphabetical order)
-                matchup_players = sorted([player, opponent])
-                matchup_id = f"{matchup_players[0]}_vs_{matchup_players[1]}_cycle_{current_cycle}"
-
-                # Skip if already processed in this function call
-                if matchup_id in processed_matchups:
-                    continue
-
-                # Skip if already recorded
-                if matchup_id in league["recorded_matchups"]:
-                    continue
-
-                # Calculate points for both players
-                p1_points = get_cycle_points(player, current_cycle)
-                p2_points = get_cycle_points(opponent, current_cycle)
-
-                print(f"[DEBUG] Cycle {current_cycle}: {player} ({p1_points}) vs {opponent} ({p2_points})")
-
-                # Update records - only record once per matchup
-                if p1_points > p2_points:
-                    league["playoff_records"][player]["wins"] += 1
-                    league["playoff_records"][opponent]["losses"] += 1
-                    print(f"[DEBUG] {player} wins!")
-                elif p2_points > p1_points:
-                    league["playoff_records"][opponent]["wins"] += 1
-                    league["playoff_records"][player]["losses"] += 1
-                    print(f"[DEBUG] {opponent} wins!")
-                else:
-                    league["playoff_records"][player]["ties"] += 1
-                    league["playoff_records"][opponent]["ties"] += 1
-                    print(f"[DEBUG] Tie game!")
-
-                # Mark this matchup as recorded
-                league["recorded_matchups"].append(matchup_id)
-                processed_matchups.add(matchup_id)
-
-            except Exception as e:
-                print(f"[ERROR] Error processing playoff records for {player}: {e}")
-                continue
-
-    leagues[league_code] = league
-    save_leagues(leagues)
+    with update_leagues() as leagues:
+        league = leagues.get(league_code)
+        if league and league.get("use_playoffs", True):
+            record_playoff_results(league, load_user_records(), get_league_matchday(league))
 
 def check_and_finish_league(league_code):
     """Check if a league should be finished and handle completion"""
@@ -603,16 +390,11 @@ def check_and_finish_league(league_code):
     league_stats = {}
 
     for player in league["players"]:
-        user_data = get_user_stats(player)
-        player_matchday = user_data.get("matchday", 0)
+        player_matchday = get_user_record(player).get("matchday", 0)
         max_matchday = max(max_matchday, player_matchday)
 
-        # Calculate total points for leaderboard
-        total_points = 0
-        for entry in user_data.get("data", []):
-            for farmer in entry["farmers"]:
-                total_points += farmer["points_after_catastrophe"]
-        league_stats[player] = total_points
+        # Total points for the leaderboard
+        league_stats[player] = get_user_totals(player)["points"]
 
     # Check if league should finish
     if max_matchday >= matchdays_limit:
@@ -693,138 +475,119 @@ def check_and_finish_league(league_code):
         # Archive teams for viewing but reset user's active team
         league["archived_teams"] = {}
         for player in league["players"]:
-            user_data = get_user_stats(player)
             user_profile = get_user_profile(player)
+            with update_user(player) as user_data:
+                # Archive complete team data with all farmer information
+                archived_team = {}
+                drafted_team = user_data.get("drafted_team", {})
 
-            # Archive complete team data with all farmer information
-            archived_team = {}
-            drafted_team = user_data.get("drafted_team", {})
-
-            for role, farmer_data in drafted_team.items():
-                if isinstance(farmer_data, dict):
-                    archived_team[role] = {
-                        "name": farmer_data.get("name", ""),
-                        "strength": farmer_data.get("strength", 5),
-                        "handy": farmer_data.get("handy", 5),
-                        "stamina": farmer_data.get("stamina", 5),
-                        "physical": farmer_data.get("physical", 5),
-                        "image": farmer_data.get("image", ""),
-                        "crop_preferences": farmer_data.get("crop_preferences", {})
-                    }
-
-            league["archived_teams"][player] = {
-                "team": archived_team,
-                "final_points": league_stats[player],
-                "matchdays_played": user_data.get("matchday", 0),
-                "team_name": user_profile["team_name"],
-                "profile_pic": user_profile["profile_pic"]
-            }
+                for role, farmer_data in drafted_team.items():
+                    if isinstance(farmer_data, dict):
+                        archived_team[role] = {
+                            "name": farmer_data.get("name", ""),
+                            "strength": farmer_data.get("strength", 5),
+                            "handy": farmer_data.get("handy", 5),
+                            "stamina": farmer_data.get("stamina", 5),
+                            "physical": farmer_data.get("physical", 5),
+                            "image": farmer_data.get("image", ""),
+                            "crop_preferences": farmer_data.get("crop_preferences", {})
+                        }
 
-            # Reset user's active team for new leagues
-            user_data["drafted_team"] = {}
-            user_data["matchday"] = 0
-            user_data["data"] = []
-            update_user_stats(player, user_data)
+                league["archived_teams"][player] = {
+                    "team": archived_team,
+                    "final_points": league_stats[player],
+                    "matchdays_played": user_data.get("matchday", 0),
+                    "team_name": user_profile["team_name"],
+                    "profile_pic": user_profile["profile_pic"]
+                }
 
-        leagues[league_code] = league
-        save_leagues(leagues)
+                # Reset user's active team for new leagues
+                user_data["drafted_team"] = {}
+                user_data["matchday"] = 0
+                user_data["data"] = []
+
+        with update_leagues() as leagues:
+            if league_code in leagues:
+                leagues[league_code].update({
+                    key: league[key] for key in ("status", "final_standings", "winner", "completion_date", "archived_teams")
+                })
         logging.info(f"League {league_code} finished! Winner: {winner}")
 
         # Reset market for this league
         reset_league_market(league_code)
 
-def get_global_matchday():
-    """Get the current global matchday number"""
-    try:
-        with open("global_matchday.json", "r") as f:
-            data = json.load(f)
-            return data.get("current_matchday", 0)
-    except FileNotFoundError:
-        return 0
-
-def set_global_matchday(matchday):
-    """Set the current global matchday number"""
-    with open("global_matchday.json", "w") as f:
-        json.dump({"current_matchday": matchday}, f, indent=4)
-
 def run_automated_matchday():
-    """Run matchday for all users with complete teams"""
-    try:
-        logging.info("Running automated matchday...")
-
-        # Get current global matchday
-        global_matchday = get_global_matchday()
-
-        # Run market farmers first
-        assign_market_farmers_to_roles()
-        run_market_matchday()
-
-        # Get all active leagues
-        leagues = load_leagues()
-        active_leagues = {}
-
-        for league_code, league in leagues.items():
-            if not league.get("status") == "finished" and league.get("draft_complete"):
-                active_leagues[league_code] = league
-
-        # Run matchdays for all players in active leagues
-        players_processed = set()
-
-        for league_code, league in active_leagues.items():
-            # Check if league has reached its matchday limit
-            if global_matchday >= league.get("matchdays", 30):
-                continue
-
-            for username in league["players"]:
-                if username in players_processed:
-                    continue
-
-                user_data = get_user_stats(username)
-                drafted_team = user_data.get("drafted_team", {})
-
-                # Check if all required roles are filled
-                required_roles = {"Fix Meiser", "Speed Runner", "Lift Tender"}
-                has_complete_team = all(
-                    role in drafted_team and
-                    isinstance(drafted_team[role], dict) and
-                    drafted_team[role].get("name")
-                    for role in required_roles
-                )
-
-                if drafted_team and has_complete_team:
-                    try:
-                        # Set user's matchday to global matchday + 1 so first matchday shows as 1
-                        user_data["matchday"] = global_matchday + 1
-                        update_user_stats(username, user_data)
+    """Run the matchday of every league whose clock is due"""
+    if not leader.acquire():
+        return
 
-                        subprocess.run(["python", "core.py", username], check=True)
-                        logging.info(f"Completed matchday for {username}")
-                        players_processed.add(username)
+    try:
+        due = due_leagues(load_leagues())
+        if not due:
+            return
+        logging.info(f"Running automated matchday for {len(due)} league(s)...")
 
-                    except Exception as e:
-                        logging.error(f"Error running matchday for {username}: {e}")
+        # Simulate the due leagues in memory and commit once; each advances its own clock
+        players_processed = run_leagues_matchday(due)
 
-        # Only increment global matchday if players actually completed matchdays
         if players_processed:
-            set_global_matchday(global_matchday + 1)
-            logging.info(f"Automated matchday completed - Global matchday is now {global_matchday + 1}")
-
-            # Check playoff records and league completion after all players have completed the matchday
-            for league_code, league in active_leagues.items():
-                if league.get("use_playoffs", True):
-                    update_playoff_records(league_code)
+            # Check league completion after all players have completed the matchday
+            for league_code in due:
                 check_and_finish_league(league_code)
+            # The leagues' projections are stale now; recompute them off this tick
+            for league_code in due:
+                schedule_projection(league_code)
         else:
-            logging.info("No players processed matchdays - global matchday unchanged")
+            logging.info("No players processed matchdays - league matchdays unchanged")
     except Exception as e:
         logging.error(f"Error in automated matchday: {e}")
 
-# Schedule matchday every 2 minutes
+def schedule_projection(league_code):
+    """Recompute the league's season projection in the background, once"""
+    scheduler.add_job(
+        func=refresh_projection,
+        args=[league_code],
+        id=f'projection_{league_code}',
+        name=f'Project league {league_code}',
+        replace_existing=True
+    )
+
+def run_automated_market_matchday():
+    """Run the market farmers' matchday once per matchday interval"""
+    if not leader.acquire():
+        return
+
+    try:
+        assign_market_farmers_to_roles()
+        run_market_matchday()
+    except Exception as e:
+        logging.error(f"Error in automated market matchday: {e}")
+
+# Check league clocks every few seconds so leagues run on their own, staggered cadence
+MATCHDAY_TICK_SECONDS = int(os.environ.get("MATCHDAY_TICK_SECONDS", 10))
+
 scheduler.add_job(
     func=run_automated_matchday,
-    trigger=IntervalTrigger(seconds=120),
+    trigger=IntervalTrigger(seconds=MATCHDAY_TICK_SECONDS),
     id='automated_matchday',
-    name='Run matchday every 2 minutes',
+    name='Run due league matchdays',
+    replace_existing=True
+)
+
+scheduler.add_job(
+    func=run_automated_market_matchday,
+    trigger=IntervalTrigger(seconds=MATCHDAY_INTERVAL),
+    id='automated_market_matchday',
+    name='Run the market matchday',
+    replace_existing=True
+)
+
+# Renew the scheduler lease well before it expires; a worker that stops renewing hands over
+scheduler.add_job(
+    func=leader.acquire,
+    trigger=IntervalTrigger(seconds=max(1, leader.LEASE_SECONDS // 3)),
+    id='scheduler_lease',
+    name='Renew the scheduler lease',
     replace_existing=True
 )
 
@@ -850,15 +613,16 @@ def register():
         username = request.form["username"]
         password = request.form["password"]
 
-        users = load_users()
-        if username in users:
+        with update_users() as users:
+            registered = username not in users
+            if registered:
+                users[username] = {
+                    "password": generate_password_hash(password),
+                    "theme": "light"
+                }
+        if not registered:
             flash("Username already exists.", "danger")
         else:
-            users[username] = {
-                "password": generate_password_hash(password),
-                "theme": "light"
-            }
-            save_users(users)
             session["user"] = username
             flash("Registration successful!", "success")
             return redirect(url_for("index"))
@@ -891,15 +655,7 @@ def profile():
 
                     # Update user's profile picture in users.json
                     try:
-                        with open("users.json", "r") as f:
-                            users = json.load(f)
-
-                        if username in users:
-                            users[username]["profile_pic"] = filename
-
-                            with open("users.json", "w") as f:
-                                json.dump(users, f, indent=4)
-
+                        if update_user_profile(username, profile_pic=filename):
                             flash("Profile picture updated successfully!", "success")
                         else:
                             flash("User not found!", "danger")
@@ -913,9 +669,8 @@ def profile():
         new_team_name = request.form.get('team_name', '').strip()
         if new_team_name:
             try:
-                user_data = get_user_stats(username)
-                user_data["team_name"] = new_team_name
-                update_user_stats(username, user_data)
+                with update_user(username) as user_data:
+                    user_data["team_name"] = new_team_name
                 flash("Team name updated successfully!", "success")
             except Exception as e:
                 flash(f"Error updating team name: {str(e)}", "danger")
@@ -924,9 +679,8 @@ def profile():
         new_team_chant = request.form.get('team_chant', '').strip()
         if new_team_chant is not None: # Allow clearing the chant
             try:
-                user_data = get_user_stats(username)
-                user_data["team_chant"] = new_team_chant
-                update_user_stats(username, user_data)
+                with update_user(username) as user_data:
+                    user_data["team_chant"] = new_team_chant
                 flash("Team chant updated successfully!", "success")
             except Exception as e:
                 flash(f"Error updating team chant: {str(e)}", "danger")
@@ -935,8 +689,7 @@ def profile():
 
     # Get user data for display
     try:
-        with open("users.json", "r") as f:
-            users = json.load(f)
+        users = load_users()
         user_info = users.get(username, {})
 
         user_data = get_user_stats(username)
@@ -957,23 +710,21 @@ def index():
     username = session["user"]
     tab = request.args.get("tab", "stats")
 
-    # Get user stats
-    user_data = get_user_stats(username)
-    stats_html = get_match_stats_html(username)
+    # Get user stats (the history is read separately, only as far back as needed)
+    user_data = get_user_record(username)
+    stats_html = match_stats_html(username)
 
     # Get story data and match history
     story_data = {}
     match_history = []
     try:
-        with open("story.json", "r") as f:
-            all_stories = json.load(f)
-            story_data = all_stories.get(username, {})
+        story_data = load_stories().get(username, {})
     except:
         pass
 
     # Get match history from user stats
     try:
-        match_history = user_data.get("data", [])[-10:]  # Last 10 matches
+        match_history = get_recent_matchdays(username, 10)  # Last 10 matches
         match_history.reverse()  # Most recent first
     except:
         match_history = []
@@ -986,82 +737,9 @@ def index():
         leagues = load_leagues()
         current_league = leagues.get(current_league["code"], current_league)
 
-    # Get leaderboard data
-    from stats import load_stats
-    all_stats = load_stats()
-
-    # Create comprehensive leaderboard
-    global_leaderboard = []
-    league_leaderboard = []
-
-    for user, data in all_stats["users"].items():
-        total = sum(
-            sum(farmer["points_after_catastrophe"] for farmer in day["farmers"])
-            for day in data.get("data", [])
-        )
-
-        user_profile = get_user_profile(user)
-        user_entry = {
-            "username": user,
-            "team_name": user_profile["team_name"],
-            "profile_pic": user_profile["profile_pic"],
-            "total_points": total,
-            "is_current_user": user == username
-        }
-
-        global_leaderboard.append(user_entry)
-
-        # Add to league leaderboard if in same league
-        if current_league and user in current_league.get("players", []):
-            # Add playoff records if it's a playoff league
-            if current_league.get("use_playoffs", True):
-                # Reload current league to get latest playoff records
-                leagues = load_leagues()
-                updated_league = leagues.get(current_league["code"], current_league)
-                playoff_records = updated_league.get("playoff_records", {})
-
-                # Ensure playoff records exist for this user
-                if user not in playoff_records:
-                    playoff_records[user] = {"wins": 0, "losses": 0, "ties": 0}
-                    # Update the league data
-                    updated_league["playoff_records"] = playoff_records
-                    leagues[current_league["code"]] = updated_league
-                    save_leagues(leagues)
-
-                user_record = playoff_records.get(user, {"wins": 0, "losses": 0, "ties": 0})
-                user_entry.update({
-                    "wins": user_record["wins"],
-                    "losses": user_record["losses"],
-                    "ties": user_record["ties"]
-                })
-            league_leaderboard.append(user_entry)
-
-    global_leaderboard.sort(key=lambda x: x["total_points"], reverse=True)
-
-    # Sort league leaderboard based on playoff phase and system
-    if current_league and current_league.get('use_playoffs', True):
-        if current_league.get('brackets_created', False):
-            # Playoff season: bracket-based ranking
-            brackets = current_league.get("playoff_brackets", {})
-            winners_bracket = brackets.get("winners", [])
-
-            def get_bracket_sort_key(x):
-                # Winners bracket players get priority (higher tier), then sort by wins and points
-                if x["username"] in winners_bracket:
-                    return (2, x.get("wins", 0), x["total_points"])  # Tier 2 (highest)
-                elif x["username"] in current_league.get("playoff_brackets", {}).get("losers", []):
-                    return (1, x.get("wins", 0), x["total_points"])  # Tier 1 (lower)
-                else:
-                    # No bracket (shouldn't happen but handle gracefully)
-                    return (0, x.get("wins", 0), x["total_points"])  # Tier 0 (shouldn't happen)
-
-            league_leaderboard.sort(key=get_bracket_sort_key, reverse=True)
-        else:
-            # Regular season: sort by wins then points
-            league_leaderboard.sort(key=lambda x: (x.get("wins", 0), x["total_points"]), reverse=True)
-    else:
-        # Points system: sort by total points
-        league_leaderboard.sort(key=lambda x: x["total_points"], reverse=True)
+    # Leaderboards are kept sorted between matchdays (see leaderboard.py); the global one shows its first page
+    global_leaderboard = leaderboard_rows(board_page(global_board())[0], username)
+    league_leaderboard = leaderboard_rows(league_board(current_league)["entries"], username) if current_league else []
 
     # Get global farmer stats for farmer stats tab
     global_farmer_stats = []
@@ -1069,85 +747,13 @@ def index():
         farmers = []
 
         # Load crop preferences
-        crop_preferences = {}
-        try:
-            with open("farmer_crop_preferences.json", "r") as f:
-                crop_preferences = json.load(f)
-        except FileNotFoundError:
-            pass
-
-        if os.path.exists("farm_stats.json"):
-            with open("farm_stats.json") as f:
-                stats = json.load(f)
-
-            farmer_summary = {}
-            current_user_team = stats["users"].get(username, {}).get("drafted_team", {})
-            current_user_totals = {}
-
-            # Calculate total points for each of your drafted farmers
-            for role, info in current_user_team.items():
-                if not info:
-                    continue
-                name = info["name"]
-                total = 0
-                for match in stats["users"].get(username, {}).get("data", []):
-                    for f in match.get("farmers", []):
-                        if f.get("name") == name:
-                            total += f.get("points_after_catastrophe", 0)
-                current_user_totals[role] = total
-
-            for other_user, user_data in stats.get("users", {}).items():
-                drafted = user_data.get("drafted_team", {})
-                matchdays = user_data.get("data", [])
-
-                for role, info in drafted.items():
-                    if not info:
-                        continue
-                    name = info["name"]
-
-                    if name not in farmer_summary:
-                        owner_profile = get_user_profile(other_user)
-                        farmer_summary[name] = {
-                            "name": name,
-                            "owner": other_user,
-                            "owner_team_name": owner_profile["team_name"],
-                            "role": role,
-                            "total_points": 0,
-                            "matchdays": 0,
-                            "best": 0
-                        }
+        crop_preferences = file_cache.load_json("farmer_crop_preferences.json", {})
 
-                    for match in matchdays:
-                        for f in match.get("farmers", []):
-                            if f.get("name") == name:
-                                pts = f.get("points_after_catastrophe", 0)
-                                farmer_summary[name]["total_points"] += pts
-                                farmer_summary[name]["matchdays"] += 1
-                                if pts > farmer_summary[name]["best"]:
-                                    farmer_summary[name]["best"] = pts
-
-            for f in farmer_summary.values():
-                f["average"] = round(f["total_points"] / f["matchdays"], 2) if f["matchdays"] else "-"
-
-                # Calculate point difference vs current user's farmer in same role
-                if f["owner"] != username:
-                    # Find current user's farmer in the same role
-                    user_farmer_points = None
-                    for other_name, other_data in farmer_summary.items():
-                        if other_data["owner"] == username and other_data["role"] == f["role"]:
-                            user_farmer_points = other_data["total_points"]
-                            break
-
-                    if user_farmer_points is not None:
-                        f["vs_your_role_diff"] = f["total_points"] - user_farmer_points
-                    else:
-                        f["vs_your_role_diff"] = None
-                else:
-                    f["vs_your_role_diff"] = None
-
-                # Add crop preferences
-                f["crop_preferences"] = crop_preferences.get(f["name"], {})
-                farmers.append(f)
+        # Per-farmer aggregates are kept up to date as rosters and matchdays change (see farmer_index.py)
+        for f in farmer_summaries(username).values():
+            f["owner_team_name"] = get_user_profile(f["owner"])["team_name"]
+            f["crop_preferences"] = crop_preferences.get(f["name"], {})
+            farmers.append(f)
 
         # Add crop preferences to base farmer data for farmer stats
         all_farmers_with_prefs = []
@@ -1179,7 +785,7 @@ def index():
     # Get current matchup for user if in playoff league
     current_matchup = None
     matchup_progress = None
-    global_matchday = get_global_matchday()
+    league_matchday = get_league_matchday(current_league) if current_league else 0
 
     if current_league and current_league.get("use_playoffs", True) and current_league.get("draft_complete"):
         current_matchup = get_current_matchup(username, current_league)
@@ -1187,15 +793,23 @@ def index():
 
     # Get latest matchday data for catastrophe display
     latest_matchday_data = None
-    if user_data.get("data"):
-        latest_matchday_data = user_data["data"][-1]  # Most recent matchday
+    if match_history:
+        latest_matchday_data = match_history[0]  # Most recent matchday
+
+    # The story is rendered from the latest matchday's codes; story.json only
+    # carries prose written before the codes existed
+    story = {}
+    if "story_message" in story_data:
+        story = story_data
+    elif latest_matchday_data:
+        story = narrative.render(latest_matchday_data)
 
     return render_template("index.html",
         username=username,
         tab=tab,
         stats_html=stats_html,
-        story_message=story_data.get("story_message", "No story available yet."),
-        catastrophe_message=story_data.get("catastrophe_message", "No catastrophe reported."),
+        story_message=story.get("story_message", "No story available yet."),
+        catastrophe_message=story.get("catastrophe_message", "No catastrophe reported."),
         miss_days=story_data.get("miss_days", {}),
         match_history=match_history,
         global_leaderboard=global_leaderboard,
@@ -1204,7 +818,7 @@ def index():
         current_league=current_league,
         current_matchup=current_matchup,
         matchup_progress=matchup_progress,
-        global_matchday=global_matchday,
+        league_matchday=league_matchday,
         team=team_data,
         current_team=current_team,
         roles=roles,
@@ -1222,7 +836,7 @@ def draft():
 
     if request.method == "POST":
         username = session["user"]
-        user_data = get_user_stats(username)
+        user_data = get_user_record(username)
         current_league = get_user_league(username)
 
         if not current_league or not current_league.get("draft_complete"):
@@ -1256,8 +870,8 @@ def draft():
         if unassigned_farmers:
             flash(f"All drafted farmers must be assigned to a role. Unassigned: {', '.join(unassigned_farmers)}", "danger")
         else:
-            user_data["drafted_team"] = updated_assignments
-            update_user_stats(username, user_data)
+            with update_user(username) as user_data:
+                user_data["drafted_team"] = updated_assignments
             flash("Team assignments saved successfully!", "success")
 
     return redirect(url_for("index", tab="draft"))
@@ -1280,126 +894,113 @@ def leagues():
             league_name = request.form.get("league_name")
 
             code = secrets.token_hex(4).upper()
-            leagues = load_leagues()
-
-            leagues[code] = {
-                "name": league_name,
-                "code": code,
-                "host": username,
-                "players": [username],
-                "season": "summer",  # Default settings
-                "matchdays": 30,
-                "use_playoffs": True,
-                "playoff_cutoff": 6,
-                "lock_market_in_playoffs": True,
-                "draft_time": None,
-                "draft_complete": False,
-                "snake_order": [],
-                "market_initialized": False,
-                "playoff_records": {},
-                "recorded_matchups": []
-            }
+            with update_leagues() as leagues:
+                leagues[code] = {
+                    "name": league_name,
+                    "code": code,
+                    "host": username,
+                    "players": [username],
+                    "season": "summer",  # Default settings
+                    "matchdays": 30,
+                    "use_playoffs": True,
+                    "playoff_cutoff": 6,
+                    "lock_market_in_playoffs": True,
+                    "draft_time": None,
+                    "draft_complete": False,
+                    "snake_order": [],
+                    "market_initialized": False,
+                    "playoff_records": {},
+                    "recorded_matchups": [],
+                    "rng_seed": streams.new_seed()
+                }
 
-            save_leagues(leagues)
             flash(f"League '{league_name}' created with code: {code}", "success")
 
         elif action == "join":
             code = request.form.get("league_code")
-            leagues = load_leagues()
-
-            if code in leagues:
-                league = leagues[code]
-                if username not in league["players"]:
-                    league["players"].append(username)
-                    # Regenerate matchup schedule when new player joins
-                    league["matchup_schedule"] = generate_matchup_schedule(league)
-                    save_leagues(leagues)
-                    flash(f"Joined league: {league['name']}", "success")
+            with update_leagues() as leagues:
+                if code in leagues:
+                    league = leagues[code]
+                    if username not in league["players"]:
+                        league["players"].append(username)
+                        # Regenerate matchup schedule when new player joins
+                        league["matchup_schedule"] = generate_matchup_schedule(league)
+                        flash(f"Joined league: {league['name']}", "success")
+                    else:
+                        flash("You are already in this league!", "warning")
                 else:
-                    flash("You are already in this league!", "warning")
-            else:
-                flash("Invalid league code!", "danger")
+                    flash("Invalid league code!", "danger")
 
         elif action == "leave":
-            leagues = load_leagues()
-            for code, league in leagues.items():
-                if username in league["players"] and username != league["host"]:
-                    league["players"].remove(username)
-                    save_leagues(leagues)
-                    flash("Left the league.", "info")
-                    break
+            with update_leagues() as leagues:
+                for code, league in leagues.items():
+                    if username in league["players"] and username != league["host"]:
+                        league["players"].remove(username)
+                        flash("Left the league.", "info")
+                        break
 
         elif action == "kick":
             kick_user = request.form.get("kick_user")
-            leagues = load_leagues()
-            current_league = get_user_league(username)
-
-            if current_league and current_league["host"] == username:
-                if kick_user in current_league["players"]:
-                    current_league["players"].remove(kick_user)
-
-                    # If league is in progress, clean up the kicked player's data
-                    if current_league.get("draft_complete"):
-                        # Remove from user drafts if draft was completed
-                        user_drafts = current_league.get("user_drafts", {})
-                        if kick_user in user_drafts:
-                            del user_drafts[kick_user]
-                            current_league["user_drafts"] = user_drafts
-
-                        # Remove from playoff records
-                        playoff_records = current_league.get("playoff_records", {})
-                        if kick_user in playoff_records:
-                            del playoff_records[kick_user]
-                            current_league["playoff_records"] = playoff_records
-
-                        # Regenerate matchup schedule if needed
-                        if "matchup_schedule" in current_league:
-                            current_league["matchup_schedule"] = generate_matchup_schedule(current_league)
-
-                        # Reset the kicked player's stats
-                        from stats import load_stats
-                        try:
-                            all_stats = load_stats()
-                            if kick_user in all_stats["users"]:
-                                all_stats["users"][kick_user] = {
-                                    "matchday": 0,
-                                    "drafted_team": {},
-                                    "data": []
-                                }
-                                save_stats(all_stats)
-                        except Exception as e:
-                            logging.error(f"Error resetting kicked player stats: {e}")
-
-                    leagues[current_league["code"]] = current_league
-                    save_leagues(leagues)
-                    flash(f"Kicked {kick_user} from the league.", "info")
+            reset_kicked_stats = False
+            with update_leagues() as leagues:
+                current_league = get_user_league(username, leagues)
+
+                if current_league and current_league["host"] == username:
+                    if kick_user in current_league["players"]:
+                        current_league["players"].remove(kick_user)
+
+                        # If league is in progress, clean up the kicked player's data
+                        if current_league.get("draft_complete"):
+                            # Remove from user drafts if draft was completed
+                            user_drafts = current_league.get("user_drafts", {})
+                            if kick_user in user_drafts:
+                                del user_drafts[kick_user]
+                                current_league["user_drafts"] = user_drafts
+
+                            # Remove from playoff records
+                            playoff_records = current_league.get("playoff_records", {})
+                            if kick_user in playoff_records:
+                                del playoff_records[kick_user]
+                                current_league["playoff_records"] = playoff_records
+
+                            # Regenerate matchup schedule if needed
+                            if "matchup_schedule" in current_league:
+                                current_league["matchup_schedule"] = generate_matchup_schedule(current_league)
+                            reset_kicked_stats = True
+
+                        flash(f"Kicked {kick_user} from the league.", "info")
+
+            # Reset the kicked player's stats once the leagues lock is released
+            if reset_kicked_stats:
+                try:
+                    if kick_user in load_user_records():
+                        reset_user(kick_user)
+                except Exception as e:
+                    logging.error(f"Error resetting kicked player stats: {e}")
 
         elif action == "update_settings":
-            leagues = load_leagues()
-            current_league = get_user_league(username)
-
-            if current_league and current_league["host"] == username and not current_league.get("draft_time"):
-                season = request.form.get("season", "summer")
-                matchdays = int(request.form.get("matchdays", 30))
-                league_system = request.form.get("league_system", "playoff")
-                use_playoffs = league_system == "playoff"
-                lock_market_in_playoffs = request.form.get("lock_market_in_playoffs") == "on" if use_playoffs else False
-
-                # Update league settings
-                current_league["season"] = season
-                current_league["matchdays"] = matchdays
-                current_league["use_playoffs"] = use_playoffs
-                current_league["lock_market_in_playoffs"] = lock_market_in_playoffs
-
-                # Regenerate matchup schedule with new settings
-                current_league["matchup_schedule"] = generate_matchup_schedule(current_league)
+            with update_leagues() as leagues:
+                current_league = get_user_league(username, leagues)
+
+                if current_league and current_league["host"] == username and not current_league.get("draft_time"):
+                    season = request.form.get("season", "summer")
+                    matchdays = int(request.form.get("matchdays", 30))
+                    league_system = request.form.get("league_system", "playoff")
+                    use_playoffs = league_system == "playoff"
+                    lock_market_in_playoffs = request.form.get("lock_market_in_playoffs") == "on" if use_playoffs else False
+
+                    # Update league settings
+                    current_league["season"] = season
+                    current_league["matchdays"] = matchdays
+                    current_league["use_playoffs"] = use_playoffs
+                    current_league["lock_market_in_playoffs"] = lock_market_in_playoffs
+
+                    # Regenerate matchup schedule with new settings
+                    current_league["matchup_schedule"] = generate_matchup_schedule(current_league)
 
-                leagues[current_league["code"]] = current_league
-                save_leagues(leagues)
-                flash("League settings updated successfully!", "success")
+                    flash("League settings updated successfully!", "success")
 
         elif action == "delete":
-            leagues = load_leagues()
             current_league = get_user_league(username)
 
             if current_league and current_league["host"] == username:
@@ -1407,54 +1008,30 @@ def leagues():
                 players_in_league = current_league["players"]
 
                 # Clean up story data for all players in the league
-                try:
-                    with open("story.json", "r") as f:
-                        story_data = json.load(f)
+                story_data = load_stories()
 
-                    for player in players_in_league:
-                        if player in story_data:
-                            del story_data[player]
+                for player in players_in_league:
+                    if player in story_data:
+                        del story_data[player]
 
-                    with open("story.json", "w") as f:
-                        json.dump(story_data, f, indent=4)
-                except FileNotFoundError:
-                    pass
+                save_stories(story_data)
 
                 # Clean up market stats for all players in the league
-                try:
-                    with open("market_stats.json", "r") as f:
-                        market_stats = json.load(f)
-
-                    # Remove any market farmers that were drafted by players in this league
-                    from stats import load_stats
-                    all_stats = load_stats()
+                records = load_user_records()
 
+                # Remove any market farmers that were drafted by players in this league
+                with market_manager.update_market_stats() as market_stats:
                     for player in players_in_league:
-                        user_data = all_stats["users"].get(player, {})
+                        user_data = records.get(player, {})
                         for farmer_data in user_data.get("drafted_team", {}).values():
                             if isinstance(farmer_data, dict) and farmer_data.get("name") in market_stats:
                                 del market_stats[farmer_data["name"]]
 
-                    with open("market_stats.json", "w") as f:
-                        json.dump(market_stats, f, indent=4)
-                except FileNotFoundError:
-                    pass
-
-                # Clean up farm stats for all players in the league
+                # Clean up farm stats for the players in the league, each under its own lock
                 try:
-                    from stats import load_stats, save_stats
-                    all_stats = load_stats()
-
                     for player in players_in_league:
-                        if player in all_stats["users"]:
-                            # Reset player's stats
-                            all_stats["users"][player] = {
-                                "matchday": 0,
-                                "drafted_team": {},
-                                "data": []
-                            }
-
-                    save_stats(all_stats)
+                        if player in records:
+                            reset_user(player)
                 except Exception as e:
                     logging.error(f"Error cleaning up farm stats: {e}")
 
@@ -1462,59 +1039,45 @@ def leagues():
                 reset_league_market(league_code)
 
                 # Clean up trade history for all players in the league
-                try:
-                    with open("trades.json", "r") as f:
-                        trades = json.load(f)
-
+                with trading_manager.update_trades() as trades:
                     # Remove trades involving players from this league
-                    filtered_trades = []
-                    for trade in trades:
-                        if trade["from_user"] not in players_in_league and trade["to_user"] not in players_in_league:
-                            filtered_trades.append(trade)
-
-                    with open("trades.json", "w") as f:
-                        json.dump(filtered_trades, f, indent=4)
-                except FileNotFoundError:
-                    pass
+                    trades[:] = [
+                        trade for trade in trades
+                        if trade["from_user"] not in players_in_league and trade["to_user"] not in players_in_league
+                    ]
 
                 # Clean up league chat
                 chat_manager.delete_league_chat(league_code)
 
-                # Reset global matchday to 0 when league is deleted
-                set_global_matchday(0)
-
                 # Remove the league
-                del leagues[league_code]
-                save_leagues(leagues)
+                with update_leagues() as leagues:
+                    leagues.pop(league_code, None)
                 flash("League and all associated data deleted successfully.", "info")
 
         elif action == "set_matchdays":
             matchdays = int(request.form.get("matchdays", 30))
-            leagues = load_leagues()
-            current_league = get_user_league(username)
+            with update_leagues() as leagues:
+                current_league = get_user_league(username, leagues)
 
-            if current_league and current_league["host"] == username:
-                current_league["matchdays"] = matchdays
-                # Regenerate schedule with new matchday limit
-                if "matchup_schedule" in current_league:
-                    current_league["matchup_schedule"] = generate_matchup_schedule(current_league)
-                save_leagues(leagues)
-                flash(f"Season length updated to {matchdays} matchdays.", "success")
+                if current_league and current_league["host"] == username:
+                    current_league["matchdays"] = matchdays
+                    # Regenerate schedule with new matchday limit
+                    if "matchup_schedule" in current_league:
+                        current_league["matchup_schedule"] = generate_matchup_schedule(current_league)
+                    flash(f"Season length updated to {matchdays} matchdays.", "success")
 
         elif action == "update_cutoff":
             cutoff = int(request.form.get("playoff_cutoff", 6))
-            leagues = load_leagues()
-            current_league = get_user_league(username)
+            with update_leagues() as leagues:
+                current_league = get_user_league(username, leagues)
 
-            if current_league and current_league["host"] == username:
-                current_league["playoff_cutoff"] = cutoff
-                # Regenerate schedule with new cutoff
-                current_league["matchup_schedule"] = generate_matchup_schedule(current_league)
-                save_leagues(leagues)
-                flash(f"Playoff cutoff updated to {cutoff} players.", "success")
+                if current_league and current_league["host"] == username:
+                    current_league["playoff_cutoff"] = cutoff
+                    # Regenerate schedule with new cutoff
+                    current_league["matchup_schedule"] = generate_matchup_schedule(current_league)
+                    flash(f"Playoff cutoff updated to {cutoff} players.", "success")
 
         elif action == "play_again":
-            leagues = load_leagues()
             current_league = get_user_league(username)
 
             if current_league and current_league["host"] == username and current_league.get("status") == "finished":
@@ -1524,8 +1087,6 @@ def leagues():
                     success = continue_module.continue_league_new_season(current_league["code"])
 
                     if success:
-                        # Reset global matchday to 0 for the new season
-                        set_global_matchday(0)
                         flash("New season started! Farmer stats have evolved based on previous performance. Ready for a new draft!", "success")
                     else:
                         flash("Error starting new season. Please try again.", "danger")
@@ -1544,38 +1105,35 @@ def start_league():
         return redirect(url_for("login"))
 
     username = session["user"]
-    current_league = get_user_league(username)
-
-    if current_league and current_league["host"] == username and not current_league.get("draft_time"):
-        # Finalize league settings - no more changes allowed after this point
-        current_league["settings_locked"] = True
+    with update_leagues() as leagues:
+        current_league = get_user_league(username, leagues)
 
-        # Set draft time to 1 minute from now
-        draft_time = datetime.now() + timedelta(minutes=1)
-        current_league["draft_time"] = draft_time.isoformat()
+        if current_league and current_league["host"] == username and not current_league.get("draft_time"):
+            # Finalize league settings - no more changes allowed after this point
+            current_league["settings_locked"] = True
 
-        # Create snake draft order
-        import random
-        players = current_league["players"].copy()
-        random.shuffle(players)
+            # Set draft time to 1 minute from now
+            draft_time = datetime.now() + timedelta(minutes=1)
+            current_league["draft_time"] = draft_time.isoformat()
 
-        # Generate snake pattern (1,2,3,2,1 for 3 players, 5 rounds)
-        snake_order = []
-        rounds = 5  # Each player picks 5 farmers
+            # Create snake draft order
+            import random
+            players = current_league["players"].copy()
+            random.shuffle(players)
 
-        for round_num in range(rounds):
-            if round_num % 2 == 0:
-                snake_order.extend(players)  # Forward
-            else:
-                snake_order.extend(reversed(players))  # Reverse
+            # Generate snake pattern (1,2,3,2,1 for 3 players, 5 rounds)
+            snake_order = []
+            rounds = 5  # Each player picks 5 farmers
 
-        current_league["snake_order"] = snake_order
+            for round_num in range(rounds):
+                if round_num % 2 == 0:
+                    snake_order.extend(players)  # Forward
+                else:
+                    snake_order.extend(reversed(players))  # Reverse
 
-        leagues = load_leagues()
-        leagues[current_league["code"]] = current_league
-        save_leagues(leagues)
+            current_league["snake_order"] = snake_order
 
-        flash("League settings finalized! Draft begins in 1 minute.", "success")
+            flash("League settings finalized! Draft begins in 1 minute.", "success")
 
     return redirect(url_for("index", tab="leagues"))
 
@@ -1600,54 +1158,22 @@ def run_matchday():
         return redirect(url_for("index", tab="leagues"))
 
     try:
-        # Get current global matchday
-        global_matchday = get_global_matchday()
+        league_matchday = get_league_matchday(current_league)
 
         # Check if league has reached its matchday limit
-        if global_matchday >= current_league.get("matchdays", 30):
+        if league_matchday >= current_league.get("matchdays", 30):
             flash("This league has reached its matchday limit.", "warning")
             return redirect(url_for("index", tab="leagues"))
 
-        # Run matchday for all players in the league
-        matchdays_run = 0
-        for player in current_league["players"]:
-            user_data = get_user_stats(player)
-            drafted_team = user_data.get("drafted_team", {})
-
-            # Check if all required roles are filled
-            required_roles = {"Fix Meiser", "Speed Runner", "Lift Tender"}
-            has_complete_team = all(
-                role in drafted_team and
-                isinstance(drafted_team[role], dict) and
-                drafted_team[role].get("name")
-                for role in required_roles
-            )
-
-            if drafted_team and has_complete_team:
-                try:
-                    # Set user's matchday to global matchday + 1 so first matchday shows as 1
-                    user_data["matchday"] = global_matchday + 1
-                    update_user_stats(player, user_data)
-
-                    subprocess.run(["python", "core.py", player], check=True)
-                    matchdays_run += 1
-                    logging.info(f"Completed matchday for {player}")
-                except Exception as e:
-                    logging.error(f"Error running matchday for {player}: {e}")
-                    flash(f"Error running matchday for {player}: {str(e)}", "warning")
+        # Run matchday for all players in the league with a single commit
+        matchdays_run = len(run_league_matchday(current_league["code"]))
 
-        # Only increment global matchday if players actually completed matchdays
+        # The league matchday only advances if players actually completed matchdays
         if matchdays_run > 0:
-            set_global_matchday(global_matchday + 1)
-
-            # Update playoff records if it's a playoff league
-            if current_league.get("use_playoffs", True):
-                update_playoff_records(current_league["code"])
-
             # Check if this completes the league's season
             check_and_finish_league(current_league["code"])
 
-            flash(f"Successfully ran matchday for {matchdays_run} players! Global matchday is now {global_matchday + 1}", "success")
+            flash(f"Successfully ran matchday for {matchdays_run} players! League matchday is now {league_matchday + 1}", "success")
         else:
             flash("No players were ready for matchday.", "warning")
 
@@ -1698,11 +1224,7 @@ def waitingroom():
     farmer_pool = load_farmer_pool_with_prev_stats(league_code)
 
     # Load crop preferences
-    try:
-        with open("farmer_crop_preferences.json", "r") as f:
-            crop_preferences = json.load(f)
-    except FileNotFoundError:
-        crop_preferences = {}
+    crop_preferences = file_cache.load_json("farmer_crop_preferences.json", {})
 
     # Add crop preferences to farmer data
     for farmer in farmer_pool:
@@ -1779,11 +1301,7 @@ def draftroom():
     farmer_pool = load_farmer_pool_with_prev_stats(league_code)
 
     # Load crop preferences
-    try:
-        with open("farmer_crop_preferences.json", "r") as f:
-            crop_preferences = json.load(f)
-    except FileNotFoundError:
-        crop_preferences = {}
+    crop_preferences = file_cache.load_json("farmer_crop_preferences.json", {})
 
     # Add crop preferences to farmer data
     for farmer in farmer_pool:
@@ -1798,23 +1316,24 @@ def draftroom():
 
     if picks_made >= len(snake_order):
         # Draft complete
-        league["draft_complete"] = True
-        league["status"] = "active"
+        with update_leagues() as leagues:
+            league = leagues[league_code]
+            if not league.get("draft_complete", False):
+                league["draft_complete"] = True
+                league["status"] = "active"
 
-        # Reset global matchday to 0 for the new season
-        set_global_matchday(0)
+                # Start the league's own matchday clock for the new season
+                start_league_clock(league)
 
-        # Clear timer-related data now that draft is finished
-        league.pop("pick_start_time", None)
-        league.pop("last_pick_message", None)
+                # Clear timer-related data now that draft is finished
+                league.pop("pick_start_time", None)
+                league.pop("last_pick_message", None)
 
-        # Initialize the market for the league upon draft completion
-        if not league.get("market_initialized"):
-            initialize_league_market(league_code)
-            league["market_initialized"] = True  # Ensure market is not re-initialized
-            save_leagues(leagues)
+                # Initialize the market for the league upon draft completion
+                if not league.get("market_initialized"):
+                    initialize_league_market(league_code)
+                    league["market_initialized"] = True  # Ensure market is not re-initialized
 
-        save_leagues(leagues)
         flash("Draft completed!", "success")
         return redirect(url_for("index", tab="draft"))
 
@@ -1839,9 +1358,16 @@ def draftroom():
     # Use league-specific farmer pool if available
     league_farmer_pool = load_farmer_pool(league_code)
 
-    # Add previous season stats to farmer data
+    # Add previous season stats and the best role's expected task points to copies of the farmer data
+    league_farmer_pool = [
+        dict(farmer, prev_season_stats=load_previous_season_stats(league_code, farmer["name"]))
+        for farmer in league_farmer_pool
+    ]
     for farmer in league_farmer_pool:
-        farmer["prev_season_stats"] = load_previous_season_stats(league_code, farmer["name"])
+        farmer["best_role"] = best_role(farmer["strength"], farmer["handy"], farmer["stamina"])
+        farmer["expected_task_points"] = task_distribution(
+            farmer["best_role"], farmer["strength"], farmer["handy"], farmer["stamina"]
+        )["mean"]
 
     return render_template("draftroom.html",
         username=username,
@@ -1860,16 +1386,11 @@ def draftroom():
 
 def load_previous_season_stats(league_code, farmer_name):
     """Load previous season stats for a farmer if available"""
-    prev_stats_file = f"previous_szn_stats_{league_code}.json"
-    try:
-        with open(prev_stats_file, "r") as f:
-            prev_stats = json.load(f)
-            if farmer_name in prev_stats:
-                return prev_stats[farmer_name]
-    except FileNotFoundError:
-        pass  # No previous season stats file
+    if db.enabled():
+        return (db.load_previous_season_stats(league_code) or {}).get(farmer_name)
 
-    return None
+    prev_stats = file_cache.load_json(f"previous_szn_stats_{league_code}.json", {})
+    return prev_stats.get(farmer_name)
 
 @app.route("/submit_pick", methods=["POST"])
 def submit_pick():
@@ -1881,54 +1402,51 @@ def submit_pick():
     league_code = request.form["league_code"]
     selected_role = request.form["selected_role"]
 
-    leagues = load_leagues()
-    league = leagues[league_code]
+    # Use league-specific farmer pool if available
+    league_farmer_pool = load_farmer_pool(league_code)
 
-    # Validate it's user's turn
-    picks_made = league.get("picks_made", 0)
-    snake_order = league.get("snake_order", [])
+    with update_leagues() as leagues:
+        league = leagues[league_code]
 
-    if picks_made >= len(snake_order) or snake_order[picks_made] != username:
-        flash("It's not your turn!", "danger")
-        return redirect(url_for("draftroom"))
+        # Validate it's user's turn
+        picks_made = league.get("picks_made", 0)
+        snake_order = league.get("snake_order", [])
 
-    # Use league-specific farmer pool if available
-    league_farmer_pool = load_farmer_pool(league_code)
+        if picks_made >= len(snake_order) or snake_order[picks_made] != username:
+            flash("It's not your turn!", "danger")
+            return redirect(url_for("draftroom"))
 
-    # Validate farmer not picked
-    picked_farmers = league.get("picked_farmers", [])
-    farmer = league_farmer_pool[farmer_index]
+        # Validate farmer not picked
+        picked_farmers = league.get("picked_farmers", [])
+        farmer = copy.deepcopy(league_farmer_pool[farmer_index])
 
-    if any(f["name"] == farmer["name"] for f in picked_farmers):
-        flash("Farmer already picked!", "danger")
-        return redirect(url_for("draftroom"))
+        if any(f["name"] == farmer["name"] for f in picked_farmers):
+            flash("Farmer already picked!", "danger")
+            return redirect(url_for("draftroom"))
 
-    # Validate role selection
-    user_drafts = league.get("user_drafts", {})
-    if username not in user_drafts:
-        user_drafts[username] = {}
+        # Validate role selection
+        user_drafts = league.get("user_drafts", {})
+        if username not in user_drafts:
+            user_drafts[username] = {}
 
-    if selected_role in user_drafts[username]:
-        flash("Role already filled!", "danger")
-        return redirect(url_for("draftroom"))
+        if selected_role in user_drafts[username]:
+            flash("Role already filled!", "danger")
+            return redirect(url_for("draftroom"))
 
-    # Make the pick
-    picked_farmers.append(farmer)
-    user_drafts[username][selected_role] = farmer
-    league["picked_farmers"] = picked_farmers
-    league["user_drafts"] = user_drafts
-    league["picks_made"] = picks_made + 1
+        # Make the pick
+        picked_farmers.append(farmer)
+        user_drafts[username][selected_role] = farmer
+        league["picked_farmers"] = picked_farmers
+        league["user_drafts"] = user_drafts
+        league["picks_made"] = picks_made + 1
 
-    # Reset timer for next player's turn
-    league["pick_start_time"] = datetime.now().isoformat()
-    league["last_pick_message"] = f"{username} selected {farmer['name']} as {selected_role}"
+        # Reset timer for next player's turn
+        league["pick_start_time"] = datetime.now().isoformat()
+        league["last_pick_message"] = f"{username} selected {farmer['name']} as {selected_role}"
 
     # Update user stats with drafted team
-    user_data = get_user_stats(username)
-    user_data["drafted_team"] = user_drafts[username]
-    update_user_stats(username, user_data)
-
-    save_leagues(leagues)
+    with update_user(username) as user_data:
+        user_data["drafted_team"] = user_drafts[username]
 
     flash(f"Successfully picked {farmer['name']} as {selected_role}!", "success")
     return redirect(url_for("draftroom"))
@@ -1942,24 +1460,23 @@ def skip_turn():
     data = request.get_json()
     league_code = data["league_code"]
 
-    leagues = load_leagues()
-    league = leagues[league_code]
+    with update_leagues() as leagues:
+        league = leagues[league_code]
 
-    # Validate it's user's turn
-    picks_made = league.get("picks_made", 0)
-    snake_order = league.get("snake_order", [])
+        # Validate it's user's turn
+        picks_made = league.get("picks_made", 0)
+        snake_order = league.get("snake_order", [])
 
-    if picks_made >= len(snake_order) or snake_order[picks_made] != username:
-        return "Not your turn", 400
+        if picks_made >= len(snake_order) or snake_order[picks_made] != username:
+            return "Not your turn", 400
 
-    # Skip turn
-    league["picks_made"] = picks_made + 1
+        # Skip turn
+        league["picks_made"] = picks_made + 1
 
-    # Reset timer for next player's turn
-    league["pick_start_time"] = datetime.now().isoformat()
-    league["last_pick_message"] = f"{username} was skipped for taking too long"
+        # Reset timer for next player's turn
+        league["pick_start_time"] = datetime.now().isoformat()
+        league["last_pick_message"] = f"{username} was skipped for taking too long"
 
-    save_leagues(leagues)
     return "Turn skipped"
 
 @app.route("/market")
@@ -1997,10 +1514,6 @@ def market():
     except FileNotFoundError:
         market_assignments = {}
 
-    # Get available farmers (not drafted by any user IN THIS LEAGUE)
-    from stats import load_stats
-    all_stats = load_stats()
-
     # Use league-specific farmer pool if available
     league_farmer_pool = load_farmer_pool(league_code)
 
@@ -2024,13 +1537,8 @@ def market():
             if farmer["name"] in market_assignments:
                 suggested_role = market_assignments[farmer["name"]]["role"]
             else:
-                # Calculate suggested role based on best stat
-                stats = {
-                    "Fix Meiser": farmer["handy"],
-                    "Speed Runner": farmer["stamina"],
-                    "Lift Tender": farmer["strength"]
-                }
-                suggested_role = max(stats.keys(), key=lambda x: stats[x])
+                # Suggest the role with the highest expected task points
+                suggested_role = best_role(farmer["strength"], farmer["handy"], farmer["stamina"])
 
             farmer_with_stats = farmer.copy()
             farmer_with_stats.update({
@@ -2227,12 +1735,7 @@ def view_farmer_profile(farmer_name):
         return redirect(url_for("login"))
 
     # Load crop preferences
-    crop_preferences = {}
-    try:
-        with open("farmer_crop_preferences.json", "r") as f:
-            crop_preferences = json.load(f)
-    except FileNotFoundError:
-        pass
+    crop_preferences = file_cache.load_json("farmer_crop_preferences.json", {})
 
     # Find farmer in the farmer pool
     farmer = None
@@ -2247,60 +1750,11 @@ def view_farmer_profile(farmer_name):
         return redirect(url_for("index", tab="farmer_stats"))
 
     # Get farmer's current stats if they're playing
-    farmer_stats = None
-    if os.path.exists("farm_stats.json"):
-        with open("farm_stats.json") as f:
-            stats = json.load(f)
-
-        # Find current owner and role
-        for username, user_data in stats.get("users", {}).items():
-            drafted = user_data.get("drafted_team", {})
-            for role, info in drafted.items():
-                if info and info.get("name") == farmer_name:
-                    # Calculate performance stats
-                    total_points = 0
-                    matchdays_played = 0
-                    best_performance = 0
-
-                    for match in user_data.get("data", []):
-                        for farmer_match in match.get("farmers", []):
-                            if farmer_match.get("name") == farmer_name:
-                                points = farmer_match.get("points_after_catastrophe", 0)
-                                total_points += points
-                                matchdays_played += 1
-                                if points > best_performance:
-                                    best_performance = points
-
-                    # Get user profile for team name
-                    user_profile = get_user_profile(username)
-
-                    # Calculate comparison vs user's current farmer in same role
-                    current_user = session.get("user")
-                    vs_your_role_diff = None
-                    if current_user and current_user in stats.get("users", {}):
-                        current_user_data = stats["users"][current_user]
-                        current_team = current_user_data.get("drafted_team", {})
-                        if role in current_team and current_team[role]:
-                            # Calculate current user's farmer points in same role
-                            user_farmer_points = 0
-                            for match in current_user_data.get("data", []):
-                                for farmer_match in match.get("farmers", []):
-                                    if farmer_match.get("name") == current_team[role]["name"]:
-                                        user_farmer_points += farmer_match.get("points_after_catastrophe", 0)
-                            vs_your_role_diff = total_points - user_farmer_points
-                    farmer_stats = {
-                        "owner": username,
-                        "owner_team_name": user_profile["team_name"],
-                        "role": role,
-                        "total_points": total_points,
-                        "matchdays": matchdays_played,
-                        "average": round(total_points / matchdays_played, 2) if matchdays_played > 0 else 0,
-                        "best": best_performance,
-                        "vs_your_role_diff": vs_your_role_diff
-                    }
-                    break
-            if farmer_stats:
-                break
+    farmer_stats = farmer_summary(farmer_name, session.get("user"))
+    if farmer_stats:
+        farmer_stats["owner_team_name"] = get_user_profile(farmer_stats["owner"])["team_name"]
+        if farmer_stats["average"] == "-":
+            farmer_stats["average"] = 0
 
     return render_template("farmer_profile.html",
                          farmer=farmer,
@@ -2308,53 +1762,8 @@ def view_farmer_profile(farmer_name):
 
 @app.route("/farmerstats")
 def farmer_stats():
-    if not os.path.exists("farm_stats.json"):
-        return "No farm_stats.json found."
-
-    with open("farm_stats.json") as f:
-        stats = json.load(f)
-
-    farmer_summary = {}
-
-    for username, user_data in stats.get("users", {}).items():
-        drafted = user_data.get("drafted_team", {})
-        matchdays = user_data.get("data", [])
-
-        # Create mapping of drafted farmer name -> role (we only care about name and owner)
-        owned_farmers = {info['name']: username for role, info in drafted.items() if info}
-
-        for match in matchdays:
-            for f in match.get("farmers", []):
-                name = f.get("name")
-                points = f.get("points_after_catastrophe", 0)
-
-                if name not in owned_farmers:
-                    continue  # skip farmers that weren't drafted
-
-                if name not in farmer_summary:
-                    farmer_summary[name] = {
-                        "name": name,
-                        "owner": owned_farmers[name],
-                        "total_points": 0,
-                        "matchdays": 0,
-                        "best": 0
-                    }
-
-                farmer_summary[name]["total_points"] += points
-                farmer_summary[name]["matchdays"] += 1
-                if points > farmer_summary[name]["best"]:
-                    farmer_summary[name]["best"] = points
-
-    # Compute averages and prepare final list
-    farmers = []
-    for f in farmer_summary.values():
-        if f["matchdays"] > 0:
-            f["average"] = round(f["total_points"] / f["matchdays"], 2)
-        else:
-            f["average"] = "-"
-        farmers.append(f)
-
-    return render_template("index.html", tab="farmer_stats", farmers=farmer_stats, current_user=session.get("user"))
+    farmers = list(farmer_summaries(session.get("user")).values())
+    return render_template("index.html", tab="farmer_stats", farmers=farmers, current_user=session.get("user"))
 
 
 @app.route("/get_theme")
@@ -2380,10 +1789,8 @@ def finalize_draft_unlock():
         return "League not found", 404
 
     # Mark draft as ready to start
-    leagues = load_leagues()
-    league_code = current_league["code"]
-    leagues[league_code]["draft_ready"] = True
-    save_leagues(leagues)
+    with update_leagues() as leagues:
+        leagues[current_league["code"]]["draft_ready"] = True
 
     return "OK"
 
@@ -2413,6 +1820,70 @@ def check_draft_ready():
 
     return jsonify({"ready": ready})
 
+@app.route("/api/task_distribution")
+def api_task_distribution():
+    """Exact task points distribution per role for the given stats"""
+    if "user" not in session:
+        return jsonify({}), 401
+
+    try:
+        strength, handy, stamina = (int(request.args.get(stat, 5)) for stat in ("strength", "handy", "stamina"))
+    except ValueError:
+        return jsonify({"error": "strength, handy and stamina must be integers"}), 400
+    if any(stat not in TABLE_STATS for stat in (strength, handy, stamina)):
+        return jsonify({"error": f"strength, handy and stamina must be between {TABLE_STATS[0]} and {TABLE_STATS[-1]}"}), 400
+
+    role = request.args.get("role")
+    if role is not None and role not in TASK_CATALOGUE:
+        return jsonify({"error": f"Unknown role {role}"}), 400
+    roles = [role] if role else list(TASK_CATALOGUE)
+
+    return jsonify({
+        "strength": strength,
+        "handy": handy,
+        "stamina": stamina,
+        "best_role": best_role(strength, handy, stamina),
+        "roles": {job: task_distribution(job, strength, handy, stamina) for job in roles}
+    })
+
+@app.route("/api/league_projection")
+def api_league_projection():
+    """Monte Carlo odds of reaching the winners bracket and winning the user's league"""
+    if "user" not in session:
+        return jsonify({}), 401
+
+    league = get_user_league(session["user"])
+    if not league or not league_is_active(league):
+        return jsonify({"error": "No active league"}), 404
+
+    projection = get_projection(league)
+    if projection is None:
+        # Computed in the background; the page polls until it is ready
+        schedule_projection(league["code"])
+        return jsonify({"status": "pending", "league_matchday": get_league_matchday(league)}), 202
+
+    return jsonify({
+        "status": "ready",
+        "league_matchday": projection["matchday"],
+        "trials": projection["trials"],
+        "computed_at": projection.get("computed_at"),
+        "players": projection["players"]
+    })
+
+@app.route("/api/scheduler_status")
+def api_scheduler_status():
+    """Which process currently owns the matchday scheduler"""
+    status = leader.current()
+    lease = status["lease"] or {}
+    return jsonify({
+        "owner": lease.get("owner") if status["active"] else None,
+        "acquired_at": lease.get("acquired_at"),
+        "expires_at": lease.get("expires_at"),
+        "active": status["active"],
+        "this_process": status["this_process"],
+        "is_owner": status["active"] and lease.get("owner") == status["this_process"]
+    })
+
 @app.route("/api/current_team")
 def api_current_team():
     if "user" not in session:
@@ -2455,33 +1926,46 @@ def api_matchup_points(username):
     if "user" not in session:
         return jsonify({"points": 0}), 401
 
-    user_data = get_user_stats(username)
     user_profile = get_user_profile(username)
-    global_matchday = get_global_matchday()
+    league = get_user_league(username)
+    league_matchday = get_league_matchday(league) if league else 0
 
     # Calculate which 3-game cycle we're currently in
-    current_cycle = global_matchday // 3
+    current_cycle = league_matchday // 3
+
+    return jsonify({
+        "points": get_cycle_ledger(username, current_cycle)["points"],
+        "team_name": user_profile["team_name"],
+        "username": username
+    })
 
-    # Get the points for the current 3-game cycle
-    all_data = user_data.get("data", [])
+@app.route("/api/matchup_odds/<username>")
+def api_matchup_odds(username):
+    if "user" not in session:
+        return jsonify({"win": None}), 401
 
-    # Calculate start and end indices for current cycle
-    cycle_start = current_cycle * 3
-    cycle_end = min(cycle_start + 3, len(all_data))
+    # Leagues without playoffs have no head-to-head matchups
+    league = get_user_league(username)
+    if not league or not league.get("use_playoffs", True):
+        return jsonify({"win": None}), 404
 
-    total_points = 0
+    opponent = get_current_matchup(username, league)
+    # Cached per league matchday and rosters, so polling reads only the two players' records
+    odds = current_cycle_odds(username, opponent, league, load_farmer_pool)
 
-    # Sum points from the current 3-game cycle
-    for i in range(cycle_start, cycle_end):
-        if i < len(all_data):
-            day_data = all_data[i]
-            for farmer in day_data.get("farmers", []):
-                total_points += farmer.get("points_after_catastrophe", 0)
+    def side(outlook):
+        return {"banked": outlook["banked"], "days_left": outlook["days_left"],
+                "expected": outlook["banked"] + sum(points * p for points, p in enumerate(outlook["pmf"]))}
 
     return jsonify({
-        "points": total_points,
-        "team_name": user_profile["team_name"],
-        "username": username
+        "username": username,
+        "opponent": opponent,
+        "matchday": get_league_matchday(league),
+        "win": odds["win"],
+        "tie": odds["tie"],
+        "loss": odds["loss"],
+        "points": side(odds["outlook"]),
+        "opponent_points": side(odds["opponent_outlook"]) if odds["opponent_outlook"] else None
     })
 
 @app.route("/api/matchup_farmer_breakdown/<username>")
@@ -2489,29 +1973,14 @@ def api_matchup_farmer_breakdown(username):
     if "user" not in session:
         return jsonify({"farmers": []}), 401
 
-    user_data = get_user_stats(username)
-    global_matchday = get_global_matchday()
+    league = get_user_league(username)
+    league_matchday = get_league_matchday(league) if league else 0
 
     # Calculate which 3-game cycle we're currently in
-    current_cycle = global_matchday // 3
-
-    # Get the data for the current 3-game cycle
-    all_data = user_data.get("data", [])
-
-    # Calculate start and end indices for current cycle
-    cycle_start = current_cycle * 3
-    cycle_end = min(cycle_start + 3, len(all_data))
+    current_cycle = league_matchday // 3
 
-    farmer_points = {}
-
-    # Sum points by farmer from the current 3-game cycle
-    for i in range(cycle_start, cycle_end):
-        if i < len(all_data):
-            day_data = all_data[i]
-            for farmer in day_data.get("farmers", []):
-                name = farmer.get("name")
-                points = farmer.get("points_after_catastrophe", 0)
-                farmer_points[name] = farmer_points.get(name, 0) + points
+    # Points by farmer from the current 3-game cycle's ledger
+    farmer_points = get_cycle_ledger(username, current_cycle)["farmers"]
 
     # Convert to list format for easier frontend handling
     farmers = [{"name": name, "points": points} for name, points in farmer_points.items()]
@@ -2526,17 +1995,51 @@ def api_total_season_points(username):
     if "user" not in session:
         return jsonify({"total_points": 0}), 401
 
-    user_data = get_user_stats(username)
+    return jsonify({"total_points": get_user_totals(username)["points"]})
 
-    # Calculate total points across all matchdays
-    total_points = 0
-    all_data = user_data.get("data", [])
+def leaderboard_rows(entries, username):
+    """Leaderboard entries with each player's profile, for one page"""
+    rows = []
+    for entry in entries:
+        user_profile = get_user_profile(entry["username"])
+        rows.append({
+            **entry,
+            "team_name": user_profile["team_name"],
+            "profile_pic": user_profile["profile_pic"],
+            "is_current_user": entry["username"] == username
+        })
+    return rows
 
-    for day_data in all_data:
-        for farmer in day_data.get("farmers", []):
-            total_points += farmer.get("points_after_catastrophe", 0)
+@app.route("/api/leaderboard")
+def api_leaderboard():
+    if "user" not in session:
+        return jsonify({"entries": []}), 401
 
-    return jsonify({"total_points": total_points})
+    username = session["user"]
+    scope = request.args.get("scope", "global")
+    try:
+        cursor = max(0, int(request.args.get("cursor", 0)))
+        limit = min(max(1, int(request.args.get("limit", LEADERBOARD_PAGE_SIZE))), LEADERBOARD_SIZE)
+    except ValueError:
+        return jsonify({"error": "cursor and limit must be integers"}), 400
+
+    if scope == "global":
+        board = global_board()
+    elif scope == "league":
+        league = get_user_league(username)
+        if not league:
+            return jsonify({"entries": []}), 404
+        board = league_board(league)
+    else:
+        return jsonify({"error": "scope must be global or league"}), 400
+
+    entries, next_cursor = board_page(board, cursor, limit)
+    return jsonify({
+        "scope": scope,
+        "entries": leaderboard_rows(entries, username),
+        "next_cursor": str(next_cursor) if next_cursor is not None else None,
+        "updated_at": board.get("updated_at")
+    })
 
 @app.route("/api/waiting_room_timer/<league_code>")
 def api_waiting_room_timer(league_code):
@@ -2592,9 +2095,9 @@ def api_draft_timer(league_code):
     if not pick_start_time_str:
         # Initialize timer for first pick if not set
         from datetime import datetime
-        league["pick_start_time"] = datetime.now().isoformat()
-        leagues[league_code] = league
-        save_leagues(leagues)
+        with update_leagues() as leagues:
+            if league_code in leagues and not leagues[league_code].get("pick_start_time"):
+                leagues[league_code]["pick_start_time"] = datetime.now().isoformat()
         return jsonify({"time_remaining": 120}), 200
 
     # Calculate time remaining for current pick (2 minutes total)
@@ -2609,12 +2112,13 @@ def api_draft_timer(league_code):
     if time_remaining <= 0:
         current_user_turn = snake_order[picks_made] if picks_made < len(snake_order) else None
         if current_user_turn:
-            # Skip the turn automatically
-            league["picks_made"] = picks_made + 1
-            league["pick_start_time"] = datetime.now().isoformat()
-            league["last_pick_message"] = f"{current_user_turn} was skipped for taking too long"
-            leagues[league_code] = league
-            save_leagues(leagues)
+            # Skip the turn automatically, unless a pick or another poll moved the draft on first
+            with update_leagues() as leagues:
+                league = leagues.get(league_code)
+                if league and league.get("picks_made", 0) == picks_made and league.get("pick_start_time") == pick_start_time_str:
+                    league["picks_made"] = picks_made + 1
+                    league["pick_start_time"] = datetime.now().isoformat()
+                    league["last_pick_message"] = f"{current_user_turn} was skipped for taking too long"
 
     return jsonify({"time_remaining": time_remaining})
 
@@ -2677,14 +2181,16 @@ def api_matchup_cycle_progress():
     if not current_league:
         return jsonify({})
 
-    global_matchday = get_global_matchday()
+    league_matchday = get_league_matchday(current_league)
 
-        # Calculate which day of the 3-day cycle we're currently on
-    cycle_day = (global_matchday % 3) + 1  # Day 1, 2, or 3 of current cycle
+    # Calculate which day of the 3-day cycle we're currently on
+    cycle_day = (league_matchday % 3) + 1  # Day 1, 2, or 3 of current cycle
 
     return jsonify({
         "current_day": cycle_day,
-        "global_matchday": global_matchday
+        "league_matchday": league_matchday,
+        # The key this endpoint used before leagues kept their own matchday
+        "global_matchday": league_matchday
     })
 
 @app.route("/api/previous_matchup_results/<username>/<int:cycle>")
@@ -2701,7 +2207,7 @@ def api_previous_matchup_results(username, cycle):
     matchdays_limit = current_league.get("matchdays", 30)
     bracket_creation_point = matchdays_limit // 2
 
-    # Calculate the global matchday for the start of this cycle
+    # Calculate the league matchday for the start of this cycle
     cycle_start_matchday = cycle * 3
 
     if cycle_start_matchday < bracket_creation_point:
@@ -2737,41 +2243,12 @@ def api_previous_matchup_results(username, cycle):
     user_profile = get_user_profile(username)
     opponent_profile = get_user_profile(opponent)
 
-    # Calculate points for both players for the specified cycle
+    # Points for both players for the specified cycle, from each one's cycle ledger
     def get_cycle_points_breakdown(target_username, target_cycle):
         try:
-            user_data = get_user_stats(target_username)
-            all_data = user_data.get("data", [])
-
-            # Get the 3 games from this specific cycle
-            start_idx = target_cycle * 3
-            end_idx = start_idx + 3
-            cycle_data = all_data[start_idx:end_idx] if start_idx < len(all_data) else []
-
-            total_points = 0
-            farmer_breakdown = []
-
-            # Track points by farmer across the 3 days
-            farmer_totals = {}
-
-            for day_data in cycle_data:
-                for farmer in day_data.get("farmers", []):
-                    farmer_name = farmer.get("name")
-                    farmer_points = farmer.get("points_after_catastrophe", 0)
-
-                    if farmer_name not in farmer_totals:
-                        farmer_totals[farmer_name] = 0
-                    farmer_totals[farmer_name] += farmer_points
-                    total_points += farmer_points
-
-            # Convert to breakdown format
-            for farmer_name, points in farmer_totals.items():
-                farmer_breakdown.append({
-                    "name": farmer_name,
-                    "points": points
-                })
-
-            return total_points, farmer_breakdown
+            ledger = get_cycle_ledger(target_username, target_cycle)
+            farmer_breakdown = [{"name": name, "points": points} for name, points in ledger["farmers"].items()]
+            return ledger["points"], farmer_breakdown
         except Exception as e:
             print(f"[ERROR] Error getting cycle points breakdown for {target_username}: {e}")
             return 0, []
@@ -2811,10 +2288,6 @@ def swap_farmer():
         flash("Invalid swap request. Please try again.", "danger")
         return redirect(url_for("market"))
 
-    # Get user's current team
-    user_data = get_user_stats(username)
-    current_team = user_data.get("drafted_team", {})
-
     # Valid roles for any user team
     valid_roles = ["Fix Meiser", "Speed Runner", "Lift Tender", "Bench 1", "Bench 2"]
     if current_farmer_role not in valid_roles:
@@ -2832,11 +2305,8 @@ def swap_farmer():
         return redirect(url_for("market"))
 
     # Check if market farmer is actually available (not drafted)
-    from stats import load_stats
-    all_stats = load_stats()
-
     drafted_farmers = set()
-    for user_stats in all_stats["users"].values():
+    for user_stats in load_user_records().values():
         for farmer_data in user_stats.get("drafted_team", {}).values():
             if isinstance(farmer_data, dict):
                 drafted_farmers.add(farmer_data["name"])
@@ -2845,27 +2315,23 @@ def swap_farmer():
         flash("This farmer is no longer available.", "danger")
         return redirect(url_for("market"))
 
-    # Perform the swap
-    old_farmer = current_team.get(current_farmer_role)
-
-    # Replace/assign the farmer in the user's team
-    current_team[current_farmer_role] = {
-        "name": market_farmer["name"],
-        "strength": market_farmer["strength"],
-        "handy": market_farmer["handy"],
-        "stamina": market_farmer["stamina"],
-        "physical": market_farmer["physical"]
-    }
-
-    # Update user stats
-    user_data["drafted_team"] = current_team
-    update_user_stats(username, user_data)
+    # Perform the swap on the user's team as stored now
+    with update_user(username) as user_data:
+        current_team = user_data.setdefault("drafted_team", {})
+        old_farmer = current_team.get(current_farmer_role)
+
+        # Replace/assign the farmer in the user's team
+        current_team[current_farmer_role] = {
+            "name": market_farmer["name"],
+            "strength": market_farmer["strength"],
+            "handy": market_farmer["handy"],
+            "stamina": market_farmer["stamina"],
+            "physical": market_farmer["physical"]
+        }
 
     # Clear any market stats for the acquired farmer (they're no longer in market)
-    market_stats = market_manager.get_market_stats()
-    if market_farmer_name in market_stats:
-        del market_stats[market_farmer_name]
-        market_manager.save_market_stats(market_stats)
+    with market_manager.update_market_stats() as market_stats:
+        market_stats.pop(market_farmer_name, None)
 
     if old_farmer and old_farmer.get('name'):
         flash(f"Successfully swapped {old_farmer['name']} for {market_farmer['name']} in the {current_farmer_role} role!", "success")
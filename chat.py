@@ -2,6 +2,8 @@
 import os
 import json
 from datetime import datetime
+import db
+import storage
 
 class ChatManager:
     def __init__(self):
@@ -14,6 +16,8 @@ class ChatManager:
     
     def load_chat_messages(self, league_code):
         """Load chat messages for a league"""
+        if db.enabled():
+            return db.load_chat_messages(league_code)
         chat_file = self.get_chat_file(league_code)
         try:
             with open(chat_file, "r") as f:
@@ -23,32 +27,36 @@ class ChatManager:
     
     def save_chat_messages(self, league_code, messages):
         """Save chat messages for a league"""
-        chat_file = self.get_chat_file(league_code)
-        with open(chat_file, "w") as f:
-            json.dump(messages, f, indent=4)
+        if db.enabled():
+            return db.save_chat_messages(league_code, messages)
+        storage.write_json(self.get_chat_file(league_code), messages)
     
     def add_message(self, league_code, username, message):
         """Add a new message to the league chat"""
-        messages = self.load_chat_messages(league_code)
-        
-        new_message = {
-            "id": len(messages) + 1,
-            "username": username,
-            "message": message,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        messages.append(new_message)
-        self.save_chat_messages(league_code, messages)
+        if db.enabled():
+            return db.add_chat_message(league_code, username, message)
+        with storage.transaction(self.get_chat_file(league_code), []) as messages:
+            new_message = {
+                "id": len(messages) + 1,
+                "username": username,
+                "message": message,
+                "timestamp": datetime.now().isoformat()
+            }
+
+            messages.append(new_message)
         return new_message
     
     def delete_league_chat(self, league_code):
         """Delete all chat messages for a league"""
+        if db.enabled():
+            return db.delete_league_chat(league_code)
         chat_file = self.get_chat_file(league_code)
         if os.path.exists(chat_file):
             os.remove(chat_file)
     
     def get_recent_messages(self, league_code, limit=50):
         """Get recent messages for a league"""
+        if db.enabled():
+            return db.load_chat_messages(league_code, limit)
         messages = self.load_chat_messages(league_code)
         return messages[-limit:] if len(messages) > limit else messages
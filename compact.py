@@ -0,0 +1,100 @@
+# Replace the stored matchday prose with event codes (see narrative.py) in every backend.
+# An entry is only converted when its codes render back to the exact stored story;
+# anything else keeps its prose. story.json drops a user's story once it matches
+# their latest matchday, which now renders it.
+# Usage: python compact.py [--dry-run]
+import argparse
+import json
+import sys
+import time
+
+import narrative
+from stats import load_stats, load_stories, rewrite_user_history, save_stories
+
+def _size(data):
+    return len(json.dumps(data, separators=(",", ":")))
+
+def compact_user(user_stats):
+    """(user with compacted history, entries converted, entries kept as prose)"""
+    entries = []
+    converted = kept = 0
+    for entry in user_stats.get("data", []):
+        compact = narrative.compact_entry(entry)
+        if compact is not None:
+            converted += 1
+            entries.append(compact)
+        else:
+            kept += "story_message" in entry
+            entries.append(entry)
+    return {**user_stats, "data": entries}, converted, kept
+
+def compact_stories(stories, users):
+    """Stories without the prose that each user's latest matchday renders identically"""
+    compacted = {}
+    for username, story in stories.items():
+        history = users.get(username, {}).get("data", [])
+        if "story_message" in story and history:
+            rendered = narrative.render(history[-1])
+            if rendered["story_message"] == story["story_message"] and \
+                    rendered["catastrophe_message"] == story.get("catastrophe_message"):
+                story = {k: v for k, v in story.items() if k not in ("story_message", "catastrophe_message")}
+                story["matchday"] = history[-1].get("matchday")
+        compacted[username] = story
+    return compacted
+
+def main():
+    parser = argparse.ArgumentParser(description="Store matchday stories as event codes")
+    parser.add_argument("--dry-run", action="store_true", help="report the savings without writing")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = load_stats()
+    stories = load_stories()
+
+    users = {}
+    rows = []
+    for username, user_stats in stats.get("users", {}).items():
+        users[username], converted, kept = compact_user(user_stats)
+        rows.append((username, converted, kept, _size(user_stats), _size(users[username])))
+    new_stories = compact_stories(stories, users)
+
+    print(f"{'user':<24}{'converted':>10}{'kept':>6}{'bytes before':>14}{'bytes after':>13}")
+    for username, converted, kept, before, after in rows:
+        print(f"{username:<24}{converted:>10}{kept:>6}{before:>14}{after:>13}")
+    print(f"{'story.json':<40}{_size(stories):>14}{_size(new_stories):>13}")
+    before = sum(row[3] for row in rows) + _size(stories)
+    after = sum(row[4] for row in rows) + _size(new_stories)
+    print(f"{'total':<40}{before:>14}{after:>13}")
+
+    if args.dry_run:
+        print("\nDry run, nothing written")
+        return
+
+    for username, converted, _, _, _ in rows:
+        if converted:
+            rewrite_user_history(username, users[username])
+    save_stories(new_stories)
+
+    # Every converted entry must still render its original story
+    problems = []
+    stored = load_stats().get("users", {})
+    for username, user_stats in stats.get("users", {}).items():
+        stored_entries = stored.get(username, {}).get("data", [])
+        originals = user_stats.get("data", [])
+        if len(stored_entries) != len(originals):
+            problems.append(f"{username}: {len(originals)} matchdays before, {len(stored_entries)} after")
+            continue
+        for original, entry in zip(originals, stored_entries):
+            if "story_message" in original and narrative.render_story(entry) != original["story_message"]:
+                problems.append(f"{username}: matchday {original.get('matchday')} renders differently")
+
+    print(f"Written in {time.perf_counter() - start:.3f}s")
+    if problems:
+        print(f"\n❌ Verification failed with {len(problems)} problem(s):")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+    print("\n✅ Every story renders from its codes")
+
+if __name__ == "__main__":
+    main()
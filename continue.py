@@ -2,15 +2,17 @@
 import json
 import os
 import random
-from stats import load_stats, get_user_stats
-from market import get_undrafted_farmers
+import db
+import storage
+import streams
+from core import load_leagues, update_leagues
+from stats import get_user_record, get_user_totals, load_stories, load_user_records, reset_user, save_stories
+from season_sim import simulate_seasons
 
 def archive_season_performance(league_code):
     """Archive all farmers' performance data from the completed season"""
     archive_file = f"previous_szn_stats_{league_code}.json"
     
-    # Load current season data
-    all_stats = load_stats()
     leagues = load_leagues()
     league = leagues.get(league_code)
     
@@ -21,13 +23,14 @@ def archive_season_performance(league_code):
     farmer_pool = load_farmer_pool()
     
     archived_performance = {}
+    to_simulate = []
     league_players = league.get("players", [])
     season_length = league.get("matchdays", 30)
     
     # Track all farmers that were drafted in this league
     drafted_farmers = set()
     for player in league_players:
-        user_data = get_user_stats(player)
+        user_data = get_user_record(player)
         for farmer_data in user_data.get("drafted_team", {}).values():
             if isinstance(farmer_data, dict):
                 drafted_farmers.add(farmer_data["name"])
@@ -54,171 +57,49 @@ def archive_season_performance(league_code):
         # Collect actual performance data if farmer was drafted
         if farmer_name in drafted_farmers:
             for player in league_players:
-                user_data = get_user_stats(player)
-                for entry in user_data.get("data", []):
-                    for farmer_match in entry.get("farmers", []):
-                        if farmer_match.get("name") == farmer_name:
-                            performance_data["games_played"] += 1
-                            performance_data["total_points"] += farmer_match.get("points_after_catastrophe", 0)
-                            performance_data["total_injuries"] += farmer_match.get("injuries_this_season", 0)
-        
-        # Simulate missing games if farmer was drafted but didn't play full season
-        if performance_data["was_drafted"] and performance_data["games_played"] < season_length:
-            missing_games = season_length - performance_data["games_played"]
-            simulated_performance = simulate_farmer_performance(farmer, missing_games)
-            performance_data["total_points"] += simulated_performance["points"]
-            performance_data["total_injuries"] += simulated_performance["injuries"]
-            performance_data["simulated_games"] = missing_games
-        
-        # Simulate entire season if farmer was never drafted
-        elif not performance_data["was_drafted"]:
-            simulated_performance = simulate_farmer_performance(farmer, season_length)
-            performance_data["total_points"] = simulated_performance["points"]
-            performance_data["total_injuries"] = simulated_performance["injuries"]
-            performance_data["games_played"] = season_length
-            performance_data["simulated_games"] = season_length
-        
+                farmer_totals = get_user_totals(player)["farmers"].get(farmer_name)
+                if farmer_totals:
+                    performance_data["games_played"] += farmer_totals["matchdays"]
+                    performance_data["total_points"] += farmer_totals["points"]
+                    performance_data["total_injuries"] += farmer_totals["injuries"]
+        
+        # Simulate the games a drafted farmer missed, or the whole season for an undrafted one
+        if performance_data["games_played"] < season_length:
+            to_simulate.append((farmer, season_length - performance_data["games_played"]))
+
         archived_performance[farmer_name] = performance_data
+
+    # Simulate every missing game in one batch
+    points, injuries = simulate_seasons(
+        [farmer for farmer, _ in to_simulate],
+        [games for _, games in to_simulate],
+        seed=streams.derive_seed(streams.league_seed(league), "archive")
+    )
+    for (farmer, games), farmer_points, farmer_injuries in zip(to_simulate, points, injuries):
+        performance_data = archived_performance[farmer["name"]]
+        if not performance_data["was_drafted"]:
+            performance_data["games_played"] = games
+        performance_data["total_points"] += farmer_points[0]
+        performance_data["total_injuries"] += farmer_injuries[0]
+        performance_data["simulated_games"] = games
     
     # Save archived performance
-    with open(archive_file, "w") as f:
-        json.dump(archived_performance, f, indent=4)
+    if db.enabled():
+        db.save_previous_season_stats(league_code, archived_performance)
+    else:
+        storage.write_json(archive_file, archived_performance)
     
     return True
 
 def simulate_farmer_performance(farmer, num_games):
-    """Simulate farmer performance for missing games using exact core.py logic"""
-    from tasks import get_task_for_job
-    
-    best_role = determine_best_role(farmer)
-    total_points = 0
-    total_injuries = 0
-    injury_points_lost = 0
-    miss_days = 0
-    
-    # Load seasonal crops and farmer preferences
-    try:
-        with open("seasonal_crops.json", "r") as f:
-            seasonal_crops = json.load(f)
-    except FileNotFoundError:
-        seasonal_crops = {
-            "summer": ["tomatoes", "corn", "peppers", "cucumbers", "watermelons", "zucchini"],
-            "fall": ["pumpkins", "apples", "squash", "sweet_potatoes", "cranberries", "carrots"],
-            "winter": ["kale", "brussels_sprouts", "potatoes", "onions", "winter_wheat", "cabbage"],
-            "spring": ["lettuce", "radishes", "peas", "strawberries", "spinach", "asparagus"]
-        }
-    
-    try:
-        with open("farmer_crop_preferences.json", "r") as f:
-            farmer_preferences = json.load(f)
-    except FileNotFoundError:
-        farmer_preferences = {}
-    
-    # Get season (default to summer for simulation)
-    season = "summer"
-    
-    for game_num in range(num_games):
-        # Skip if farmer is injured
-        if miss_days > 0:
-            miss_days -= 1
-            continue
-        
-        # Select random daily crop from season
-        daily_crop = random.choice(seasonal_crops.get(season, ["corn"]))
-        
-        # Roll catastrophe exactly like core.py
-        event_type = 0
-        cat_ptloss = 0
-        is_affected_by_catastrophe = False
-        
-        roll = random.randint(1, 100)
-        if roll < 60:
-            event_type = 1
-            cat_ptloss = 1
-            # 1/3 chance this farmer is specifically affected
-            is_affected_by_catastrophe = random.random() < 0.33
-        elif 80 <= roll < 90:
-            event_type = 2
-            cat_ptloss = 2
-            is_affected_by_catastrophe = True  # All farmers affected
-        elif roll >= 90:
-            event_type = 3
-            is_affected_by_catastrophe = True  # All farmers affected
-        
-        # Get task points using exact core.py logic
-        pts, _ = get_task_for_job(
-            best_role,
-            farmer["strength"],
-            farmer["handy"],
-            farmer["stamina"],
-            farmer["name"],
-            []  # No other farmers for simulation
-        )
-        
-        # Check for injury exactly like core.py
-        injury_loss = 0
-        if random.randint(1, 3) == 3 and random.randint(1, 11) > farmer["physical"]:
-            injury_loss = random.randint(1, 2)
-            total_injuries += 1
-            injury_points_lost += injury_loss
-            if random.random() < 0.5:
-                miss_days = random.randint(1, 2)
-        
-        # Calculate crop harvest exactly like core.py
-        task_success = pts > 0
-        is_injured = injury_loss > 0
-        
-        # Base crop amount based on task success
-        if task_success:
-            base_crops = random.randint(30, 50)
-        else:
-            base_crops = random.randint(5, 20)
-        
-        # Apply preference multiplier
-        preferred_crop = farmer_preferences.get(farmer["name"], {}).get(season, "")
-        if preferred_crop == daily_crop:
-            base_crops = int(base_crops * 1.5)
-        
-        # Apply injury/catastrophe multipliers to crops
-        if event_type >= 2:
-            final_crops = 0
-        elif is_injured or event_type == 1:
-            final_crops = int(base_crops * 0.4)
-        else:
-            final_crops = base_crops
-        
-        final_crops = max(0, final_crops)
-        
-        # Calculate final points exactly like core.py
-        final_points = pts
-        
-        # Apply catastrophe effects
-        if event_type == 1 and is_affected_by_catastrophe:
-            final_points -= cat_ptloss
-        elif event_type == 2:
-            final_points -= cat_ptloss
-        elif event_type == 3:
-            final_points = 0
-        
-        # Apply injury loss
-        final_points -= injury_loss
-        final_points = max(0, final_points)
-        
-        # Add crop points to total (crops are separate from task points)
-        final_points += final_crops
-        
-        total_points += final_points
-    
-    return {"points": total_points, "injuries": total_injuries}
+    """Simulate farmer performance for missing games with the same rules as core.py"""
+    points, injuries = simulate_seasons([farmer], num_games)
+    return {"points": points[0][0], "injuries": injuries[0][0]}
 
 def determine_best_role(farmer):
-    """Determine farmer's best role based on highest non-physical stat"""
-    stats = {
-        "Fix Meiser": farmer["handy"],
-        "Speed Runner": farmer["stamina"],
-        "Lift Tender": farmer["strength"]
-    }
-    return max(stats.keys(), key=lambda x: stats[x])
+    """Determine farmer's best role from the exact expected task points"""
+    from tasks import best_role
+    return best_role(farmer["strength"], farmer["handy"], farmer["stamina"])
 
 def get_role_stat(farmer, role):
     """Get the stat value for a specific role"""
@@ -233,17 +114,25 @@ def calculate_stat_progression(league_code):
     """Calculate new farmer stats based on previous season performance"""
     archive_file = f"previous_szn_stats_{league_code}.json"
     
-    if not os.path.exists(archive_file):
-        return False
-    
-    with open(archive_file, "r") as f:
-        archived_performance = json.load(f)
+    if db.enabled():
+        archived_performance = db.load_previous_season_stats(league_code)
+        if archived_performance is None:
+            return False
+    else:
+        if not os.path.exists(archive_file):
+            return False
+
+        with open(archive_file, "r") as f:
+            archived_performance = json.load(f)
     
     # Load original farmer pool
     farmer_pool = load_farmer_pool()
     
     # Load crop preferences
     farmer_preferences = load_farmer_crop_preferences()
+
+    # Progression rolls replay the same way for the same season
+    rng = streams.league_stream(load_leagues().get(league_code, {"code": league_code}), "progression")
     
     # Create new league-specific farmer pool
     new_farmer_pool = []
@@ -296,14 +185,14 @@ def calculate_stat_progression(league_code):
             if many_injuries:
                 # Decrease by 1 with 50% chance for another decrease
                 new_farmer["physical"] = max(1, new_farmer["physical"] - 1)
-                if random.random() < 0.5:  # 50% chance
+                if rng.random() < 0.5:  # 50% chance
                     new_farmer["physical"] = max(1, new_farmer["physical"] - 1)
             # No change for few injuries when physical is 6-10
         elif physical_stat >= 1 and physical_stat <= 5:  # Physical stat 1-5
             if not many_injuries:  # Less than 6 injuries
                 # Increase by 1 with 50% chance for another increase
                 new_farmer["physical"] = min(10, new_farmer["physical"] + 1)
-                if random.random() < 0.5:  # 50% chance
+                if rng.random() < 0.5:  # 50% chance
                     new_farmer["physical"] = min(10, new_farmer["physical"] + 1)
             # No change for many injuries when physical is 1-5
         
@@ -316,12 +205,13 @@ def calculate_stat_progression(league_code):
             farmer["crop_preferences"] = farmer_preferences[farmer_name]
     
     # Apply random stat boosts to 5 farmers
-    new_farmer_pool = apply_random_stat_boosts(new_farmer_pool, league_code)
+    new_farmer_pool = apply_random_stat_boosts(new_farmer_pool, league_code, rng)
     
     # Save league-specific farmer pool
-    league_farmer_pool_file = f"farmer_pool_{league_code}.json"
-    with open(league_farmer_pool_file, "w") as f:
-        json.dump(new_farmer_pool, f, indent=4)
+    if db.enabled():
+        db.save_farmer_pool(league_code, new_farmer_pool)
+    else:
+        storage.write_json(f"farmer_pool_{league_code}.json", new_farmer_pool)
     
     return True
 
@@ -356,7 +246,7 @@ def modify_best_stat(farmer, change):
     
     return farmer
 
-def apply_random_stat_boosts(farmer_pool, league_code):
+def apply_random_stat_boosts(farmer_pool, league_code, rng=random):
     """Apply random stat boosts to 5 randomly selected farmers"""
     print(f"\n=== RANDOM STAT BOOSTS FOR LEAGUE {league_code} ===")
     
@@ -364,7 +254,7 @@ def apply_random_stat_boosts(farmer_pool, league_code):
     boosted_farmer_pool = [farmer.copy() for farmer in farmer_pool]
     
     # Randomly select 5 farmers
-    selected_farmers = random.sample(boosted_farmer_pool, min(5, len(boosted_farmer_pool)))
+    selected_farmers = rng.sample(boosted_farmer_pool, min(5, len(boosted_farmer_pool)))
     
     print("Selected farmers for random stat boosts:")
     
@@ -379,7 +269,7 @@ def apply_random_stat_boosts(farmer_pool, league_code):
         original_value = farmer[best_stat]
         
         # Random boost: 50% chance for +1, 50% chance for +2
-        boost = random.choice([1, 2])
+        boost = rng.choice([1, 2])
         
         # Apply boost with cap at 10
         farmer[best_stat] = min(10, farmer[best_stat] + boost)
@@ -394,74 +284,66 @@ def apply_random_stat_boosts(farmer_pool, league_code):
 
 def reset_league_for_new_season(league_code):
     """Reset league data while preserving core settings and using new farmer pool"""
-    leagues = load_leagues()
-    
-    if league_code not in leagues:
-        return False
-    
-    league = leagues[league_code]
-    
-    # Preserve core league settings
-    core_settings = {
-        "name": league["name"],
-        "code": league["code"],
-        "host": league["host"],
-        "players": league["players"],
-        "season": league["season"],
-        "matchdays": league["matchdays"],
-        "use_playoffs": league["use_playoffs"],
-        "playoff_cutoff": league["playoff_cutoff"],
-        "lock_market_in_playoffs": league["lock_market_in_playoffs"]
-    }
-    
-    # Reset league to pre-draft state
-    leagues[league_code] = {
-        **core_settings,
-        "draft_time": None,
-        "draft_complete": False,
-        "snake_order": [],
-        "market_initialized": False,
-        "playoff_records": {},
-        "recorded_matchups": [],
-        "status": "active",  # Remove finished status
-        "picks_made": 0,
-        "picked_farmers": [],
-        "user_drafts": {},
-        "matchup_schedule": {},
-        "brackets_created": False,
-        "playoff_brackets": {},
-        "bracket_schedules": {},
-        # Clear timer-related data to prevent interference with new draft
-        "pick_start_time": None,
-        "last_pick_message": "",
-        "settings_locked": None
-    }
-    
-    # Clear final standings and archived teams
-    if "final_standings" in leagues[league_code]:
-        del leagues[league_code]["final_standings"]
-    if "winner" in leagues[league_code]:
-        del leagues[league_code]["winner"]
-    if "completion_date" in leagues[league_code]:
-        del leagues[league_code]["completion_date"]
-    if "archived_teams" in leagues[league_code]:
-        del leagues[league_code]["archived_teams"]
-    
-    save_leagues(leagues)
+    with update_leagues() as leagues:
+        if league_code not in leagues:
+            return False
+    
+        league = leagues[league_code]
+    
+        # Preserve core league settings
+        core_settings = {
+            "name": league["name"],
+            "code": league["code"],
+            "host": league["host"],
+            "players": league["players"],
+            "season": league["season"],
+            "matchdays": league["matchdays"],
+            "use_playoffs": league["use_playoffs"],
+            "playoff_cutoff": league["playoff_cutoff"],
+            "lock_market_in_playoffs": league["lock_market_in_playoffs"]
+        }
     
-    # Reset all players' stats
-    from stats import load_stats, save_stats
-    all_stats = load_stats()
+        # Reset league to pre-draft state
+        leagues[league_code] = {
+            **core_settings,
+            "draft_time": None,
+            "draft_complete": False,
+            "snake_order": [],
+            "market_initialized": False,
+            "playoff_records": {},
+            "recorded_matchups": [],
+            "status": "active",  # Remove finished status
+            "picks_made": 0,
+            "matchday": 0,
+            # Each season rolls from a fresh seed
+            "rng_seed": streams.new_seed(),
+            "picked_farmers": [],
+            "user_drafts": {},
+            "matchup_schedule": {},
+            "brackets_created": False,
+            "playoff_brackets": {},
+            "bracket_schedules": {},
+            # Clear timer-related data to prevent interference with new draft
+            "pick_start_time": None,
+            "last_pick_message": "",
+            "settings_locked": None
+        }
     
+        # Clear final standings and archived teams
+        if "final_standings" in leagues[league_code]:
+            del leagues[league_code]["final_standings"]
+        if "winner" in leagues[league_code]:
+            del leagues[league_code]["winner"]
+        if "completion_date" in leagues[league_code]:
+            del leagues[league_code]["completion_date"]
+        if "archived_teams" in leagues[league_code]:
+            del leagues[league_code]["archived_teams"]
+    
+    # Reset the league's players, each under its own lock; other users are not touched
+    records = load_user_records()
     for player in league["players"]:
-        if player in all_stats["users"]:
-            all_stats["users"][player] = {
-                "matchday": 0,
-                "drafted_team": {},
-                "data": []
-            }
-    
-    save_stats(all_stats)
+        if player in records:
+            reset_user(player)
     
     # Clean up league-specific files
     cleanup_league_files(league_code)
@@ -472,7 +354,9 @@ def cleanup_league_files(league_code):
     """Clean up league-specific files for fresh start"""
     files_to_clean = [
         f"market_{league_code}.json",
-        f"chat_{league_code}.json"
+        f"chat_{league_code}.json",
+        f"projection_{league_code}.json",
+        f"leaderboard_{league_code}.json"
     ]
     
     for file_path in files_to_clean:
@@ -480,34 +364,16 @@ def cleanup_league_files(league_code):
             os.remove(file_path)
     
     # Clean story data for league players
-    try:
-        with open("story.json", "r") as f:
-            story_data = json.load(f)
-        
-        leagues = load_leagues()
-        league = leagues.get(league_code, {})
-        
-        for player in league.get("players", []):
-            if player in story_data:
-                del story_data[player]
-        
-        with open("story.json", "w") as f:
-            json.dump(story_data, f, indent=4)
-    except FileNotFoundError:
-        pass
+    story_data = load_stories()
 
-def load_leagues():
-    """Load leagues data"""
-    try:
-        with open("leagues.json", "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+    leagues = load_leagues()
+    league = leagues.get(league_code, {})
+
+    for player in league.get("players", []):
+        if player in story_data:
+            del story_data[player]
 
-def save_leagues(leagues):
-    """Save leagues data"""
-    with open("leagues.json", "w") as f:
-        json.dump(leagues, f, indent=4)
+    save_stories(story_data)
 
 def load_farmer_pool():
     """Load farmer pool data"""
@@ -0,0 +1,532 @@
+# SQLite storage backend mirroring the JSON store functions on indexed tables.
+# Select it with FARMINGTON_STORAGE=sqlite; the file is FARMINGTON_DB.
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+STORAGE_BACKEND = os.environ.get("FARMINGTON_STORAGE", "json")
+DATABASE_PATH = os.environ.get("FARMINGTON_DB", "farmington.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    matchday INTEGER NOT NULL DEFAULT 0,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS matchdays (
+    username TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    matchday INTEGER,
+    season TEXT,
+    daily_crop TEXT,
+    catastrophe_type INTEGER,
+    total_points INTEGER NOT NULL DEFAULT 0,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (username, seq)
+);
+CREATE TABLE IF NOT EXISTS matchday_farmers (
+    username TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    job TEXT,
+    points INTEGER NOT NULL DEFAULT 0,
+    crop_points INTEGER NOT NULL DEFAULT 0,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (username, seq, position)
+);
+CREATE INDEX IF NOT EXISTS idx_matchday_farmers_name ON matchday_farmers (name);
+CREATE TABLE IF NOT EXISTS accounts (
+    username TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leagues (
+    code TEXT PRIMARY KEY,
+    position INTEGER NOT NULL DEFAULT 0,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS league_players (
+    code TEXT NOT NULL,
+    username TEXT NOT NULL,
+    PRIMARY KEY (code, username)
+);
+CREATE INDEX IF NOT EXISTS idx_league_players_username ON league_players (username);
+CREATE TABLE IF NOT EXISTS trades (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    from_user TEXT,
+    to_user TEXT,
+    status TEXT,
+    created_at TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trades_from_user ON trades (from_user);
+CREATE INDEX IF NOT EXISTS idx_trades_to_user ON trades (to_user);
+CREATE TABLE IF NOT EXISTS messages (
+    league_code TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    username TEXT,
+    message TEXT,
+    timestamp TEXT,
+    PRIMARY KEY (league_code, id)
+);
+CREATE TABLE IF NOT EXISTS stories (
+    username TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS market_stats (
+    name TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS farmer_pools (
+    league_code TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS season_archives (
+    league_code TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS projections (
+    league_code TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leaderboards (
+    league_code TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_local = threading.local()
+
+def enabled():
+    """True when the SQLite backend is selected"""
+    return STORAGE_BACKEND == "sqlite"
+
+def get_connection():
+    """Per-thread connection with the schema in place"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DATABASE_PATH, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+@contextmanager
+def transaction():
+    """Run the enclosed writes in one transaction; nested uses join the outer one"""
+    conn = get_connection()
+    if getattr(_local, "depth", 0):
+        _local.depth += 1
+        try:
+            yield conn
+        finally:
+            _local.depth -= 1
+        return
+
+    _local.depth = 1
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        _local.depth = 0
+
+def _dumps(data):
+    return json.dumps(data, separators=(",", ":"))
+
+def _replace_keyed(conn, table, key_column, documents):
+    """Make a key -> document table hold exactly the given documents"""
+    conn.execute(f"DELETE FROM {table}")
+    conn.executemany(
+        f"INSERT INTO {table} ({key_column}, doc) VALUES (?, ?)",
+        [(key, _dumps(doc)) for key, doc in documents.items()]
+    )
+
+# Farm stats
+
+def _default_user():
+    return {
+        "matchday": 0,
+        "drafted_team": {},
+        "data": []
+    }
+
+def _load_history(conn, username, first_seq=0, last_seq=None):
+    """Matchday entries with seq in first_seq..last_seq (inclusive), oldest first"""
+    if last_seq is None:
+        last_seq = 2 ** 62
+    entries = {}
+    for row in conn.execute(
+        "SELECT seq, doc FROM matchdays WHERE username = ? AND seq BETWEEN ? AND ? ORDER BY seq",
+        (username, first_seq, last_seq)
+    ):
+        entry = json.loads(row["doc"])
+        entry["farmers"] = []
+        entries[row["seq"]] = entry
+    for row in conn.execute(
+        "SELECT seq, doc FROM matchday_farmers WHERE username = ? AND seq BETWEEN ? AND ? ORDER BY seq, position",
+        (username, first_seq, last_seq)
+    ):
+        entries[row["seq"]]["farmers"].append(json.loads(row["doc"]))
+    return list(entries.values())
+
+def _insert_history(conn, username, entries, first_seq):
+    matchday_rows = []
+    farmer_rows = []
+    for offset, entry in enumerate(entries):
+        seq = first_seq + offset
+        farmers = entry.get("farmers", [])
+        doc = {k: v for k, v in entry.items() if k != "farmers"}
+        matchday_rows.append((
+            username, seq, entry.get("matchday"), entry.get("season"), entry.get("daily_crop"),
+            entry.get("catastrophe_type"),
+            sum(f.get("points_after_catastrophe", 0) for f in farmers),
+            _dumps(doc)
+        ))
+        for position, farmer in enumerate(farmers):
+            farmer_rows.append((
+                username, seq, position, farmer.get("name", ""), farmer.get("job"),
+                farmer.get("points_after_catastrophe", 0), farmer.get("crop_points", 0),
+                _dumps(farmer)
+            ))
+    conn.executemany("INSERT INTO matchdays VALUES (?, ?, ?, ?, ?, ?, ?, ?)", matchday_rows)
+    conn.executemany("INSERT INTO matchday_farmers VALUES (?, ?, ?, ?, ?, ?, ?, ?)", farmer_rows)
+
+def _write_user(conn, username, user_stats):
+    """Upsert a user and append only the matchdays not already stored.
+
+    The history may be only its tail, from position "history_start" on, when
+    the stored matchdays already reach into it.
+    """
+    doc = {k: v for k, v in user_stats.items() if k not in ("data", "history_start")}
+    conn.execute(
+        "INSERT INTO users (username, matchday, doc) VALUES (?, ?, ?) "
+        "ON CONFLICT(username) DO UPDATE SET matchday = excluded.matchday, doc = excluded.doc",
+        (username, user_stats.get("matchday", 0), _dumps(doc))
+    )
+
+    history = user_stats.get("data", [])
+    start = user_stats.get("history_start", 0)
+    row = conn.execute(
+        "SELECT COUNT(*) AS n FROM matchdays WHERE username = ?", (username,)
+    ).fetchone()
+    stored = row["n"]
+
+    if start:
+        if not start < stored <= start + len(history) or \
+                _stored_matchday(conn, username, stored - 1) != history[stored - start - 1].get("matchday"):
+            raise ValueError(f"Stored history of {username} does not reach the entries from position {start}")
+    # History only ever grows; anything else (a reset or a rewrite) replaces it
+    elif stored and (len(history) < stored or _stored_matchday(conn, username, stored - 1) != history[stored - 1].get("matchday")):
+        conn.execute("DELETE FROM matchdays WHERE username = ?", (username,))
+        conn.execute("DELETE FROM matchday_farmers WHERE username = ?", (username,))
+        stored = 0
+
+    if start + len(history) > stored:
+        _insert_history(conn, username, history[stored - start:], stored)
+
+def _stored_matchday(conn, username, seq):
+    row = conn.execute("SELECT matchday FROM matchdays WHERE username = ? AND seq = ?", (username, seq)).fetchone()
+    return row["matchday"] if row else None
+
+def load_stats():
+    conn = get_connection()
+    users = {}
+    for row in conn.execute("SELECT username, doc FROM users ORDER BY rowid"):
+        user = json.loads(row["doc"])
+        user["data"] = _load_history(conn, row["username"])
+        users[row["username"]] = user
+    return {"users": users}
+
+def save_stats(data):
+    with transaction() as conn:
+        users = data.get("users", {})
+        stored = {row["username"] for row in conn.execute("SELECT username FROM users")}
+        for username in stored - set(users):
+            delete_user_stats(username)
+        for username, user_stats in users.items():
+            _write_user(conn, username, user_stats)
+
+def get_user_stats(username):
+    conn = get_connection()
+    row = conn.execute("SELECT doc FROM users WHERE username = ?", (username,)).fetchone()
+    if row is None:
+        return _default_user()
+    user = json.loads(row["doc"])
+    user["data"] = _load_history(conn, username)
+    return user
+
+def get_user_record(username):
+    """The user's record without the matchday history"""
+    row = get_connection().execute("SELECT doc FROM users WHERE username = ?", (username,)).fetchone()
+    if row is None:
+        user = _default_user()
+        del user["data"]
+        return user
+    return json.loads(row["doc"])
+
+def load_user_records():
+    """Username -> record without the matchday history, for every user"""
+    conn = get_connection()
+    return {row["username"]: json.loads(row["doc"]) for row in conn.execute("SELECT username, doc FROM users ORDER BY rowid")}
+
+def history_slice(username, start, stop=None):
+    """Matchday entries start..stop with list slice semantics"""
+    conn = get_connection()
+    total = conn.execute("SELECT COUNT(*) AS n FROM matchdays WHERE username = ?", (username,)).fetchone()["n"]
+    positions = range(total)[start:stop]
+    if not positions:
+        return []
+    return _load_history(conn, username, positions[0], positions[-1])
+
+def farmer_history(username, farmer_name):
+    """Matchday entries the farmer played in for this user"""
+    conn = get_connection()
+    seqs = [row["seq"] for row in conn.execute(
+        "SELECT DISTINCT seq FROM matchday_farmers WHERE username = ? AND name = ? ORDER BY seq",
+        (username, farmer_name)
+    )]
+    if not seqs:
+        return []
+    entries = _load_history(conn, username, seqs[0], seqs[-1])
+    first = seqs[0]
+    return [entries[seq - first] for seq in seqs]
+
+def update_user_stats(username, user_stats):
+    with transaction() as conn:
+        _write_user(conn, username, user_stats)
+
+def replace_history(username, entries):
+    """Rewrite every stored matchday of the user, for migrations that change old entries"""
+    with transaction() as conn:
+        conn.execute("DELETE FROM matchdays WHERE username = ?", (username,))
+        conn.execute("DELETE FROM matchday_farmers WHERE username = ?", (username,))
+        _insert_history(conn, username, entries, 0)
+
+def delete_user_stats(username):
+    with transaction() as conn:
+        conn.execute("DELETE FROM users WHERE username = ?", (username,))
+        conn.execute("DELETE FROM matchdays WHERE username = ?", (username,))
+        conn.execute("DELETE FROM matchday_farmers WHERE username = ?", (username,))
+
+# Stories
+
+def load_stories():
+    conn = get_connection()
+    return {row["username"]: json.loads(row["doc"]) for row in conn.execute("SELECT username, doc FROM stories")}
+
+def save_stories(stories):
+    with transaction() as conn:
+        _replace_keyed(conn, "stories", "username", stories)
+
+# Leagues
+
+def load_leagues():
+    conn = get_connection()
+    return {row["code"]: json.loads(row["doc"]) for row in conn.execute("SELECT code, doc FROM leagues ORDER BY position")}
+
+def save_leagues(leagues):
+    with transaction() as conn:
+        conn.execute("DELETE FROM leagues")
+        conn.execute("DELETE FROM league_players")
+        conn.executemany(
+            "INSERT INTO leagues (code, position, doc) VALUES (?, ?, ?)",
+            [(code, position, _dumps(league)) for position, (code, league) in enumerate(leagues.items())]
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO league_players (code, username) VALUES (?, ?)",
+            [(code, player) for code, league in leagues.items() for player in league.get("players", [])]
+        )
+
+def get_user_league_code(username):
+    row = get_connection().execute("SELECT code FROM league_players WHERE username = ? LIMIT 1", (username,)).fetchone()
+    return row["code"] if row else None
+
+# Accounts (users.json)
+
+def load_users():
+    conn = get_connection()
+    return {row["username"]: json.loads(row["doc"]) for row in conn.execute("SELECT username, doc FROM accounts ORDER BY rowid")}
+
+def save_users(users):
+    with transaction() as conn:
+        _replace_keyed(conn, "accounts", "username", users)
+
+# Trades
+
+def load_trades():
+    conn = get_connection()
+    return [json.loads(row["doc"]) for row in conn.execute("SELECT doc FROM trades ORDER BY position")]
+
+def save_trades(trades):
+    with transaction() as conn:
+        conn.execute("DELETE FROM trades")
+        conn.executemany(
+            "INSERT INTO trades (id, position, from_user, to_user, status, created_at, doc) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (trade.get("id"), position, trade.get("from_user"), trade.get("to_user"),
+                 trade.get("status"), trade.get("created_at"), _dumps(trade))
+                for position, trade in enumerate(trades)
+            ]
+        )
+
+# League chat
+
+def load_chat_messages(league_code, limit=None):
+    conn = get_connection()
+    if limit is None:
+        rows = conn.execute(
+            "SELECT id, username, message, timestamp FROM messages WHERE league_code = ? ORDER BY id", (league_code,)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT * FROM (SELECT id, username, message, timestamp FROM messages WHERE league_code = ? "
+            "ORDER BY id DESC LIMIT ?) ORDER BY id", (league_code, limit)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def save_chat_messages(league_code, messages):
+    with transaction() as conn:
+        conn.execute("DELETE FROM messages WHERE league_code = ?", (league_code,))
+        conn.executemany(
+            "INSERT INTO messages (league_code, id, username, message, timestamp) VALUES (?, ?, ?, ?, ?)",
+            [(league_code, m["id"], m["username"], m["message"], m["timestamp"]) for m in messages]
+        )
+
+def add_chat_message(league_code, username, message):
+    with transaction() as conn:
+        row = conn.execute("SELECT COALESCE(MAX(id), 0) AS last_id FROM messages WHERE league_code = ?", (league_code,)).fetchone()
+        new_message = {
+            "id": row["last_id"] + 1,
+            "username": username,
+            "message": message,
+            "timestamp": datetime.now().isoformat()
+        }
+        conn.execute(
+            "INSERT INTO messages (league_code, id, username, message, timestamp) VALUES (?, ?, ?, ?, ?)",
+            (league_code, new_message["id"], username, message, new_message["timestamp"])
+        )
+    return new_message
+
+def delete_league_chat(league_code):
+    with transaction() as conn:
+        conn.execute("DELETE FROM messages WHERE league_code = ?", (league_code,))
+
+# Market stats
+
+def load_market_stats():
+    conn = get_connection()
+    return {row["name"]: json.loads(row["doc"]) for row in conn.execute("SELECT name, doc FROM market_stats")}
+
+def save_market_stats(stats):
+    with transaction() as conn:
+        _replace_keyed(conn, "market_stats", "name", stats)
+
+# League farmer pools and previous season archives
+
+def _load_league_doc(table, league_code):
+    row = get_connection().execute(f"SELECT doc FROM {table} WHERE league_code = ?", (league_code,)).fetchone()
+    return json.loads(row["doc"]) if row else None
+
+def _save_league_doc(table, league_code, doc):
+    with transaction() as conn:
+        conn.execute(
+            f"INSERT INTO {table} (league_code, doc) VALUES (?, ?) "
+            "ON CONFLICT(league_code) DO UPDATE SET doc = excluded.doc",
+            (league_code, _dumps(doc))
+        )
+
+def load_farmer_pool(league_code):
+    """League-specific farmer pool, or None when the league has none"""
+    return _load_league_doc("farmer_pools", league_code)
+
+def save_farmer_pool(league_code, pool):
+    _save_league_doc("farmer_pools", league_code, pool)
+
+def load_previous_season_stats(league_code):
+    """Archived previous season stats, or None when the league has none"""
+    return _load_league_doc("season_archives", league_code)
+
+def save_previous_season_stats(league_code, archive):
+    _save_league_doc("season_archives", league_code, archive)
+
+def load_projection(league_code):
+    """The league's stored season projection, or None"""
+    return _load_league_doc("projections", league_code)
+
+def save_projection(league_code, projection):
+    _save_league_doc("projections", league_code, projection)
+
+def load_leaderboard(scope):
+    """A stored leaderboard (a league code, or "global"), or None"""
+    return _load_league_doc("leaderboards", scope)
+
+def save_leaderboard(scope, board):
+    _save_league_doc("leaderboards", scope, board)
+
+# Farmer index
+
+def load_farmer_index():
+    """The stored per-farmer aggregates (see farmer_index.py), or None"""
+    row = get_connection().execute("SELECT value FROM meta WHERE key = 'farmer_index'").fetchone()
+    return json.loads(row["value"]) if row else None
+
+def save_farmer_index(index):
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('farmer_index', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (_dumps(index),)
+        )
+
+# Global matchday
+
+def get_global_matchday():
+    row = get_connection().execute("SELECT value FROM meta WHERE key = 'current_matchday'").fetchone()
+    return int(row["value"]) if row else 0
+
+def set_global_matchday(matchday):
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('current_matchday', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (str(matchday),)
+        )
+
+# Scheduler lease
+
+def load_scheduler_lease():
+    row = get_connection().execute("SELECT value FROM meta WHERE key = 'scheduler_lease'").fetchone()
+    return json.loads(row["value"]) if row else None
+
+def save_scheduler_lease(lease):
+    with transaction() as conn:
+        if lease is None:
+            conn.execute("DELETE FROM meta WHERE key = 'scheduler_lease'")
+        else:
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('scheduler_lease', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (_dumps(lease),)
+            )
+
+def commit_matchday(users, stories, leagues):
+    """Write a completed matchday's users, stories and leagues (with their clocks) in one transaction"""
+    with transaction() as conn:
+        for username, user_stats in users.items():
+            _write_user(conn, username, user_stats)
+        save_stories(stories)
+        save_leagues(leagues)
@@ -0,0 +1,214 @@
+# Statistical equivalence check and throughput benchmark for the fast simulators.
+# Plays seeded seasons of one farmer per role through core.py's own matchday
+# (simulate_user_matchday, the reference) and through each season_sim engine,
+# then compares the point, crop, injury and missed-game distributions
+# with two-sample KS and chi-square tests.
+# Usage: python equivalence.py [--trials N] [--games G] [--seed S] [--alpha A] [--engine python|numpy|all]
+import argparse
+import contextlib
+import io
+import math
+import random
+import sys
+import time
+
+import core
+import season_sim
+from tasks import TASK_CATALOGUE
+
+METRICS = ("points", "crops", "injuries", "missed")
+
+# One test farmer per role: strong in the role's stats, average elsewhere
+PROFILES = {
+    "Lift Tender": {"name": "Lift Tester", "strength": 8, "handy": 4, "stamina": 6, "physical": 5},
+    "Fix Meiser": {"name": "Fix Tester", "strength": 4, "handy": 8, "stamina": 4, "physical": 6},
+    "Speed Runner": {"name": "Speed Tester", "strength": 4, "handy": 4, "stamina": 8, "physical": 4},
+}
+
+def reference_season(farmer, role, games, season, seasonal_crops, farmer_preferences, rng):
+    """One season of a farmer in a team of three, played matchday by matchday through
+    core.simulate_user_matchday() and apply_matchday_result()"""
+    team = {role: farmer}
+    for i, other in enumerate(r for r in sorted(core.REQUIRED_ROLES) if r != role):
+        team[other] = {"name": f"Teammate {i + 1}", "strength": 5, "handy": 5, "stamina": 5, "physical": 5}
+    user_data = {"matchday": 0, "drafted_team": team, "data": []}
+    stories = {}
+    totals = dict.fromkeys(METRICS, 0)
+
+    for _ in range(games):
+        result = core.simulate_user_matchday("reference", user_data, list(team.values()), season, seasonal_crops,
+                                             farmer_preferences, stories, rng=rng)
+        core.apply_matchday_result(user_data, stories, result)
+        focal = next(f for f in result.entry["farmers"] if f["name"] == farmer["name"])
+        if focal["task"] is None:
+            totals["missed"] += 1
+            continue
+        totals["points"] += focal["points_after_catastrophe"]
+        totals["crops"] += focal["crop_points"]
+        totals["injuries"] += 1 if focal["daily_injury_loss"] else 0
+    return totals
+
+def run_reference(farmer, role, trials, games, season, seasonal_crops, farmer_preferences, seed):
+    rng = random.Random(seed)
+    samples = {metric: [] for metric in METRICS}
+    # core.py narrates every roll; keep it off the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(trials):
+            totals = reference_season(farmer, role, games, season, seasonal_crops, farmer_preferences, rng)
+            for metric in METRICS:
+                samples[metric].append(totals[metric])
+    return samples
+
+def run_engine(use_numpy, farmer, role, trials, games, season, seasonal_crops, farmer_preferences, seed):
+    totals = season_sim.season_totals(
+        [farmer], games, seasons=trials, season=season, seasonal_crops=seasonal_crops,
+        farmer_preferences=farmer_preferences, roles=[role], seed=seed, use_numpy=use_numpy
+    )
+    return {metric: totals[metric][0] for metric in METRICS}
+
+def ks_test(a, b):
+    """Two-sample Kolmogorov-Smirnov statistic and asymptotic p-value"""
+    a, b = sorted(a), sorted(b)
+    n, m = len(a), len(b)
+    i = j = 0
+    d = 0.0
+    while i < n and j < m:
+        value = min(a[i], b[j])
+        while i < n and a[i] == value:
+            i += 1
+        while j < m and b[j] == value:
+            j += 1
+        d = max(d, abs(i / n - j / m))
+    effective = math.sqrt(n * m / (n + m))
+    lam = (effective + 0.12 + 0.11 / effective) * d
+    p = 2 * sum((-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam) for k in range(1, 101))
+    return d, min(1.0, max(0.0, p))
+
+def _upper_gamma_regularized(s, x):
+    """Q(s, x), by series below s + 1 and by continued fraction above"""
+    if x <= 0:
+        return 1.0
+    if x < s + 1:
+        term = total = 1.0 / s
+        a = s
+        while term > total * 1e-15:
+            a += 1
+            term *= x / a
+            total += term
+        return max(0.0, 1.0 - total * math.exp(-x + s * math.log(x) - math.lgamma(s)))
+    b = x + 1 - s
+    c = 1 / 1e-300
+    d = 1 / b
+    h = d
+    for i in range(1, 10000):
+        an = -i * (i - s)
+        b += 2
+        d = an * d + b
+        d = 1 / (d if abs(d) > 1e-300 else 1e-300)
+        c = b + an / c
+        c = c if abs(c) > 1e-300 else 1e-300
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(-x + s * math.log(x) - math.lgamma(s)) * h
+
+def chi_square_test(a, b, min_expected=5):
+    """Chi-square homogeneity test on the value counts, merging sparse tail bins"""
+    counts = {}
+    for value in a:
+        counts.setdefault(value, [0, 0])[0] += 1
+    for value in b:
+        counts.setdefault(value, [0, 0])[1] += 1
+
+    # Merge neighbouring values until every bin expects at least min_expected per sample
+    n, m = len(a), len(b)
+    bins, current = [], [0, 0]
+    for value in sorted(counts):
+        current[0] += counts[value][0]
+        current[1] += counts[value][1]
+        if (current[0] + current[1]) * min(n, m) / (n + m) >= min_expected:
+            bins.append(current)
+            current = [0, 0]
+    if current[0] or current[1]:
+        if bins:
+            bins[-1][0] += current[0]
+            bins[-1][1] += current[1]
+        else:
+            bins.append(current)
+    if len(bins) < 2:
+        return 0.0, 1.0
+
+    statistic = 0.0
+    for count_a, count_b in bins:
+        total = count_a + count_b
+        expected_a = total * n / (n + m)
+        expected_b = total * m / (n + m)
+        statistic += (count_a - expected_a) ** 2 / expected_a + (count_b - expected_b) ** 2 / expected_b
+    return statistic, _upper_gamma_regularized((len(bins) - 1) / 2, statistic / 2)
+
+def compare(reference, candidate, alpha):
+    """Rows of (metric, reference mean, candidate mean, delta, KS p, chi-square p, ok)"""
+    rows = []
+    for metric in METRICS:
+        ref_mean = sum(reference[metric]) / len(reference[metric])
+        cand_mean = sum(candidate[metric]) / len(candidate[metric])
+        _, ks_p = ks_test(reference[metric], candidate[metric])
+        _, chi_p = chi_square_test(reference[metric], candidate[metric])
+        rows.append((metric, ref_mean, cand_mean, cand_mean - ref_mean, ks_p, chi_p, min(ks_p, chi_p) >= alpha))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the fast season simulators against core.py")
+    parser.add_argument("--trials", type=int, default=20000, help="seasons per role and engine")
+    parser.add_argument("--games", type=int, default=10, help="games per season")
+    parser.add_argument("--seed", type=int, default=1, help="base seed")
+    parser.add_argument("--alpha", type=float, default=0.001, help="fail a metric when a p-value is below this")
+    parser.add_argument("--engine", choices=("python", "numpy", "all"), default="all")
+    args = parser.parse_args()
+
+    engines = {"python": False, "numpy": True}
+    if args.engine != "all":
+        engines = {args.engine: engines[args.engine]}
+    if "numpy" in engines and season_sim.np is None:
+        print("NumPy is not installed; skipping the numpy engine")
+        engines.pop("numpy")
+
+    season = "summer"
+    seasonal_crops = core.load_seasonal_crops()
+    farmer_preferences = {farmer["name"]: {season: seasonal_crops[season][0]} for farmer in PROFILES.values()}
+    total_games = args.trials * args.games
+    failures = []
+
+    for role in TASK_CATALOGUE:
+        farmer = PROFILES[role]
+        print(f"\n{role} ({farmer['strength']}/{farmer['handy']}/{farmer['stamina']}/{farmer['physical']}), "
+              f"{args.trials} seasons x {args.games} games")
+
+        start = time.perf_counter()
+        reference = run_reference(farmer, role, args.trials, args.games, season, seasonal_crops, farmer_preferences, args.seed)
+        elapsed = time.perf_counter() - start
+        print(f"  {'reference':<10}{total_games / elapsed:>14,.0f} games/s")
+
+        for name, use_numpy in engines.items():
+            start = time.perf_counter()
+            candidate = run_engine(use_numpy, farmer, role, args.trials, args.games, season, seasonal_crops,
+                                   farmer_preferences, args.seed + 1)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<10}{total_games / elapsed:>14,.0f} games/s")
+
+            print(f"    {'metric':<10}{'reference':>11}{name:>11}{'delta':>9}{'KS p':>9}{'chi2 p':>9}")
+            for metric, ref_mean, cand_mean, delta, ks_p, chi_p, ok in compare(reference, candidate, args.alpha):
+                print(f"    {metric:<10}{ref_mean:>11.3f}{cand_mean:>11.3f}{delta:>+9.3f}{ks_p:>9.4f}{chi_p:>9.4f}  {'ok' if ok else 'DIFFERS'}")
+                if not ok:
+                    failures.append(f"{role} / {name} / {metric}")
+
+    if failures:
+        print(f"\n❌ {len(failures)} distribution(s) differ from core.py at alpha={args.alpha}:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ Every engine matches core.py")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# Per-farmer aggregates for the farmer stats tab and farmer profiles.
+# For every drafted farmer the index keeps what each owner's running totals (see
+# totals.py) say about it: role, points, matchdays, best, recent scores and the
+# split by role. It is updated with only the users written, whenever a roster or
+# a matchday commit changes them, and the owners' shares are combined on read.
+import time
+from contextlib import contextmanager
+
+import db
+import storage
+import totals
+
+INDEX_FILE = "farmer_index.json"
+
+def load_index():
+    """The stored index, or None"""
+    if db.enabled():
+        return db.load_farmer_index()
+    return storage.read_json(INDEX_FILE)
+
+def save_index(index):
+    index["updated_at"] = time.time()
+    if db.enabled():
+        return db.save_farmer_index(index)
+    storage.write_json(INDEX_FILE, index)
+
+@contextmanager
+def _locked():
+    """Hold the index's lock, or a db transaction, across a read-modify-write"""
+    if db.enabled():
+        with db.transaction():
+            yield
+    else:
+        with storage.locked(INDEX_FILE):
+            yield
+
+def empty():
+    return {"version": totals.VERSION, "farmers": {}, "users": {}}
+
+def _share(role, record):
+    """What one owner's totals contribute to a farmer they have drafted in role"""
+    record = record or {}
+    return {
+        "role": role,
+        "points": record.get("points", 0),
+        "matchdays": record.get("matchdays", 0),
+        "best": record.get("best", 0),
+        "recent": record.get("recent", []),
+        "roles": record.get("roles", {})
+    }
+
+def apply_user(index, username, user_stats):
+    """Replace the user's shares in the index; None removes the user"""
+    for name in index["users"].pop(username, {}).values():
+        owners = index["farmers"].get(name, {})
+        owners.pop(username, None)
+        if not owners:
+            index["farmers"].pop(name, None)
+    if user_stats is None:
+        return index
+
+    farmers = totals.of(user_stats)["farmers"]
+    team = {}
+    for role, info in user_stats.get("drafted_team", {}).items():
+        if info and info.get("name"):
+            team[role] = info["name"]
+            index["farmers"].setdefault(info["name"], {})[username] = _share(role, farmers.get(info["name"]))
+    index["users"][username] = team
+    return index
+
+def build(users):
+    """The index of every user (username -> user stats)"""
+    index = empty()
+    for username, user_stats in users.items():
+        apply_user(index, username, user_stats)
+    return index
+
+def rebuild():
+    from stats import load_stats
+    index = build(load_stats().get("users", {}))
+    save_index(index)
+    return index
+
+def _user_shares(index, username):
+    team = index["users"].get(username)
+    if team is None:
+        return None
+    return team, {name: index["farmers"].get(name, {}).get(username) for name in team.values()}
+
+def update_users(users):
+    """Apply the given users' new stats (username -> user stats, None when removed).
+
+    The index is only written when one of their shares changed.
+    """
+    if not users:
+        return load_index()
+    # The index is only rebuilt when its version changes, so a lost update would stay lost
+    with _locked():
+        index = load_index()
+        if index is None or index.get("version") != totals.VERSION:
+            return rebuild()
+        before = {username: _user_shares(index, username) for username in users}
+        for username, user_stats in users.items():
+            apply_user(index, username, user_stats)
+        if any(_user_shares(index, username) != shares for username, shares in before.items()):
+            save_index(index)
+    return index
+
+def get_index():
+    """The stored index, built from every user first when missing or out of date"""
+    index = load_index()
+    if index is None or index.get("version") != totals.VERSION:
+        index = rebuild()
+    return index
+
+def summarize(name, owners):
+    """A farmer's aggregates over its owners; the owner shown is the one with the most matchdays"""
+    owner = min(owners, key=lambda username: (-owners[username]["matchdays"], username))
+    points = sum(share["points"] for share in owners.values())
+    matchdays = sum(share["matchdays"] for share in owners.values())
+    recent = [p for share in owners.values() for p in share["recent"]]
+    roles = {}
+    for share in owners.values():
+        for role, split in share["roles"].items():
+            total = roles.setdefault(role, {"points": 0, "matchdays": 0})
+            total["points"] += split["points"]
+            total["matchdays"] += split["matchdays"]
+    for split in roles.values():
+        split["average"] = round(split["points"] / split["matchdays"], 2) if split["matchdays"] else 0
+    return {
+        "name": name,
+        "owner": owner,
+        "role": owners[owner]["role"],
+        "total_points": points,
+        "matchdays": matchdays,
+        "average": round(points / matchdays, 2) if matchdays else "-",
+        "rolling_average": round(sum(recent) / len(recent), 2) if recent else "-",
+        "best": max(share["best"] for share in owners.values()),
+        "roles": roles
+    }
+
+def farmer_summaries(viewer=None):
+    """Name -> aggregates of every drafted farmer, with vs_your_role_diff against the
+    viewer's farmer in the same role (None for the viewer's own farmers)"""
+    index = get_index()
+    summaries = {name: summarize(name, owners) for name, owners in index["farmers"].items()}
+    viewer_team = index["users"].get(viewer, {})
+    for summary in summaries.values():
+        mine = summaries.get(viewer_team.get(summary["role"]))
+        if summary["owner"] == viewer or mine is None:
+            summary["vs_your_role_diff"] = None
+        else:
+            summary["vs_your_role_diff"] = summary["total_points"] - mine["total_points"]
+    return summaries
+
+def farmer_summary(name, viewer=None):
+    """One farmer's aggregates as in farmer_summaries(), or None when nobody has drafted it"""
+    index = get_index()
+    if name not in index["farmers"]:
+        return None
+    summary = summarize(name, index["farmers"][name])
+    mine = index["users"].get(viewer, {}).get(summary["role"])
+    summary["vs_your_role_diff"] = None
+    if summary["owner"] != viewer and mine in index["farmers"]:
+        summary["vs_your_role_diff"] = summary["total_points"] - summarize(mine, index["farmers"][mine])["total_points"]
+    return summary
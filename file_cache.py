@@ -0,0 +1,87 @@
+# Process-wide cache for read-mostly JSON files.
+# Parsed documents are kept per path and revalidated against st_mtime_ns and size
+# on every load. They are handed out as read-only views; copy.deepcopy() (or
+# dict()/list() for one level) gives a mutable copy.
+import copy
+import json
+import os
+import threading
+
+class ReadOnlyError(TypeError):
+    pass
+
+def _read_only(self, *args, **kwargs):
+    raise ReadOnlyError("cached JSON documents are read-only; copy before modifying")
+
+class FrozenDict(dict):
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+class FrozenList(list):
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(value, memo) for value in self]
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+def freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+_lock = threading.Lock()
+_entries = {}
+_counters = {"hits": 0, "misses": 0}
+
+def load_json(path, default=None):
+    """Parsed contents of path as a read-only view, or default if the file does not exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return default
+    signature = (st.st_mtime_ns, st.st_size)
+
+    with _lock:
+        entry = _entries.get(path)
+        if entry is not None and entry[0] == signature:
+            _counters["hits"] += 1
+            return entry[1]
+
+    try:
+        with open(path, "r") as f:
+            data = freeze(json.load(f))
+    except FileNotFoundError:
+        return default
+
+    with _lock:
+        _counters["misses"] += 1
+        _entries[path] = (signature, data)
+    return data
+
+def invalidate(path=None):
+    """Forget one cached path, or every path"""
+    with _lock:
+        if path is None:
+            _entries.clear()
+        else:
+            _entries.pop(path, None)
+
+def counters():
+    """Hit/miss counts since the process started"""
+    with _lock:
+        return dict(_counters, entries=len(_entries))
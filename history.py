@@ -0,0 +1,175 @@
+# Append-only matchday history: one JSON Lines segment per user plus an offset index.
+# The index records the byte offset of every entry and which entries each farmer
+# appears in, so the last N matchdays, a three-matchday cycle or one farmer's
+# matchdays are read with seeks instead of parsing the whole history.
+import json
+import os
+import tempfile
+from urllib.parse import quote
+
+def history_dir():
+    """The logs' directory, next to the shards under FARMINGTON_STATS_DIR (shards.STATS_DIR)"""
+    import shards
+    return os.path.join(shards.STATS_DIR, "history")
+
+def _segment_path(username):
+    return os.path.join(history_dir(), quote(username, safe="") + ".jsonl")
+
+def _index_path(username):
+    return os.path.join(history_dir(), quote(username, safe="") + ".idx.json")
+
+def _empty_index():
+    return {"offsets": [], "matchdays": [], "farmers": {}, "size": 0}
+
+def load_index(username):
+    try:
+        with open(_index_path(username), "r") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return _empty_index()
+
+    # An append that never reached its index is dropped on the next write
+    try:
+        if os.path.getsize(_segment_path(username)) < index["size"]:
+            return _empty_index()
+    except FileNotFoundError:
+        return _empty_index()
+    return index
+
+def _save_index(username, index):
+    fd, tmp_path = tempfile.mkstemp(dir=history_dir(), prefix=".tmp_", suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_path, _index_path(username))
+
+def count(username):
+    return len(load_index(username)["offsets"])
+
+def _read_at(username, index, positions):
+    """Read the entries at the given sequence positions, in order"""
+    if not positions:
+        return []
+    entries = []
+    with open(_segment_path(username), "rb") as f:
+        for seq in positions:
+            f.seek(index["offsets"][seq])
+            entries.append(json.loads(f.readline()))
+    return entries
+
+def read_range(username, start, stop=None):
+    """Entries start..stop (slice semantics, negative indexes allowed)"""
+    index = load_index(username)
+    return _read_at(username, index, range(len(index["offsets"]))[start:stop])
+
+def read_all(username):
+    index = load_index(username)
+    if not index["offsets"]:
+        return []
+    entries = []
+    with open(_segment_path(username), "rb") as f:
+        f.seek(0)
+        for _ in index["offsets"]:
+            entries.append(json.loads(f.readline()))
+    return entries
+
+def read_last(username, n):
+    """The last n matchday entries, oldest first"""
+    if n <= 0:
+        return []
+    return read_range(username, -n)
+
+def read_cycle(username, cycle):
+    """The three matchday entries that make up matchup cycle k"""
+    return read_range(username, cycle * 3, cycle * 3 + 3)
+
+def read_for_farmer(username, farmer_name):
+    """Every matchday entry the farmer played in"""
+    index = load_index(username)
+    return _read_at(username, index, index["farmers"].get(farmer_name, []))
+
+def _write_entries(f, index, entries):
+    for entry in entries:
+        seq = len(index["offsets"])
+        index["offsets"].append(f.tell())
+        index["matchdays"].append(entry.get("matchday"))
+        for farmer in entry.get("farmers", []):
+            seqs = index["farmers"].setdefault(farmer.get("name", ""), [])
+            if not seqs or seqs[-1] != seq:
+                seqs.append(seq)
+        f.write(json.dumps(entry, separators=(",", ":")).encode() + b"\n")
+    f.flush()
+    os.fsync(f.fileno())
+    index["size"] = f.tell()
+
+def _stage_append(username, index, entries):
+    """Append entries past the end the stored index records, where readers do not see them yet"""
+    os.makedirs(history_dir(), exist_ok=True)
+    with open(_segment_path(username), "ab") as f:
+        f.truncate(index["size"])
+        f.seek(index["size"])
+        _write_entries(f, index, entries)
+    return {"username": username, "index": index}
+
+def _stage_rewrite(username, entries):
+    """Write the whole log to a temp segment that publish() swaps in"""
+    os.makedirs(history_dir(), exist_ok=True)
+    index = _empty_index()
+    fd, tmp_path = tempfile.mkstemp(dir=history_dir(), prefix=".tmp_", suffix=".jsonl")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            _write_entries(f, index, entries)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return {"username": username, "index": index, "segment": tmp_path}
+
+def prepare(username, entries, start=0):
+    """Stage the writes that make the log hold exactly entries, or None when it already does.
+
+    History only ever grows, so usually only the new tail is appended; a
+    shorter or diverging history (a season reset or a rewrite) is written
+    again in full. entries may be only the tail of the history, from position
+    start on, as long as the log already reaches into it. Nothing is visible
+    to readers until publish().
+    """
+    index = load_index(username)
+    stored = len(index["offsets"])
+    if start:
+        if not start < stored <= start + len(entries) or \
+                index["matchdays"][stored - 1] != entries[stored - start - 1].get("matchday"):
+            raise ValueError(f"History log of {username} does not reach the entries from position {start}")
+    elif stored and (len(entries) < stored or index["matchdays"][stored - 1] != entries[stored - 1].get("matchday")):
+        return _stage_rewrite(username, entries)
+    if start + len(entries) == stored and os.path.exists(_index_path(username)):
+        return None
+    return _stage_append(username, index, entries[stored - start:])
+
+def publish(pending):
+    """Make a staged write visible; the offset index is written last"""
+    if pending is None:
+        return
+    username = pending["username"]
+    if "segment" in pending:
+        # Old offsets must never point into the new segment
+        if os.path.exists(_index_path(username)):
+            os.remove(_index_path(username))
+        os.replace(pending["segment"], _segment_path(username))
+    _save_index(username, pending["index"])
+
+def discard(pending):
+    """Drop a staged write; appended bytes past the indexed end are truncated by the next write"""
+    if pending is not None and "segment" in pending and os.path.exists(pending["segment"]):
+        os.remove(pending["segment"])
+
+def sync(username, entries):
+    """Make the log hold exactly entries"""
+    publish(prepare(username, entries))
+
+def rewrite(username, entries):
+    """Write the log again from scratch, for migrations that change old entries"""
+    publish(_stage_rewrite(username, entries))
+
+def delete(username):
+    for path in (_segment_path(username), _index_path(username)):
+        if os.path.exists(path):
+            os.remove(path)
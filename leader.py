@@ -0,0 +1,73 @@
+# Scheduler leadership: every worker starts the BackgroundScheduler, but only the
+# process holding the lease runs the automated matchday. The lease is a row in
+# the SQLite meta table or scheduler_lease.json, claimed under a lock; a holder
+# that stops renewing loses it once it expires and another worker takes over.
+import os
+import socket
+import time
+from contextlib import contextmanager
+
+import db
+import storage
+
+LEASE_FILE = "scheduler_lease.json"
+LEASE_SECONDS = int(os.environ.get("FARMINGTON_LEASE_SECONDS", 90))
+
+def owner_id():
+    """Identifies this process; read per call so forked workers get their own"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+@contextmanager
+def _lease_document():
+    """The {"lease": ...} document, locked for a read-modify-write and written back
+    only when the lease changed, so polling workers do not rewrite it"""
+    if db.enabled():
+        with db.transaction():
+            lease = db.load_scheduler_lease()
+            document = {"lease": lease}
+            yield document
+            if document["lease"] != lease:
+                db.save_scheduler_lease(document["lease"])
+    else:
+        with storage.locked(LEASE_FILE):
+            stored = storage.read_json(LEASE_FILE, {})
+            document = dict(stored)
+            yield document
+            if document != stored:
+                storage.write_json(LEASE_FILE, document)
+
+def acquire():
+    """Claim or renew the lease; True if this process holds it afterwards"""
+    now = time.time()
+    me = owner_id()
+    with _lease_document() as document:
+        lease = document.get("lease")
+        if lease and lease["owner"] != me and lease["expires_at"] > now:
+            return False
+        acquired_at = lease["acquired_at"] if lease and lease["owner"] == me else now
+        document["lease"] = {
+            "owner": me,
+            "acquired_at": acquired_at,
+            "renewed_at": now,
+            "expires_at": now + LEASE_SECONDS
+        }
+    return True
+
+def release():
+    """Give the lease up if this process holds it, so another worker can take over at once"""
+    with _lease_document() as document:
+        lease = document.get("lease")
+        if lease and lease["owner"] == owner_id():
+            document["lease"] = None
+
+def current():
+    """The current lease (None if nobody has claimed it) plus whether it is live"""
+    if db.enabled():
+        lease = db.load_scheduler_lease()
+    else:
+        lease = storage.read_json(LEASE_FILE, {}).get("lease")
+    return {
+        "lease": lease,
+        "active": bool(lease) and lease["expires_at"] > time.time(),
+        "this_process": owner_id()
+    }
@@ -0,0 +1,152 @@
+# Leaderboards kept sorted between page views instead of rebuilt from every user.
+# The global board holds the top LEADERBOARD_SIZE users by season points; each league
+# board ranks the league's players with the playoff tier keys. The global board is
+# updated with only the users whose points changed, whenever they are written or a
+# matchday commits; a league board is rebuilt from its players' running totals once
+# the league's matchday, players or playoff records move on. Both are served a page
+# at a time, so a page costs the same however many users there are.
+import os
+import time
+from contextlib import contextmanager
+
+import db
+import storage
+
+LEADERBOARD_SIZE = int(os.environ.get("FARMINGTON_LEADERBOARD_SIZE", 100))
+LEADERBOARD_PAGE_SIZE = int(os.environ.get("FARMINGTON_LEADERBOARD_PAGE", 25))
+GLOBAL = "global"
+
+def _board_path(scope):
+    return f"leaderboard_{scope}.json"
+
+def load_board(scope):
+    """The stored board for a league code or GLOBAL, or None"""
+    if db.enabled():
+        return db.load_leaderboard(scope)
+    return storage.read_json(_board_path(scope))
+
+def save_board(scope, board):
+    board["updated_at"] = time.time()
+    if db.enabled():
+        return db.save_leaderboard(scope, board)
+    storage.write_json(_board_path(scope), board)
+
+@contextmanager
+def _locked(scope):
+    """Hold the board's lock, or a db transaction, across a read-modify-write"""
+    if db.enabled():
+        with db.transaction():
+            yield
+    else:
+        with storage.locked(_board_path(scope)):
+            yield
+
+def _rank(entries):
+    return sorted(entries, key=lambda entry: (-entry["total_points"], entry["username"]))
+
+def rebuild_global(user_totals=None):
+    """Rank every user again; used when the board is missing or someone on it lost points"""
+    if user_totals is None:
+        from stats import load_user_totals
+        user_totals = load_user_totals()
+    ranked = _rank({"username": username, "total_points": totals["points"]} for username, totals in user_totals.items())
+    board = {"entries": ranked[:LEADERBOARD_SIZE], "complete": len(ranked) <= LEADERBOARD_SIZE}
+    save_board(GLOBAL, board)
+    return board
+
+def update_global(points):
+    """Apply the new season points of the given users (username -> points, None when removed).
+
+    Only the board's own entries are re-ranked. When a user on an incomplete
+    board loses points, someone below the cut may now belong on it, so the
+    board is rebuilt from every user.
+    """
+    if not points:
+        return load_board(GLOBAL)
+    # The board has no staleness key, so an update lost to a concurrent writer would stay lost
+    with _locked(GLOBAL):
+        board = load_board(GLOBAL)
+        if board is None:
+            return rebuild_global()
+
+        entries = {entry["username"]: entry for entry in board["entries"]}
+        for username, user_points in points.items():
+            previous = entries.pop(username, None)
+            if previous and not board["complete"] and (user_points is None or user_points < previous["total_points"]):
+                return rebuild_global()
+            if user_points is not None:
+                entries[username] = {"username": username, "total_points": user_points}
+
+        ranked = _rank(entries.values())
+        updated = {"entries": ranked[:LEADERBOARD_SIZE], "complete": board["complete"] and len(ranked) <= LEADERBOARD_SIZE}
+        if updated["entries"] != board["entries"] or updated["complete"] != board["complete"]:
+            save_board(GLOBAL, updated)
+    return updated
+
+def _league_key(league):
+    """What a league board depends on besides the players' points, which only change with these"""
+    return {
+        "matchday": league.get("matchday", 0),
+        "players": league.get("players", []),
+        "records": league.get("playoff_records", {}) if league.get("use_playoffs", True) else {},
+        "brackets": league.get("playoff_brackets", {}) if league.get("brackets_created", False) else None
+    }
+
+def build_league_board(league, user_totals):
+    """The league's ranking: bracket tier, then wins, then points in playoff leagues; points otherwise"""
+    use_playoffs = league.get("use_playoffs", True)
+    records = league.get("playoff_records", {})
+    brackets = league.get("playoff_brackets", {}) if league.get("brackets_created", False) else None
+
+    entries = []
+    for player in league.get("players", []):
+        entry = {"username": player, "total_points": user_totals.get(player, {}).get("points", 0)}
+        if use_playoffs:
+            record = records.get(player, {"wins": 0, "losses": 0, "ties": 0})
+            entry.update({"wins": record["wins"], "losses": record["losses"], "ties": record["ties"]})
+        entries.append(entry)
+
+    if use_playoffs and brackets is not None:
+        def tier(player):
+            return 2 if player in brackets.get("winners", []) else 1 if player in brackets.get("losers", []) else 0
+        entries.sort(key=lambda e: (tier(e["username"]), e["wins"], e["total_points"]), reverse=True)
+    elif use_playoffs:
+        entries.sort(key=lambda e: (e["wins"], e["total_points"]), reverse=True)
+    else:
+        entries.sort(key=lambda e: e["total_points"], reverse=True)
+    return {**_league_key(league), "entries": entries}
+
+def refresh_league(league, user_totals=None):
+    """Rebuild and store a league's board; players missing from user_totals are read from their records"""
+    from stats import get_user_totals
+    user_totals = dict(user_totals or {})
+    for player in league.get("players", []):
+        if player not in user_totals:
+            user_totals[player] = get_user_totals(player)
+    board = build_league_board(league, user_totals)
+    save_board(league["code"], board)
+    return board
+
+def league_board(league):
+    """The league's board, rebuilt first if the league has moved on since it was stored"""
+    board = load_board(league["code"])
+    if board is None or any(board.get(k) != v for k, v in _league_key(league).items()):
+        board = refresh_league(league)
+    return board
+
+def global_board():
+    board = load_board(GLOBAL)
+    return board if board is not None else rebuild_global()
+
+def record_matchday(users, leagues):
+    """Update the boards after a matchday commit; users maps username -> running totals"""
+    update_global({username: totals["points"] for username, totals in users.items()})
+    for league in leagues:
+        refresh_league(league, users)
+
+def board_page(board, cursor=0, limit=LEADERBOARD_PAGE_SIZE):
+    """(entries with their rank, next cursor or None) starting at rank cursor + 1"""
+    entries = board["entries"][cursor:cursor + limit]
+    ranked = [{**entry, "rank": cursor + i + 1} for i, entry in enumerate(entries)]
+    next_cursor = cursor + limit if cursor + limit < len(board["entries"]) else None
+    return ranked, next_cursor
@@ -1,7 +1,11 @@
 import json
 import os
-import random
-from tasks import get_task_for_job
+from contextlib import contextmanager
+import db
+import file_cache
+import storage
+import streams
+from tasks import roll_task_points, best_role
 
 MARKET_STATS_FILE = "market_stats.json"
 
@@ -10,14 +14,29 @@ class MarketManager:
         self.stats_file = MARKET_STATS_FILE
     
     def load_market_stats(self):
+        if db.enabled():
+            return db.load_market_stats()
         if not os.path.exists(self.stats_file):
             return {}
         with open(self.stats_file, "r") as f:
             return json.load(f)
     
     def save_market_stats(self, stats):
-        with open(self.stats_file, "w") as f:
-            json.dump(stats, f, indent=4)
+        if db.enabled():
+            return db.save_market_stats(stats)
+        storage.write_json(self.stats_file, stats)
+    
+    @contextmanager
+    def update_market_stats(self):
+        """Load, modify and save the market stats under one lock; yields the stats dict"""
+        if db.enabled():
+            with db.transaction():
+                stats = db.load_market_stats()
+                yield stats
+                db.save_market_stats(stats)
+        else:
+            with storage.transaction(self.stats_file, {}) as stats:
+                yield stats
     
     def get_market_stats(self):
         """Get performance statistics for undrafted farmers"""
@@ -41,46 +60,39 @@ class MarketManager:
     
     def update_farmer_performance(self, farmer_name, points, role):
         """Update performance stats for a market farmer (max 5 matchdays)"""
-        stats = self.load_market_stats()
-        
-        if farmer_name not in stats:
-            stats[farmer_name] = {
-                "total_points": 0,
-                "matchdays_played": 0,
-                "roles_played": {},
-                "recent_form": []
-            }
+        with self.update_market_stats() as stats:
+            if farmer_name not in stats:
+                stats[farmer_name] = {
+                    "total_points": 0,
+                    "matchdays_played": 0,
+                    "roles_played": {},
+                    "recent_form": []
+                }
         
-        farmer_stats = stats[farmer_name]
+            farmer_stats = stats[farmer_name]
         
-        # Only track up to 5 matchdays
-        if farmer_stats["matchdays_played"] < 5:
-            farmer_stats["total_points"] += points
-            farmer_stats["matchdays_played"] += 1
+            # Only track up to 5 matchdays
+            if farmer_stats["matchdays_played"] < 5:
+                farmer_stats["total_points"] += points
+                farmer_stats["matchdays_played"] += 1
             
-            # Track role performance
-            if role not in farmer_stats["roles_played"]:
-                farmer_stats["roles_played"][role] = {"count": 0, "total_points": 0}
-            farmer_stats["roles_played"][role]["count"] += 1
-            farmer_stats["roles_played"][role]["total_points"] += points
+                # Track role performance
+                if role not in farmer_stats["roles_played"]:
+                    farmer_stats["roles_played"][role] = {"count": 0, "total_points": 0}
+                farmer_stats["roles_played"][role]["count"] += 1
+                farmer_stats["roles_played"][role]["total_points"] += points
             
-            # Update recent form (exactly 5 entries max)
-            farmer_stats["recent_form"].append(points)
-        else:
-            # Roll over - remove oldest, add newest
-            farmer_stats["total_points"] = farmer_stats["total_points"] - farmer_stats["recent_form"][0] + points
-            farmer_stats["recent_form"] = farmer_stats["recent_form"][1:] + [points]
-        
-        self.save_market_stats(stats)
+                # Update recent form (exactly 5 entries max)
+                farmer_stats["recent_form"].append(points)
+            else:
+                # Roll over - remove oldest, add newest
+                farmer_stats["total_points"] = farmer_stats["total_points"] - farmer_stats["recent_form"][0] + points
+                farmer_stats["recent_form"] = farmer_stats["recent_form"][1:] + [points]
 
 def get_undrafted_farmers():
     """Get list of farmers not currently drafted by any user"""
     # Load farmer pool
-    try:
-        with open("farmer_pool.json", "r") as f:
-            farmer_pool = json.load(f)
-    except FileNotFoundError:
-        return []
+    farmer_pool = file_cache.load_json("farmer_pool.json", [])
     
     # Load user stats to see who's drafted
     from stats import load_stats
@@ -101,34 +113,29 @@ def get_undrafted_farmers():
     return undrafted
 
 def assign_market_farmers_to_roles():
-    """Assign farmers to their optimal roles based on best stats (excluding physical)"""
+    """Assign farmers to the role with the highest expected task points"""
     undrafted = get_undrafted_farmers()
     
     market_assignments = {}
     for farmer in undrafted:
-        # Find best stat (excluding physical)
-        stats = {
-            "Fix Meiser": farmer["handy"],
-            "Speed Runner": farmer["stamina"], 
-            "Lift Tender": farmer["strength"]
-        }
-        
-        # Assign to role with highest stat
-        suggested_role = max(stats.keys(), key=lambda x: stats[x])
-        
+        suggested_role = best_role(farmer["strength"], farmer["handy"], farmer["stamina"])
+
         market_assignments[farmer["name"]] = {
             "farmer": farmer,
             "role": suggested_role
         }
     
     # Save assignments
-    with open("market_assignments.json", "w") as f:
-        json.dump(market_assignments, f, indent=4)
+    storage.write_json("market_assignments.json", market_assignments)
     
     return market_assignments
 
-def run_market_matchday():
-    """Run matchday simulation for market farmers"""
+def run_market_matchday(seed=None):
+    """Run matchday simulation for market farmers.
+
+    Each farmer draws from its own stream of seed; pass a seed printed by an
+    earlier run to replay it.
+    """
     try:
         with open("market_assignments.json", "r") as f:
             assignments = json.load(f)
@@ -136,26 +143,29 @@ def run_market_matchday():
         return
     
     market_manager = MarketManager()
+    if seed is None:
+        seed = streams.new_seed()
+    print(f"[Market] Matchday seed {seed}")
     
     # Run each farmer's performance
     for farmer_name, assignment in assignments.items():
         farmer = assignment["farmer"]
         role = assignment["role"]
+        rng = streams.stream(seed, farmer_name)
         
         # Simulate performance using existing task system
-        points, results = get_task_for_job(
+        points = roll_task_points(
             role,
             farmer["strength"],
             farmer["handy"],
             farmer["stamina"],
-            farmer["name"],
-            []  # No other farmers for market simulation
+            rng
         )
         
         # Apply injury/catastrophe simulation (simplified)
         injury_loss = 0
-        if random.randint(1, 3) == 3 and random.randint(1, 11) > farmer["physical"]:
-            injury_loss = random.randint(1, 2)
+        if rng.randint(1, 3) == 3 and rng.randint(1, 11) > farmer["physical"]:
+            injury_loss = rng.randint(1, 2)
         
         final_points = max(0, points - injury_loss)
         
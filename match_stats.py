@@ -0,0 +1,88 @@
+# The matchday statistics shown on the home page: points by farmer and the matchday
+# history table. The running figures of each row (injuries, injury points and
+# average to date) are summed in the same pass that builds the rows, and the
+# preferred-crop flag is stored when the matchday is simulated, so rendering is a
+# single pass over the entries. The rendered fragment is cached per user and
+# history version.
+from collections import OrderedDict
+
+from flask import render_template
+
+import core
+import totals
+from stats import get_user_stats, get_user_totals
+
+# username -> (history version, fragment); the least recently viewed users are dropped
+CACHE_SIZE = 256
+_cache = OrderedDict()
+
+def matchday_rows(entries, farmer_preferences=None):
+    """One row per matchday, newest first, with the figures of each farmer"""
+    # name -> [injuries, injury points, points, matchdays] up to the current entry
+    running = {}
+    rows = []
+    for entry in entries:
+        season = entry["season"]
+        daily_crop = entry.get("daily_crop", "N/A")
+        farmers = []
+        for farmer in entry["farmers"]:
+            preferred = farmer.get("preferred_crop")
+            if preferred is None:
+                if farmer_preferences is None:
+                    farmer_preferences = core.load_farmer_crop_preferences()
+                preferred = farmer_preferences.get(farmer["name"], {}).get(season.lower(), "").lower() == daily_crop.lower()
+            to_date = running.setdefault(farmer["name"], [0, 0, 0, 0])
+            to_date[0] += farmer.get("injuries_this_season", 0)
+            to_date[1] += farmer.get("injury_points_lost", 0)
+            to_date[2] += farmer["points_after_catastrophe"]
+            to_date[3] += 1
+            farmers.append({
+                "name": farmer["name"],
+                "job": farmer["job"],
+                "total": farmer["points_after_catastrophe"],
+                "crop_points": farmer.get("crop_points", 0),
+                "task_points": farmer["points_after_catastrophe"] - farmer.get("crop_points", 0),
+                "catastrophe_loss": farmer.get("catastrophe_loss", 0),
+                "affected": entry["affected_farmer"] == farmer["name"],
+                "injury_loss": farmer.get("daily_injury_loss", 0),
+                "injuries": to_date[0],
+                "injury_points": to_date[1],
+                "average": to_date[2] / to_date[3],
+                "preferred": preferred
+            })
+        rows.append({
+            "matchday": entry["matchday"],
+            "season": season,
+            "daily_crop": daily_crop,
+            "farmers": farmers,
+            "total": sum(farmer["total"] for farmer in farmers)
+        })
+    rows.reverse()
+    return rows
+
+def farmer_rows(user_totals):
+    """(name, points, matchdays, job) for each farmer, most points first"""
+    farmers = user_totals["farmers"]
+    ordered = sorted(farmers, key=lambda name: farmers[name]["points"], reverse=True)
+    return [(name, farmers[name]["points"], farmers[name]["matchdays"], farmers[name]["job"] or "N/A") for name in ordered]
+
+def match_stats_html(username):
+    """The rendered statistics fragment, from the cache while the user's history is unchanged"""
+    user_totals = get_user_totals(username)
+    version = (user_totals["entries"], user_totals["last_matchday"], user_totals["points"])
+    cached = _cache.get(username)
+    if cached and cached[0] == version:
+        _cache.move_to_end(username)
+        return cached[1]
+
+    user_stats = get_user_stats(username)
+    html = render_template(
+        "components/match_stats.html",
+        farmers=farmer_rows(totals.of(user_stats)),
+        matchdays=matchday_rows(user_stats.get("data", []))
+    )
+    _cache[username] = (version, html)
+    _cache.move_to_end(username)
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return html
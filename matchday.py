@@ -0,0 +1,597 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import core
+import db
+import farmer_index
+import leaderboard
+import shards
+import storage
+import streams
+import totals
+from request_cache import cached_load, invalidate, invalidates
+from stats import STATS_FILE, STORY_FILE, get_recent_matchdays, get_user_record, get_user_stats, load_stats, load_stories
+
+LEAGUES_FILE = "leagues.json"
+GLOBAL_MATCHDAY_FILE = "global_matchday.json"
+
+# Number of processes used to simulate leagues in parallel (1 runs them serially)
+MATCHDAY_WORKERS = int(os.environ.get("MATCHDAY_WORKERS", os.cpu_count() or 1))
+
+# Default seconds between a league's matchdays; a league may set its own "matchday_interval"
+MATCHDAY_INTERVAL = int(os.environ.get("MATCHDAY_INTERVAL", 120))
+
+@cached_load("global_matchday")
+def get_global_matchday():
+    """The legacy matchday counter shared by every league, before leagues kept their own"""
+    if db.enabled():
+        return db.get_global_matchday()
+    try:
+        with open(GLOBAL_MATCHDAY_FILE, "r") as f:
+            data = json.load(f)
+            return data.get("current_matchday", 0)
+    except FileNotFoundError:
+        return 0
+
+@invalidates("global_matchday")
+def set_global_matchday(matchday):
+    """Set the legacy global matchday counter"""
+    if db.enabled():
+        return db.set_global_matchday(matchday)
+    storage.write_json(GLOBAL_MATCHDAY_FILE, {"current_matchday": matchday})
+
+def get_league_matchday(league):
+    """The league's own matchday counter.
+
+    Leagues that have not advanced since per-league clocks were introduced
+    still read the legacy global counter.
+    """
+    if "matchday" in league:
+        return league["matchday"]
+    return get_global_matchday()
+
+def matchday_interval(league):
+    return league.get("matchday_interval", MATCHDAY_INTERVAL)
+
+def _stagger_offset(league_code, interval):
+    """A stable offset into the interval so leagues are not all due in the same second"""
+    digest = hashlib.sha1(league_code.encode()).digest()
+    return int.from_bytes(digest[:4], "big") % max(1, interval)
+
+def start_league_clock(league, now=None):
+    """Reset the league to matchday 0 and schedule its first matchday one staggered interval away"""
+    if now is None:
+        now = time.time()
+    interval = matchday_interval(league)
+    league["matchday"] = 0
+    league["next_matchday_at"] = now + interval + _stagger_offset(league.get("code", ""), interval)
+
+def schedule_next_matchday(league, now=None):
+    """Move the league's clock one interval on, keeping its phase unless it has fallen behind"""
+    if now is None:
+        now = time.time()
+    interval = matchday_interval(league)
+    next_at = league.get("next_matchday_at")
+    if next_at is None:
+        next_at = now + _stagger_offset(league.get("code", ""), interval)
+    else:
+        next_at += interval
+    league["next_matchday_at"] = next_at if next_at > now else now + interval
+
+def due_leagues(leagues, now=None):
+    """Codes of the active leagues whose next matchday is due"""
+    if now is None:
+        now = time.time()
+    return [
+        code for code, league in leagues.items()
+        if league_is_active(league) and league.get("next_matchday_at", 0) <= now
+    ]
+
+def league_is_active(league):
+    return bool(league) and league.get("status") != "finished" and league.get("draft_complete") and \
+        get_league_matchday(league) < league.get("matchdays", 30)
+
+def has_complete_team(user_data):
+    """Check if all required roles are filled"""
+    drafted_team = user_data.get("drafted_team", {})
+    return bool(drafted_team) and all(
+        role in drafted_team and
+        isinstance(drafted_team[role], dict) and
+        drafted_team[role].get("name")
+        for role in core.REQUIRED_ROLES
+    )
+
+
+def _load_recent_user(username):
+    """The user's record with only its last matchday entry as "data", from position
+    "history_start" of the history; the whole history when the stored totals do not
+    describe it. None when nothing is stored for the user."""
+    record = dict(get_user_record(username))
+    user_totals = record.get("totals") or {}
+    recent = get_recent_matchdays(username, 1)
+    if user_totals.get("version") != totals.VERSION or user_totals.get("entries", 0) != 0 and \
+            (not recent or recent[-1].get("matchday") != user_totals.get("last_matchday")):
+        record = get_user_stats(username)
+    else:
+        record["data"] = recent
+        record["history_start"] = user_totals.get("entries", 0) - len(recent)
+    if not record.get("drafted_team") and not record.get("data"):
+        return None
+    return record
+
+class MatchdayState:
+    """Every store a matchday touches, loaded once and committed once.
+
+    Only the players of league_codes (None for every league) are loaded. With
+    the database or the sharded layout each user carries just the last entry of
+    their history (see _load_recent_user()); the running totals cover the rest.
+    """
+
+    def __init__(self, league_codes=None):
+        self.leagues = core.load_leagues()
+        if league_codes is None:
+            league_codes = list(self.leagues)
+        players = {p for code in league_codes for p in self.leagues.get(code, {}).get("players", [])}
+        if db.enabled() or shards.enabled():
+            users = {username: _load_recent_user(username) for username in sorted(players)}
+            self.stats = {"users": {username: user for username, user in users.items() if user is not None}}
+        else:
+            # One document holds every user's history, so it is read whole anyway
+            stats = load_stats()
+            self.stats = {"users": {username: user for username, user in stats["users"].items() if username in players}}
+        # Stored history length of the users loaded with a tail, to spot a reset during the matchday
+        self.entries = {username: user["totals"]["entries"] for username, user in self.stats["users"].items()
+                        if "history_start" in user}
+        self.stories = load_stories()
+        self.seasonal_crops = core.load_seasonal_crops()
+        self.farmer_preferences = core.load_farmer_crop_preferences()
+        # League code -> players simulated this matchday
+        self.processed = {}
+
+    def is_active(self, league_code):
+        return league_is_active(self.leagues.get(league_code))
+
+def simulate_league(league, users, stories, farmer_pool, seasonal_crops, farmer_preferences, league_matchday):
+    """Simulate one matchday for every player of a league.
+
+    Works on copies of the league's users and stories, so a failure leaves the
+    caller's data untouched. Injury carry-over (miss_days) is resolved within
+    the league only. Each player and farmer draws from its own stream keyed by
+    the league seed and matchday, so the same inputs always give the same
+    matchday. Returns (updated_users, updated_stories, processed).
+    """
+    season = league.get("season", "summer")
+    players = league.get("players", [])
+    league_users = copy.deepcopy({p: users[p] for p in players if p in users})
+    league_stories = copy.deepcopy({p: stories[p] for p in players if p in stories})
+    processed = []
+
+    for username in players:
+        user_data = league_users.get(username)
+        if not user_data or not has_complete_team(user_data):
+            continue
+        try:
+            # core numbers the entry one past the user's matchday, so the league's first matchday shows as 1
+            user_data["matchday"] = league_matchday
+            result = core.simulate_user_matchday(
+                username, user_data, farmer_pool, season, seasonal_crops, farmer_preferences, league_stories,
+                rng=streams.league_stream(league, league_matchday, username),
+                farmer_rng=lambda name: streams.league_stream(league, league_matchday, username, name)
+            )
+            if result is None:
+                continue
+            core.apply_matchday_result(user_data, league_stories, result)
+            processed.append(username)
+        except Exception as e:
+            logging.error(f"Error running matchday for {username}: {e}")
+
+    updated_users = {p: league_users[p] for p in processed}
+    return updated_users, league_stories, processed
+
+def _simulate_league_job(league_code, league, users, stories, farmer_pool, seasonal_crops, farmer_preferences, league_matchday):
+    """Worker entry point: simulate one league and time it"""
+    start = time.perf_counter()
+    updated_users, updated_stories, processed = simulate_league(
+        league, users, stories, farmer_pool, seasonal_crops, farmer_preferences, league_matchday
+    )
+    return league_code, updated_users, updated_stories, processed, time.perf_counter() - start
+
+def _league_job_args(state, league_code):
+    """Picklable inputs for one league, limited to that league's players"""
+    league = state.leagues[league_code]
+    players = league.get("players", [])
+    return (
+        league_code,
+        league,
+        {p: state.stats["users"][p] for p in players if p in state.stats["users"]},
+        {p: state.stories[p] for p in players if p in state.stories},
+        core.load_farmer_pool_for_league(league_code),
+        state.seasonal_crops,
+        state.farmer_preferences,
+        get_league_matchday(league)
+    )
+
+def _apply_league_job(state, job_result):
+    league_code, updated_users, updated_stories, processed, elapsed = job_result
+    state.stats["users"].update(updated_users)
+    state.stories.update(updated_stories)
+    state.processed[league_code] = processed
+    for username in processed:
+        logging.info(f"Completed matchday for {username}")
+    logging.info(f"League {league_code}: simulated {len(processed)} player(s) in {elapsed * 1000:.1f} ms")
+    return processed
+
+def advance_leagues(state, league_codes, workers=None):
+    """Simulate leagues into the in-memory state and return the players processed.
+
+    Leagues share no results, so with more than one worker they are fanned out
+    to a process pool and merged back here in the parent.
+    """
+    if workers is None:
+        workers = MATCHDAY_WORKERS
+    workers = min(workers, len(league_codes))
+    players_processed = set()
+
+    if workers <= 1:
+        for league_code in league_codes:
+            job_result = _simulate_league_job(*_league_job_args(state, league_code))
+            players_processed.update(_apply_league_job(state, job_result))
+        return players_processed
+
+    # Streams are derived from each league's seed, so results do not depend on the worker
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_simulate_league_job, *_league_job_args(state, league_code)): league_code
+            for league_code in league_codes
+        }
+        for future in as_completed(futures):
+            try:
+                players_processed.update(_apply_league_job(state, future.result()))
+            except Exception as e:
+                logging.error(f"Error running matchday for league {futures[future]}: {e}")
+
+    return players_processed
+
+def generate_bracket_schedule(players, remaining_matchdays):
+    """Generate round-robin schedule for a bracket"""
+    if len(players) < 2:
+        return {players[0]: [None] * (remaining_matchdays // 3)} if players else {}
+
+    schedule = {}
+    for player in players:
+        schedule[player] = []
+
+    total_cycles = remaining_matchdays // 3
+    has_bye = len(players) % 2 == 1
+
+    for cycle in range(total_cycles):
+        available_players = players.copy()
+
+        # Handle bye week for odd number of players
+        if has_bye:
+            bye_player = available_players[cycle % len(available_players)]
+            available_players.remove(bye_player)
+            schedule[bye_player].append(None)
+
+        # Create round-robin pairings
+        while len(available_players) >= 2:
+            if cycle == 0:
+                player1 = available_players.pop(0)
+                player2 = available_players.pop(0)
+            else:
+                player1 = available_players.pop(0)
+                opponent_index = cycle % len(available_players) if available_players else 0
+                if opponent_index >= len(available_players):
+                    opponent_index = 0
+                player2 = available_players.pop(opponent_index)
+
+            schedule[player1].append(player2)
+            schedule[player2].append(player1)
+
+    return schedule
+
+def total_points(user_data):
+    """Total season points across all matchdays"""
+    return totals.total_points(user_data)
+
+def cycle_points(user_data, cycle_num):
+    """Points scored in a specific 3-game cycle"""
+    return totals.cycle_points(user_data, cycle_num)
+
+def create_brackets(league, users, league_matchday):
+    """Create playoff brackets after half the matchdays are completed"""
+    if not league.get("use_playoffs", True):
+        return False
+
+    players = league.get("players", [])
+    matchdays_limit = league.get("matchdays", 30)
+
+    # Create brackets after half the season
+    bracket_creation_point = matchdays_limit // 2
+
+    if league_matchday < bracket_creation_point or league.get("brackets_created", False):
+        return False
+
+    playoff_records = league.get("playoff_records", {})
+
+    # Sort players by wins (descending), then by total points as tiebreaker
+    sorted_players = sorted(players, key=lambda p: (
+        playoff_records.get(p, {"wins": 0})["wins"],
+        total_points(users.get(p, {}))
+    ), reverse=True)
+
+    # Split into brackets
+    mid_point = len(sorted_players) // 2
+    winners_bracket = sorted_players[:mid_point]
+    losers_bracket = sorted_players[mid_point:]
+
+    league["playoff_brackets"] = {
+        "winners": winners_bracket,
+        "losers": losers_bracket
+    }
+    league["brackets_created"] = True
+
+    # Generate new round-robin schedules for each bracket
+    league["bracket_schedules"] = {
+        "winners": generate_bracket_schedule(winners_bracket, matchdays_limit - bracket_creation_point),
+        "losers": generate_bracket_schedule(losers_bracket, matchdays_limit - bracket_creation_point)
+    }
+
+    logging.info(f"Playoff brackets created for league {league.get('code')}")
+    logging.info(f"Winners bracket: {winners_bracket}")
+    logging.info(f"Losers bracket: {losers_bracket}")
+    return True
+
+def record_playoff_results(league, users, league_matchday):
+    """Update win/loss/tie records after completing a 3-game matchup"""
+    if not league.get("use_playoffs", True):
+        return
+
+    players = league.get("players", [])
+
+    # Initialize playoff records for all players
+    if "playoff_records" not in league:
+        league["playoff_records"] = {}
+
+    for player in players:
+        if player not in league["playoff_records"]:
+            league["playoff_records"][player] = {"wins": 0, "losses": 0, "ties": 0}
+
+    # Track which matchups have been recorded to avoid duplicates
+    if "recorded_matchups" not in league:
+        league["recorded_matchups"] = []
+
+    # Create brackets if needed
+    create_brackets(league, users, league_matchday)
+
+    # Only process if we just completed a 3-game cycle
+    if not (league_matchday > 0 and league_matchday % 3 == 0):
+        return
+
+    current_cycle = league_matchday // 3 - 1  # The cycle that was just completed (0-indexed)
+
+    # Process each player for this completed cycle
+    processed_matchups = set()
+
+    for player in players:
+        try:
+            # Get opponent for this cycle using the appropriate schedule
+            opponent = None
+            matchdays_limit = league.get("matchdays", 30)
+            bracket_creation_point = matchdays_limit // 2
+
+            if league_matchday < bracket_creation_point:
+                # Use regular matchup schedule before brackets
+                if "matchup_schedule" in league and player in league["matchup_schedule"]:
+                    schedule = league["matchup_schedule"][player]
+                    if current_cycle < len(schedule):
+                        opponent = schedule[current_cycle]
+            else:
+                # Use bracket schedules after bracket creation
+                brackets = league.get("playoff_brackets", {})
+                bracket_schedules = league.get("bracket_schedules", {})
+
+                # Find which bracket the player is in
+                player_bracket = None
+                if player in brackets.get("winners", []):
+                    player_bracket = "winners"
+                elif player in brackets.get("losers", []):
+                    player_bracket = "losers"
+
+                if player_bracket and player_bracket in bracket_schedules:
+                    bracket_schedule = bracket_schedules[player_bracket]
+                    if player in bracket_schedule:
+                        # Adjust cycle index for bracket phase
+                        bracket_cycle = current_cycle - (bracket_creation_point // 3)
+                        if bracket_cycle >= 0 and bracket_cycle < len(bracket_schedule[player]):
+                            opponent = bracket_schedule[player][bracket_cycle]
+
+            # Handle bye week (no opponent)
+            if opponent is None:
+                bye_matchup_id = f"{player}_bye_cycle_{current_cycle}"
+                if bye_matchup_id not in league["recorded_matchups"]:
+                    league["playoff_records"][player]["wins"] += 1
+                    league["recorded_matchups"].append(bye_matchup_id)
+                    print(f"[DEBUG] {player} gets bye week win for cycle {current_cycle}")
+                continue
+
+            # Ensure opponent exists in playoff records
+            if opponent not in league["playoff_records"]:
+                league["playoff_records"][opponent] = {"wins": 0, "losses": 0, "ties": 0}
+
+            # Create consistent matchup ID (alphabetical order)
+            matchup_players = sorted([player, opponent])
+            matchup_id = f"{matchup_players[0]}_vs_{matchup_players[1]}_cycle_{current_cycle}"
+
+            # Skip if already processed or recorded
+            if matchup_id in processed_matchups or matchup_id in league["recorded_matchups"]:
+                continue
+
+            # Calculate points for both players
+            p1_points = cycle_points(users.get(player, {}), current_cycle)
+            p2_points = cycle_points(users.get(opponent, {}), current_cycle)
+
+            print(f"[DEBUG] Cycle {current_cycle}: {player} ({p1_points}) vs {opponent} ({p2_points})")
+
+            # Update records - only record once per matchup
+            if p1_points > p2_points:
+                league["playoff_records"][player]["wins"] += 1
+                league["playoff_records"][opponent]["losses"] += 1
+                print(f"[DEBUG] {player} wins!")
+            elif p2_points > p1_points:
+                league["playoff_records"][opponent]["wins"] += 1
+                league["playoff_records"][player]["losses"] += 1
+                print(f"[DEBUG] {opponent} wins!")
+            else:
+                league["playoff_records"][player]["ties"] += 1
+                league["playoff_records"][opponent]["ties"] += 1
+                print(f"[DEBUG] Tie game!")
+
+            # Mark this matchup as recorded
+            league["recorded_matchups"].append(matchup_id)
+            processed_matchups.add(matchup_id)
+
+        except Exception as e:
+            print(f"[ERROR] Error processing playoff records for {player}: {e}")
+            continue
+
+def _write_json_files(documents, history_users=None):
+    """Write several JSON documents so that either all of them or none are replaced.
+
+    Every document is serialized to a temp file next to its target first; only
+    once all of them are on disk are they swapped in with os.replace(), while
+    holding every target's lock. history_users are the users whose history log
+    (sharded layout) grows in the same commit: their entries are staged with the
+    documents and the logs' offset indexes are written last.
+    """
+    with storage.locked_all(documents):
+        staged = []
+        pending = []
+        try:
+            for path, data in documents.items():
+                staged.append((storage.stage_json(path, data), path))
+            if history_users:
+                pending = shards.stage_history(history_users)
+        except Exception:
+            for tmp_path, _ in staged:
+                os.remove(tmp_path)
+            raise
+
+        for tmp_path, path in staged:
+            os.replace(tmp_path, path)
+        shards.publish_history(pending)
+
+# What a matchday advances in a league; drafts, joins and trades may change the rest meanwhile
+MATCHDAY_LEAGUE_FIELDS = ("matchday", "next_matchday_at", "playoff_records", "recorded_matchups",
+                          "playoff_brackets", "brackets_created", "bracket_schedules")
+# What a matchday advances in a user's record; roster changes may change the rest meanwhile
+MATCHDAY_USER_FIELDS = ("matchday", "data", "history_start", "totals", "total_injuries", "total_injury_points_lost")
+
+def merge_matchday(state, users, stories, leagues, usernames, league_codes):
+    """Apply the matchday's results to stores re-read under their locks.
+
+    Only the matchday fields of the changed users and the advanced leagues and
+    the changed players' stories come from the state, so what other workers
+    wrote since the state was loaded is kept. A user loaded with only the tail
+    of their history is skipped when that history was replaced meanwhile. The
+    state is updated to the merged records.
+    """
+    for username in usernames:
+        updated = state.stats["users"].get(username)
+        if updated is None:
+            continue
+        if username in state.entries and (users.get(username, {}).get("totals") or {}).get("entries") != state.entries[username]:
+            # Reset or rewritten meanwhile: the tail this matchday extended is gone
+            logging.warning(f"History of {username} changed during the matchday; their result is not saved")
+            del state.stats["users"][username]
+            continue
+        users[username] = {**users.get(username, {}), **{k: updated[k] for k in MATCHDAY_USER_FIELDS if k in updated}}
+        state.stats["users"][username] = users[username]
+        if username in state.stories:
+            stories[username] = state.stories[username]
+    for league_code in league_codes:
+        if league_code not in leagues:
+            continue
+        advanced = state.leagues[league_code]
+        leagues[league_code].update({k: advanced[k] for k in MATCHDAY_LEAGUE_FIELDS if k in advanced})
+        state.leagues[league_code] = leagues[league_code]
+
+def commit_matchday_state(state, usernames=None, league_codes=None):
+    """Persist users, stories and leagues (with their playoff records and clocks) in one commit.
+
+    usernames limits the user records written to the players that changed and
+    league_codes the leagues to those that advanced; None writes every one.
+    The stores are read again under their locks and only those changes are
+    merged in (see merge_matchday()).
+    """
+    if usernames is None:
+        usernames = list(state.stats["users"])
+    if league_codes is None:
+        league_codes = list(state.leagues)
+
+    if db.enabled():
+        with db.transaction():
+            users = {username: db.get_user_record(username) for username in usernames}
+            stories, leagues = db.load_stories(), db.load_leagues()
+            merge_matchday(state, users, stories, leagues, usernames, league_codes)
+            db.commit_matchday(users, stories, leagues)
+        invalidate("stats", "stories", "leagues")
+        return
+
+    if shards.enabled():
+        with storage.locked_all(shards.document_paths(usernames) + [STORY_FILE, LEAGUES_FILE]):
+            users = {username: shards.get_user_record(username) for username in usernames}
+            stories, leagues = storage.read_json(STORY_FILE, {}), storage.read_json(LEAGUES_FILE, {})
+            merge_matchday(state, users, stories, leagues, usernames, league_codes)
+            documents = shards.shard_documents(users)
+            documents.update({STORY_FILE: stories, LEAGUES_FILE: leagues})
+            _write_json_files(documents, users)
+    else:
+        with storage.locked_all([STATS_FILE, STORY_FILE, LEAGUES_FILE]):
+            stats = storage.read_json(STATS_FILE, {"users": {}})
+            stories, leagues = storage.read_json(STORY_FILE, {}), storage.read_json(LEAGUES_FILE, {})
+            merge_matchday(state, stats["users"], stories, leagues, usernames, league_codes)
+            _write_json_files({STATS_FILE: stats, STORY_FILE: stories, LEAGUES_FILE: leagues})
+    invalidate("stats", "stories", "leagues")
+
+def run_leagues_matchday(league_codes, workers=None):
+    """Run one matchday for the given leagues with a single load and a single commit.
+
+    Each league whose players were simulated advances its own matchday counter
+    and clock. Returns the set of players processed; nothing is written if it is empty.
+    """
+    start = time.perf_counter()
+    state = MatchdayState(league_codes)
+    league_codes = [code for code in league_codes if state.is_active(code)]
+
+    players_processed = advance_leagues(state, league_codes, workers)
+
+    if not players_processed:
+        return players_processed
+
+    advanced = [code for code in league_codes if state.processed.get(code)]
+    changed_players = set()
+    for league_code in advanced:
+        league = state.leagues[league_code]
+        league["matchday"] = get_league_matchday(league) + 1
+        schedule_next_matchday(league)
+        record_playoff_results(league, state.stats["users"], league["matchday"])
+        changed_players.update(league.get("players", []))
+
+    commit_matchday_state(state, changed_players, advanced)
+    farmer_index.update_users({username: state.stats["users"][username] for username in changed_players if username in state.stats["users"]})
+    leaderboard.record_matchday(
+        {username: totals.of(state.stats["users"][username]) for username in changed_players if username in state.stats["users"]},
+        [state.leagues[league_code] for league_code in advanced]
+    )
+    logging.info(f"Matchday for {len(advanced)} league(s), {len(players_processed)} player(s) in {time.perf_counter() - start:.2f} s")
+    return players_processed
+
+def run_league_matchday(league_code):
+    """Run one matchday for every player in a single league"""
+    return run_leagues_matchday([league_code], workers=1)
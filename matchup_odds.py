@@ -0,0 +1,259 @@
+# Exact win/tie/loss odds for the current three-matchday matchup.
+# A team's points for one matchday follow from core.py's rules: the daily crop and
+# the catastrophe are shared by the team, everything else is per farmer. Given the
+# crop, the catastrophe (and who it hits) and who got injured, the three farmers
+# score independently, so the team PMF is a mixture of convolutions of per-farmer
+# PMFs. Injuries that sideline a farmer carry into the next matchday, so the days
+# left in the cycle are chained through each farmer's missed-days state.
+import itertools
+from collections import OrderedDict
+
+import core
+from matchday import cycle_points, get_league_matchday
+from stats import get_user_record, get_user_stats, load_stories
+from tasks import task_distribution
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Catastrophe roll 1-100: 1-59 type 1 (one farmer), 60-79 none, 80-89 type 2, 90-100 type 3
+CATASTROPHE_PROBABILITIES = {0: 0.20, 1: 0.59, 2: 0.10, 3: 0.11}
+# Days missed after an injury: none half the time, else one or two
+MISS_DAYS_AFTER_INJURY = {0: 0.5, 1: 0.25, 2: 0.25}
+
+# Team distributions are cached per roster, injuries and days left, which all
+# change when a matchday completes
+CACHE_SIZE = 512
+_cache = OrderedDict()
+# Odds of a matchup are cached per league matchday and the two rosters
+_odds_cache = OrderedDict()
+
+def _convolve(a, b):
+    if np is not None:
+        return np.convolve(a, b).tolist()
+    result = [0.0] * (len(a) + len(b) - 1)
+    for i, pa in enumerate(a):
+        if pa:
+            for j, pb in enumerate(b):
+                result[i + j] += pa * pb
+    return result
+
+def _add(total, pmf, weight):
+    if len(total) < len(pmf):
+        total.extend([0.0] * (len(pmf) - len(total)))
+    for points, p in enumerate(pmf):
+        total[points] += p * weight
+    return total
+
+def _injury_probability(physical):
+    """P(randint(1, 3) == 3 and randint(1, 11) > physical)"""
+    return min(1.0, max(0.0, (11 - physical) / 11)) / 3
+
+def farmer_day_pmf(farmer, role, preferred, catastrophe, injured):
+    """PMF (list indexed by points) of a farmer's points_after_catastrophe for one matchday.
+
+    catastrophe is 0 (none), "hit" (the farmer is the one a type 1 hits),
+    1 (a type 1 hit a teammate), 2 or 3.
+    """
+    if catastrophe == 3:
+        return [1.0]
+    task_pmf = task_distribution(role, farmer["strength"], farmer["handy"], farmer["stamina"])["pmf"]
+    losses = (1, 2) if injured else (0,)
+    pmf = []
+    for task_points, p_task in task_pmf.items():
+        bases = range(30, 51) if task_points > 0 else range(5, 21)
+        weight = p_task / len(bases) / len(losses)
+        for base in bases:
+            crops = int(base * 1.5) if preferred else base
+            if injured:
+                crops = int(crops * 0.4)
+            if catastrophe == "hit":
+                crops = int(crops * 0.4)
+            elif catastrophe == 2:
+                crops = 0
+            points = task_points - (1 if catastrophe == "hit" else 2 if catastrophe == 2 else 0)
+            for loss in losses:
+                total = max(0, points - loss) + crops
+                if total >= len(pmf):
+                    pmf.extend([0.0] * (total + 1 - len(pmf)))
+                pmf[total] += weight
+    return pmf
+
+def _day_conditions(team, season, seasonal_crops, farmer_preferences):
+    """(probability, per-farmer (preferred, catastrophe)) over the shared daily rolls"""
+    crops = seasonal_crops.get(season, ["corn"])
+    # Crops only matter through which farmers prefer them, so merge crops alike
+    conditions = {}
+    for crop in crops:
+        preferred = [farmer_preferences.get(farmer["name"], {}).get(season, "") == crop for farmer, _ in team]
+        p_crop = 1 / len(crops)
+        for event_type, p_event in CATASTROPHE_PROBABILITIES.items():
+            if event_type == 1:
+                for hit in range(len(team)):
+                    cases = tuple(zip(preferred, ["hit" if i == hit else 1 for i in range(len(team))]))
+                    conditions[cases] = conditions.get(cases, 0.0) + p_crop * p_event / len(team)
+            else:
+                cases = tuple((pref, event_type) for pref in preferred)
+                conditions[cases] = conditions.get(cases, 0.0) + p_crop * p_event
+    return [(p, cases) for cases, p in conditions.items()]
+
+def _day_step(team, conditions, miss_state, pmf_cache):
+    """{next miss state: points PMF weighted by its probability} for one matchday"""
+    playing = [i for i, miss in enumerate(miss_state) if miss == 0]
+    after_miss = [max(0, miss - 1) for miss in miss_state]
+    outcomes = {}
+
+    # Injuries do not depend on the shared rolls, so condition on who got injured first
+    for injured_set in itertools.product((False, True), repeat=len(playing)):
+        p_injuries = 1.0
+        for i, injured in zip(playing, injured_set):
+            q = _injury_probability(team[i][0]["physical"])
+            p_injuries *= q if injured else 1 - q
+        if p_injuries == 0:
+            continue
+        injured_by_farmer = dict(zip(playing, injured_set))
+
+        points = [0.0]
+        for p_condition, farmer_conditions in conditions:
+            team_pmf = [1.0]
+            for i in playing:
+                preferred, catastrophe = farmer_conditions[i]
+                key = (i, preferred, catastrophe, injured_by_farmer[i])
+                if key not in pmf_cache:
+                    farmer, role = team[i]
+                    pmf_cache[key] = farmer_day_pmf(farmer, role, preferred, catastrophe, injured_by_farmer[i])
+                team_pmf = _convolve(team_pmf, pmf_cache[key])
+            _add(points, team_pmf, p_condition)
+
+        # Each injured farmer may then sit out one or two matchdays
+        injured_farmers = [i for i in playing if injured_by_farmer[i]]
+        for misses in itertools.product(MISS_DAYS_AFTER_INJURY.items(), repeat=len(injured_farmers)):
+            state = list(after_miss)
+            p_state = p_injuries
+            for i, (days, p_days) in zip(injured_farmers, misses):
+                state[i] = days
+                p_state *= p_days
+            state = tuple(state)
+            outcomes[state] = _add(outcomes.get(state, []), points, p_state)
+    return outcomes
+
+def team_points_pmf(team, miss_state, days, season, seasonal_crops, farmer_preferences):
+    """PMF of the team's total points over the next `days` matchdays"""
+    conditions = _day_conditions(team, season, seasonal_crops, farmer_preferences)
+    pmf_cache = {}
+    states = {tuple(miss_state): [1.0]}
+    for _ in range(days):
+        next_states = {}
+        for state, pmf in states.items():
+            for next_state, day_pmf in _day_step(team, conditions, state, pmf_cache).items():
+                next_states[next_state] = _add(next_states.get(next_state, []), _convolve(pmf, day_pmf), 1.0)
+        states = next_states
+    total = [0.0]
+    for pmf in states.values():
+        _add(total, pmf, 1.0)
+    return total
+
+def _cached_team_pmf(team, miss_state, days, season, seasonal_crops, farmer_preferences):
+    key = (
+        tuple((farmer["name"], role, farmer["strength"], farmer["handy"], farmer["stamina"], farmer["physical"],
+               farmer_preferences.get(farmer["name"], {}).get(season, "")) for farmer, role in team),
+        tuple(miss_state), days, season, tuple(seasonal_crops.get(season, ["corn"]))
+    )
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    pmf = team_points_pmf(team, miss_state, days, season, seasonal_crops, farmer_preferences)
+    _cache[key] = pmf
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return pmf
+
+def user_cycle_outlook(username, user_data, cycle, farmer_pool, season, all_stories, seasonal_crops=None, farmer_preferences=None):
+    """{"banked", "days_left", "pmf"} for the user's points in a three-matchday cycle.
+
+    pmf is the distribution of the points still to come. A user without a full
+    team scores nothing more.
+    """
+    seasonal_crops = seasonal_crops if seasonal_crops is not None else core.load_seasonal_crops()
+    farmer_preferences = farmer_preferences if farmer_preferences is not None else core.load_farmer_crop_preferences()
+    banked = cycle_points(user_data, cycle)
+    days_left = 3 - len(user_data.get("data", [])[cycle * 3:cycle * 3 + 3])
+
+    # Starters with the stats and injuries core.build_characters() would use
+    characters = core.build_characters(username, user_data, farmer_pool, all_stories)
+    if not characters or days_left <= 0:
+        return {"banked": banked, "days_left": max(0, days_left), "pmf": [1.0]}
+    team = [({"name": c.name, "strength": c.strength, "handy": c.handy, "stamina": c.stamina, "physical": c.physical}, c.job)
+            for c in characters]
+    miss_state = [min(2, c.miss_days) for c in characters]
+
+    pmf = _cached_team_pmf(team, miss_state, days_left, season, seasonal_crops, farmer_preferences)
+    return {"banked": banked, "days_left": days_left, "pmf": pmf}
+
+def matchup_odds(outlook, opponent_outlook):
+    """{"win", "tie", "loss"} for the first side of a matchup, from two cycle outlooks"""
+    mine, theirs = outlook["pmf"], opponent_outlook["pmf"]
+    offset = outlook["banked"] - opponent_outlook["banked"]
+
+    # below[k] = P(opponent's points to come < k)
+    below = [0.0]
+    for p in theirs:
+        below.append(below[-1] + p)
+    total_theirs = below[-1]
+
+    def cdf_below(k):
+        return below[max(0, min(k, len(theirs)))]
+
+    win = tie = 0.0
+    for points, p in enumerate(mine):
+        if p:
+            # I win when points + offset > theirs, i.e. theirs < points + offset
+            threshold = points + offset
+            win += p * cdf_below(threshold)
+            if 0 <= threshold < len(theirs):
+                tie += p * theirs[threshold]
+    total_mine = sum(mine)
+    loss = total_mine * total_theirs - win - tie
+    return {"win": win, "tie": tie, "loss": max(0.0, loss)}
+
+def cycle_odds(username, opponent, league, users, farmer_pool, all_stories):
+    """Odds and outlooks for username against opponent in the league's current cycle.
+
+    A bye (no opponent) is a win, as record_playoff_results() counts it.
+    """
+    cycle = get_league_matchday(league) // 3
+    season = league.get("season", "summer")
+    seasonal_crops = core.load_seasonal_crops()
+    farmer_preferences = core.load_farmer_crop_preferences()
+
+    def outlook(player):
+        return user_cycle_outlook(player, users.get(player, {"data": [], "drafted_team": {}}), cycle, farmer_pool,
+                                  season, all_stories, seasonal_crops, farmer_preferences)
+
+    mine = outlook(username)
+    if opponent is None:
+        return {"win": 1.0, "tie": 0.0, "loss": 0.0, "outlook": mine, "opponent_outlook": None}
+    theirs = outlook(opponent)
+    return {**matchup_odds(mine, theirs), "outlook": mine, "opponent_outlook": theirs}
+
+def _roster(record):
+    return tuple(sorted((role, info.get("name")) for role, info in record.get("drafted_team", {}).items()
+                        if isinstance(info, dict)))
+
+def current_cycle_odds(username, opponent, league, load_pool):
+    """cycle_odds() for the two players only, cached until the league's next matchday
+    or a roster change on either side; load_pool(league_code) gives the farmer pool"""
+    players = [player for player in (username, opponent) if player is not None]
+    key = (league["code"], get_league_matchday(league), username, opponent,
+           tuple(_roster(get_user_record(player)) for player in players))
+    if key in _odds_cache:
+        _odds_cache.move_to_end(key)
+        return _odds_cache[key]
+    users = {player: get_user_stats(player) for player in players}
+    odds = cycle_odds(username, opponent, league, users, load_pool(league["code"]), load_stories())
+    _odds_cache[key] = odds
+    if len(_odds_cache) > CACHE_SIZE:
+        _odds_cache.popitem(last=False)
+    return odds
@@ -0,0 +1,166 @@
+# Copy every JSON store into the SQLite backend in one transaction, then verify it.
+# Usage: python migrate.py [--source DIR] [--db PATH] [--verify-only]
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import db
+
+def _read_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+def _league_files(source, prefix):
+    """Map league code -> path for files named <prefix><code>.json"""
+    files = {}
+    for path in sorted(glob.glob(os.path.join(source, f"{prefix}*.json"))):
+        code = os.path.basename(path)[len(prefix):-len(".json")]
+        if code:
+            files[code] = path
+    return files
+
+def _chat_files(source):
+    return _league_files(os.path.join(source, "league_chats"), "chat_")
+
+def _user_points(user_stats):
+    return sum(
+        farmer.get("points_after_catastrophe", 0)
+        for entry in user_stats.get("data", [])
+        for farmer in entry.get("farmers", [])
+    )
+
+class StoreTimer:
+    """Collects per-store record counts and timings for the cutover report"""
+
+    def __init__(self):
+        self.rows = []
+
+    def run(self, name, load, write, count):
+        start = time.perf_counter()
+        data = load()
+        write(data)
+        elapsed = time.perf_counter() - start
+        self.rows.append((name, count(data), elapsed))
+        return data
+
+    def report(self):
+        total_records = sum(records for _, records, _ in self.rows)
+        total_time = sum(elapsed for _, _, elapsed in self.rows)
+        print(f"{'store':<34}{'records':>10}{'seconds':>10}{'records/s':>12}")
+        for name, records, elapsed in self.rows:
+            rate = records / elapsed if elapsed else 0
+            print(f"{name:<34}{records:>10}{elapsed:>10.3f}{rate:>12.0f}")
+        rate = total_records / total_time if total_time else 0
+        print(f"{'total':<34}{total_records:>10}{total_time:>10.3f}{rate:>12.0f}")
+
+def migrate(source):
+    """Load each JSON store one at a time and write it to the database in a single transaction"""
+    timer = StoreTimer()
+    path = lambda name: os.path.join(source, name)
+
+    with db.transaction():
+        timer.run("farm_stats.json",
+                  lambda: _read_json(path("farm_stats.json"), {"users": {}}),
+                  db.save_stats,
+                  lambda data: sum(len(u.get("data", [])) for u in data.get("users", {}).values()))
+        timer.run("leagues.json", lambda: _read_json(path("leagues.json"), {}), db.save_leagues, len)
+        timer.run("users.json", lambda: _read_json(path("users.json"), {}), db.save_users, len)
+        timer.run("trades.json", lambda: _read_json(path("trades.json"), []), db.save_trades, len)
+        timer.run("story.json", lambda: _read_json(path("story.json"), {}), db.save_stories, len)
+        timer.run("market_stats.json", lambda: _read_json(path("market_stats.json"), {}), db.save_market_stats, len)
+        timer.run("global_matchday.json",
+                  lambda: _read_json(path("global_matchday.json"), {}).get("current_matchday", 0),
+                  db.set_global_matchday,
+                  lambda _: 1)
+
+        for code, file_path in _league_files(source, "farmer_pool_").items():
+            timer.run(os.path.basename(file_path), lambda: _read_json(file_path, []),
+                      lambda pool: db.save_farmer_pool(code, pool), len)
+        for code, file_path in _league_files(source, "previous_szn_stats_").items():
+            timer.run(os.path.basename(file_path), lambda: _read_json(file_path, {}),
+                      lambda archive: db.save_previous_season_stats(code, archive), len)
+        for code, file_path in _chat_files(source).items():
+            timer.run(os.path.basename(file_path), lambda: _read_json(file_path, []),
+                      lambda messages: db.save_chat_messages(code, messages), len)
+
+    return timer
+
+def verify(source):
+    """Compare row counts and per-user point totals against the JSON files; returns a list of problems"""
+    conn = db.get_connection()
+    path = lambda name: os.path.join(source, name)
+    count = lambda sql, *args: conn.execute(sql, args).fetchone()[0]
+    problems = []
+
+    def check(label, expected, actual):
+        status = "ok" if expected == actual else "MISMATCH"
+        print(f"{label:<40}{expected:>10}{actual:>10}  {status}")
+        if expected != actual:
+            problems.append(f"{label}: expected {expected}, found {actual}")
+
+    print(f"{'check':<40}{'json':>10}{'db':>10}")
+    users = _read_json(path("farm_stats.json"), {"users": {}}).get("users", {})
+    check("users", len(users), count("SELECT COUNT(*) FROM users"))
+    check("matchdays", sum(len(u.get("data", [])) for u in users.values()), count("SELECT COUNT(*) FROM matchdays"))
+    check("matchday farmers",
+          sum(len(e.get("farmers", [])) for u in users.values() for e in u.get("data", [])),
+          count("SELECT COUNT(*) FROM matchday_farmers"))
+    check("leagues", len(_read_json(path("leagues.json"), {})), count("SELECT COUNT(*) FROM leagues"))
+    check("accounts", len(_read_json(path("users.json"), {})), count("SELECT COUNT(*) FROM accounts"))
+    check("trades", len(_read_json(path("trades.json"), [])), count("SELECT COUNT(*) FROM trades"))
+    check("stories", len(_read_json(path("story.json"), {})), count("SELECT COUNT(*) FROM stories"))
+    check("market stats", len(_read_json(path("market_stats.json"), {})), count("SELECT COUNT(*) FROM market_stats"))
+    check("global matchday", _read_json(path("global_matchday.json"), {}).get("current_matchday", 0), db.get_global_matchday())
+    check("league farmer pools", len(_league_files(source, "farmer_pool_")), count("SELECT COUNT(*) FROM farmer_pools"))
+    check("previous season archives", len(_league_files(source, "previous_szn_stats_")), count("SELECT COUNT(*) FROM season_archives"))
+
+    chats = _chat_files(source)
+    check("chat messages",
+          sum(len(_read_json(file_path, [])) for file_path in chats.values()),
+          count("SELECT COUNT(*) FROM messages"))
+
+    # Per-user point totals, from the denormalised matchday column and the farmer rows
+    stored_totals = dict(conn.execute("SELECT username, SUM(total_points) FROM matchdays GROUP BY username").fetchall())
+    farmer_totals = dict(conn.execute("SELECT username, SUM(points) FROM matchday_farmers GROUP BY username").fetchall())
+    mismatched = []
+    for username, user_stats in users.items():
+        expected = _user_points(user_stats)
+        if stored_totals.get(username, 0) != expected or farmer_totals.get(username, 0) != expected:
+            mismatched.append(username)
+            problems.append(f"points for {username}: expected {expected}, found {stored_totals.get(username, 0)}")
+    check("users with matching point totals", len(users), len(users) - len(mismatched))
+
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate the JSON stores into the SQLite backend")
+    parser.add_argument("--source", default=".", help="directory holding the JSON files")
+    parser.add_argument("--db", default=db.DATABASE_PATH, help="SQLite database file")
+    parser.add_argument("--verify-only", action="store_true", help="skip the copy and only verify")
+    args = parser.parse_args()
+
+    db.DATABASE_PATH = args.db
+
+    if not args.verify_only:
+        print(f"Migrating JSON stores from {os.path.abspath(args.source)} into {args.db}...")
+        start = time.perf_counter()
+        timer = migrate(args.source)
+        timer.report()
+        print(f"Committed in {time.perf_counter() - start:.3f}s\n")
+
+    problems = verify(args.source)
+    if problems:
+        print(f"\n❌ Verification failed with {len(problems)} problem(s):")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+    print("\n✅ Database matches the JSON stores")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# Matchday narrative rendered from compact event codes.
+# A matchday entry records what happened rather than the prose: each farmer's
+# "task" codes [task index, message index, celebration index] (None when they sat
+# out injured), their "injury_flavor" index, the catastrophe type and the team
+# "chant". render() rebuilds the story only when a page shows it. Entries written
+# before the codes keep their "story_message", which is returned as stored.
+from tasks import TASK_CATALOGUE, CELEBRATION_MESSAGES, task_text
+
+INJURY_FLAVORS = [
+    "due to throwing out his back riding the mechanical bull at the local bar",
+    "after slipping on a rogue vegetable during lunch break",
+    "after a silo fell and crushed his legs",
+    "from sucking an infected cow teet",
+    "because he tried to arm wrestle a gangster cow and lost",
+    "blowing out his fat wife's back",
+    "after falling off a tractor trying to jack off"
+]
+
+EMPTY_TEAM_STORY = "Nobody was assigned to a starting position...are you counting sheep over there?"
+EMPTY_TEAM_CATASTROPHE = "No work could be done today."
+CLOSING_LINE = "\nYeeeeeeHawww! That's all the news for this matchday. Stay tuned for more Farmington News! YEEEEEHAWWWW!"
+INTROS = ("First,", "Then,", "Finally,")
+
+def catastrophe_message(season, event_type, affected_name=None):
+    """The event line for a catastrophe type"""
+    if event_type == 1:
+        return f"Oh no! {affected_name} got heat stroke and struggled to do their task." if season == "summer" else \
+               f"Brrr! {affected_name} got frostbite and struggled to do their task." if season == "winter" else \
+               f"Yikes! {affected_name} overate at Thanksgiving and got gout!" if season == "autumn" else \
+               f"Spooky! {affected_name} saw a ghost and let their fear affect their work!"
+    if event_type == 2:
+        return {
+            "summer": "A devastating drought hit, ruining all crop-related work!",
+            "winter": "Frost has set in, making any crop harvesting impossible!",
+            "autumn": "A major machine breakdown occurred, making all mechanical work impossible!",
+            "spring": "A storm has damaged all machinery, ruining any related tasks!"
+        }.get(season, "")
+    if event_type == 3:
+        return {
+            "summer": "A raging wildfire has forced all farmers to evacuate—no work today!",
+            "winter": "A blizzard has shut everything down! No work can be done today.",
+            "spring": "Massive flooding has covered the fields! Work is impossible.",
+            "autumn": "A tornado has swept through, leaving no chance for farm work today!"
+        }.get(season, "")
+    return "No catastrophe today!"
+
+def missed_text(name):
+    return f"{name} was ready to work, but due to their previous injury they failed and collected no points."
+
+def injury_text(flavor, name, miss_days):
+    return f"Due to {INJURY_FLAVORS[flavor]}, {name} became injured and will miss {miss_days} matchday(s)."
+
+def chant_text(names, chant):
+    return f"\n {names[0]}, {names[1]} and {names[2]} all chanted '{chant}!'"
+
+def render_story(entry):
+    """The matchday story for an entry, from its codes or its stored prose"""
+    if "story_message" in entry:
+        return entry["story_message"]
+
+    farmers = entry.get("farmers", [])
+    if not farmers:
+        return EMPTY_TEAM_STORY
+
+    names = [farmer["name"] for farmer in farmers]
+    lines = []
+    for idx, farmer in enumerate(farmers):
+        name = farmer["name"]
+        lines.append(INTROS[min(idx, 2)])
+        task = farmer.get("task")
+        if task is None:
+            lines.append(missed_text(name))
+        else:
+            others = [other for other in names if other != name]
+            lines.append(task_text(farmer.get("job"), task[0], task[1], task[2], name, others))
+        if farmer.get("injury_flavor") is not None:
+            lines.append(injury_text(farmer["injury_flavor"], name, farmer.get("miss_days", 0)))
+
+    if entry.get("chant") is not None:
+        lines.append(chant_text(names, entry["chant"]))
+    lines.append(CLOSING_LINE)
+    return "\n".join(lines)
+
+def render_catastrophe(entry):
+    if "catastrophe_message" in entry:
+        return entry["catastrophe_message"]
+    if not entry.get("farmers"):
+        return EMPTY_TEAM_CATASTROPHE
+    return catastrophe_message(entry.get("season"), entry.get("catastrophe_type", 0), entry.get("affected_farmer"))
+
+def render(entry):
+    """{"story_message", "catastrophe_message"} for a matchday entry"""
+    return {
+        "story_message": render_story(entry),
+        "catastrophe_message": render_catastrophe(entry)
+    }
+
+# Migration of prose entries to codes. Each farmer's lines are matched against
+# the catalogue; an entry is only converted when the codes render back to the
+# exact stored text.
+
+def _match_task(line, farmer, others):
+    name = farmer["name"]
+    jobs = [farmer["job"]] if farmer.get("job") in TASK_CATALOGUE else list(TASK_CATALOGUE)
+    for job in jobs:
+        for task, (task_name, _, failmsg, winmsg) in enumerate(TASK_CATALOGUE[job]):
+            if not line.startswith(f"{name} tried their best to {task_name} "):
+                continue
+            for message in range(len(winmsg)):
+                for celebration in range(len(CELEBRATION_MESSAGES)):
+                    if line == task_text(job, task, message, celebration, name, others):
+                        return job, [task, message, celebration]
+            for message in range(len(failmsg)):
+                if line == task_text(job, task, message, None, name, others):
+                    return job, [task, message, None]
+    return None, None
+
+def compact_entry(entry):
+    """The entry with its prose replaced by codes, or None if the prose does not round-trip"""
+    if "story_message" not in entry:
+        return None
+    story = entry["story_message"]
+    farmers = [dict(farmer) for farmer in entry.get("farmers", [])]
+    compact = {k: v for k, v in entry.items() if k not in ("story_message", "farmers")}
+    compact["farmers"] = farmers
+    if "catastrophe_type" not in compact:
+        return None
+
+    lines = story.split("\n")
+    names = [farmer["name"] for farmer in farmers]
+    position = 0
+    for idx, farmer in enumerate(farmers):
+        name = farmer["name"]
+        if lines[position:position + 1] != [INTROS[min(idx, 2)]] or position + 1 >= len(lines):
+            return None
+        line = lines[position + 1]
+        position += 2
+        if line == missed_text(name):
+            farmer["task"] = None
+        else:
+            job, task = _match_task(line, farmer, [other for other in names if other != name])
+            if task is None:
+                return None
+            farmer.setdefault("job", job)
+            farmer["task"] = task
+        if position < len(lines):
+            for flavor in range(len(INJURY_FLAVORS)):
+                if lines[position] == injury_text(flavor, name, farmer.get("miss_days", 0)):
+                    farmer["injury_flavor"] = flavor
+                    position += 1
+                    break
+
+    prefix = f" {', '.join(names[:2])} and {names[2]} all chanted '" if len(names) == 3 else None
+    rest = "\n".join(lines[position:])
+    if prefix and rest.startswith("\n" + prefix) and "'\n" in rest:
+        compact["chant"] = rest[len(prefix) + 1:rest.index("'\n")][:-1]
+
+    return compact if render_story(compact) == story else None
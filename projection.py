@@ -0,0 +1,234 @@
+# Monte Carlo projection of a league's remaining season.
+# Every player's remaining games are sampled from the batch simulator (season_sim)
+# with their drafted farmers, who share each game's crop and catastrophe as a team
+# does in core.py, then the rest of the season is played out with the
+# matchup, bracket and winner rules of matchday.py and check_and_finish_league():
+# each trial gives who reaches the winners bracket and who wins the league.
+# Trials are split across a process pool. A projection is cached per league and
+# is stale as soon as the league's matchday or season seed changes.
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import core
+import db
+import storage
+import streams
+from matchday import MATCHDAY_WORKERS, generate_bracket_schedule, get_league_matchday, has_complete_team, league_is_active
+from season_sim import season_totals
+from stats import get_user_stats
+
+PROJECTION_TRIALS = int(os.environ.get("FARMINGTON_PROJECTION_TRIALS", 2000))
+
+def _projection_path(league_code):
+    return f"projection_{league_code}.json"
+
+def load_projection(league_code):
+    """The stored projection for the league, fresh or not, or None"""
+    if db.enabled():
+        return db.load_projection(league_code)
+    return storage.read_json(_projection_path(league_code))
+
+def save_projection(league_code, projection):
+    if db.enabled():
+        return db.save_projection(league_code, projection)
+    storage.write_json(_projection_path(league_code), projection)
+
+def _cache_key(league):
+    # A digest of the season seed, never the seed itself, which would predict matchdays
+    return {"matchday": get_league_matchday(league), "season": streams.derive_seed(streams.league_seed(league), "season")}
+
+def get_projection(league):
+    """The league's projection if it was computed at its current matchday, else None"""
+    projection = load_projection(league["code"])
+    if projection and all(projection.get(k) == v for k, v in _cache_key(league).items()):
+        return projection
+    return None
+
+def _entry_points(entry):
+    return sum(farmer.get("points_after_catastrophe", 0) for farmer in entry.get("farmers", []))
+
+def _team(user_data, farmer_stats):
+    """(farmer, role) for each starter, with the league pool's current stats"""
+    team = []
+    for role, farmer in user_data.get("drafted_team", {}).items():
+        if role in core.REQUIRED_ROLES and isinstance(farmer, dict) and farmer.get("name"):
+            team.append((farmer_stats.get(farmer["name"], farmer), role))
+    return team
+
+def _sample_games(teams, games, trials, seed, season="summer"):
+    """player -> per-trial lists of team points for each remaining game"""
+    farmers, roles, owners = [], [], []
+    for player, team in teams.items():
+        for farmer, role in team:
+            farmers.append(farmer)
+            roles.append(role)
+            owners.append(player)
+    samples = {player: [[0] * games for _ in range(trials)] for player, team in teams.items() if team}
+    if not farmers or games <= 0:
+        return samples
+
+    per_game = season_totals(farmers, games, seasons=trials, season=season, roles=roles, seed=seed,
+                             per_game=True, teams=owners)["games"]
+    for player, farmer_games in zip(owners, per_game):
+        player_samples = samples[player]
+        for trial, points in enumerate(farmer_games):
+            row = player_samples[trial]
+            for game, value in enumerate(points):
+                row[game] += value
+    return samples
+
+def _opponent(league, brackets, bracket_schedules, player, cycle, league_matchday):
+    """The player's opponent for a cycle, chosen as record_playoff_results() does"""
+    bracket_creation_point = league.get("matchdays", 30) // 2
+    if league_matchday < bracket_creation_point:
+        schedule = league.get("matchup_schedule", {}).get(player, [])
+        return schedule[cycle] if cycle < len(schedule) else None
+
+    for name in ("winners", "losers"):
+        if player in brackets.get(name, []):
+            schedule = bracket_schedules.get(name, {}).get(player, [])
+            bracket_cycle = cycle - bracket_creation_point // 3
+            return schedule[bracket_cycle] if 0 <= bracket_cycle < len(schedule) else None
+    return None
+
+def _play_out(league, history, samples, trials):
+    """Play the remaining matchdays once per trial; returns per-player counts and sums"""
+    players = league.get("players", [])
+    use_playoffs = league.get("use_playoffs", True)
+    matchdays_limit = league.get("matchdays", 30)
+    bracket_creation_point = matchdays_limit // 2
+    start_matchday = get_league_matchday(league)
+    base_records = league.get("playoff_records", {})
+    base_totals = {p: sum(history.get(p, [])) for p in players}
+
+    results = {p: {"winners_bracket": 0, "champion": 0, "wins": 0, "points": 0} for p in players}
+    for trial in range(trials):
+        wins = {p: base_records.get(p, {}).get("wins", 0) for p in players}
+        brackets = league.get("playoff_brackets", {}) if league.get("brackets_created") else None
+        bracket_schedules = league.get("bracket_schedules", {})
+        played = {p: list(history.get(p, [])) for p in players}
+
+        for league_matchday in range(start_matchday + 1, matchdays_limit + 1):
+            game = league_matchday - start_matchday - 1
+            for p, player_samples in samples.items():
+                played[p].append(player_samples[trial][game])
+            if not use_playoffs:
+                continue
+
+            if brackets is None and league_matchday >= bracket_creation_point:
+                ordered = sorted(players, key=lambda p: (wins[p], sum(played[p])), reverse=True)
+                mid_point = len(ordered) // 2
+                brackets = {"winners": ordered[:mid_point], "losers": ordered[mid_point:]}
+                bracket_schedules = {
+                    name: generate_bracket_schedule(brackets[name], matchdays_limit - bracket_creation_point)
+                    for name in ("winners", "losers")
+                }
+
+            if league_matchday % 3:
+                continue
+            cycle = league_matchday // 3 - 1
+            recorded = set()
+            for p in players:
+                opponent = _opponent(league, brackets or {}, bracket_schedules, p, cycle, league_matchday)
+                if opponent is None:
+                    wins[p] += 1
+                    continue
+                if opponent not in wins:
+                    continue
+                matchup = tuple(sorted((p, opponent)))
+                if matchup in recorded:
+                    continue
+                recorded.add(matchup)
+                p_points = sum(played[p][cycle * 3:cycle * 3 + 3])
+                o_points = sum(played[opponent][cycle * 3:cycle * 3 + 3])
+                if p_points > o_points:
+                    wins[p] += 1
+                elif o_points > p_points:
+                    wins[opponent] += 1
+
+        totals = {p: sum(played[p]) for p in players}
+        if use_playoffs and brackets and brackets.get("winners"):
+            winner = max(brackets["winners"], key=lambda p: (wins[p], totals[p]))
+        elif use_playoffs and any(wins.values()):
+            winner = max(players, key=lambda p: (wins[p], totals[p]))
+        else:
+            winner = max(players, key=lambda p: totals[p]) if players else None
+
+        for p in players:
+            results[p]["wins"] += wins[p]
+            results[p]["points"] += totals[p] - base_totals[p]
+            if brackets and p in brackets.get("winners", []):
+                results[p]["winners_bracket"] += 1
+        if winner is not None:
+            results[winner]["champion"] += 1
+    return results
+
+def _projection_chunk(league, history, teams, games, trials, seed):
+    """Worker entry point: sample and play out one chunk of trials"""
+    return _play_out(league, history, _sample_games(teams, games, trials, seed, league.get("season", "summer")), trials)
+
+def project_league(league, users, farmer_pool, trials=None, workers=None):
+    """Simulate the rest of the league's season trials times.
+
+    Returns {"matchday", "season", "trials", "players"}, where each player has the
+    probability of reaching the winners bracket (None without playoffs) and of
+    winning the league, plus their expected final wins and points.
+    """
+    trials = trials or PROJECTION_TRIALS
+    workers = max(1, min(workers or MATCHDAY_WORKERS, trials))
+    players = league.get("players", [])
+    farmer_stats = {farmer["name"]: farmer for farmer in farmer_pool}
+    games = max(0, league.get("matchdays", 30) - get_league_matchday(league))
+
+    history = {}
+    teams = {}
+    for p in players:
+        user_data = users.get(p, {})
+        history[p] = [_entry_points(entry) for entry in user_data.get("data", [])]
+        # Only players with a full team play; the others' history does not grow
+        if has_complete_team(user_data):
+            teams[p] = _team(user_data, farmer_stats)
+
+    # Each chunk draws from its own stream, so a projection replays exactly
+    seed = streams.league_seed(league)
+    matchday = get_league_matchday(league)
+    chunks = [trials // workers + (1 if i < trials % workers else 0) for i in range(workers)]
+    jobs = [
+        (league, history, teams, games, size, streams.derive_seed(seed, matchday, "projection", i))
+        for i, size in enumerate(chunks) if size
+    ]
+    if len(jobs) == 1:
+        partials = [_projection_chunk(*jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+            partials = list(executor.map(_projection_chunk, *zip(*jobs)))
+
+    summary = {}
+    use_playoffs = league.get("use_playoffs", True)
+    for p in players:
+        total = {key: sum(partial[p][key] for partial in partials) for key in partials[0][p]}
+        summary[p] = {
+            "winners_bracket": total["winners_bracket"] / trials if use_playoffs else None,
+            "champion": total["champion"] / trials,
+            "expected_wins": total["wins"] / trials,
+            "expected_points": sum(history[p]) + total["points"] / trials
+        }
+    return {**_cache_key(league), "trials": trials, "players": summary}
+
+def refresh_projection(league_code, trials=None, workers=None):
+    """Compute and store the league's projection; returns it, or None for an unknown or finished league"""
+    league = core.load_leagues().get(league_code)
+    if not league or not league_is_active(league):
+        return None
+
+    start = time.perf_counter()
+    # The league's players only, not every user's history
+    users = {player: get_user_stats(player) for player in league.get("players", [])}
+    projection = project_league(league, users, core.load_farmer_pool_for_league(league_code), trials, workers)
+    projection["computed_at"] = time.time()
+    save_projection(league_code, projection)
+    logging.info(f"Projected league {league_code} at matchday {projection['matchday']} "
+                 f"with {projection['trials']} trials in {time.perf_counter() - start:.2f} s")
+    return projection
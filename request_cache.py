@@ -0,0 +1,59 @@
+# Request-scoped memoization of store loads on flask.g.
+# Within a request each store is parsed at most once; writes drop the cached
+# copies. Outside an app context (scheduler thread, CLI, workers) loads pass through.
+from functools import wraps
+
+from flask import g, has_app_context
+
+def _cache():
+    if not has_app_context():
+        return None
+    if "store_cache" not in g:
+        g.store_cache = {}
+        g.store_loads = 0
+        g.store_loads_avoided = 0
+    return g.store_cache
+
+def cached_load(store):
+    """Memoize a loader for the rest of the request, keyed on its arguments"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = _cache()
+            if cache is None:
+                return func(*args, **kwargs)
+            key = (store, func.__qualname__, args, tuple(sorted(kwargs.items())))
+            if key in cache:
+                g.store_loads_avoided += 1
+                return cache[key]
+            g.store_loads += 1
+            result = cache[key] = func(*args, **kwargs)
+            return result
+        return wrapper
+    return decorator
+
+def invalidate(*stores):
+    """Forget every cached load of the given stores"""
+    cache = _cache()
+    if not cache:
+        return
+    for key in [key for key in cache if key[0] in stores]:
+        del cache[key]
+
+def invalidates(*stores):
+    """Drop the given stores from the request cache once the writer has run"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                invalidate(*stores)
+        return wrapper
+    return decorator
+
+def report():
+    """(loads, loads avoided) for the current request"""
+    if not has_app_context() or "store_cache" not in g:
+        return 0, 0
+    return g.store_loads, g.store_loads_avoided
@@ -0,0 +1,266 @@
+# Batch season simulator for farmers playing alone (season archival, projections).
+# Plays farmers x seasons x games with core.py's per-game rules for one farmer of a
+# three-farmer team (catastrophe, task points, injury and missed days, crops),
+# drawing each game's rolls for every farmer and season at once. Farmers given a
+# team share its daily crop and catastrophe, as teammates do in core.py. equivalence.py
+# checks the distributions against core.py itself. Task points are
+# sampled from the exact distributions in tasks.py. NumPy is used when it is
+# installed; otherwise a pure-Python loop with the same rules runs instead.
+import bisect
+import random
+
+from tasks import best_role, task_distribution
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Catastrophe roll 1-100: <60 type 1, 60-79 none, 80-89 type 2, 90+ type 3
+CATASTROPHE_THRESHOLDS = (0.59, 0.79, 0.89)
+# A type 1 catastrophe hits one farmer of the team of three
+AFFECTED_PROBABILITY = 1 / 3
+
+# Below this many farmer-seasons the per-game array overhead outweighs the Python loop
+NUMPY_MIN_BATCH = 1000
+
+def _task_cdf(farmer, role):
+    """(points values, cumulative probabilities) of the farmer's task points in role"""
+    pmf = task_distribution(role, farmer["strength"], farmer["handy"], farmer["stamina"])["pmf"]
+    values = sorted(pmf)
+    cumulative = []
+    total = 0.0
+    for points in values:
+        total += pmf[points]
+        cumulative.append(total)
+    cumulative[-1] = 1.0
+    return values, cumulative
+
+def _injury_probability(physical):
+    """P(randint(1, 11) > physical)"""
+    return min(1.0, max(0.0, (11 - physical) / 11))
+
+def _preference_probability(farmer, season, seasonal_crops, farmer_preferences):
+    """Chance the daily crop is the farmer's preferred crop for the season"""
+    crops = seasonal_crops.get(season, ["corn"])
+    preferred = farmer_preferences.get(farmer["name"], {}).get(season, "")
+    return crops.count(preferred) / len(crops)
+
+def _farmer_inputs(farmers, season, seasonal_crops, farmer_preferences, roles, teams):
+    crops = seasonal_crops.get(season, ["corn"])
+    inputs = []
+    members = {}
+    for i, farmer in enumerate(farmers):
+        role = roles[i] if roles else best_role(farmer["strength"], farmer["handy"], farmer["stamina"])
+        inputs.append({
+            "cdf": _task_cdf(farmer, role),
+            "injury": _injury_probability(farmer["physical"]),
+            "preference": _preference_probability(farmer, season, seasonal_crops, farmer_preferences)
+        })
+        if teams:
+            preferred = farmer_preferences.get(farmer["name"], {}).get(season, "")
+            inputs[-1].update({
+                "team": teams[i],
+                "member": members.setdefault(teams[i], 0),
+                "crops": [c for c, crop in enumerate(crops) if crop == preferred]
+            })
+            members[teams[i]] += 1
+    return inputs, len(crops)
+
+def _event_type(roll):
+    return 1 if roll < CATASTROPHE_THRESHOLDS[0] else 0 if roll < CATASTROPHE_THRESHOLDS[1] \
+        else 2 if roll < CATASTROPHE_THRESHOLDS[2] else 3
+
+def _team_rolls(inputs, games, seasons, crop_count, rng):
+    """team -> per season and game (crop index, catastrophe type, member a type 1 hits)"""
+    sizes, lengths = {}, {}
+    for f, farmer in enumerate(inputs):
+        sizes[farmer["team"]] = sizes.get(farmer["team"], 0) + 1
+        lengths[farmer["team"]] = max(lengths.get(farmer["team"], 0), games[f])
+    return {
+        team: [[(rng.randrange(crop_count), _event_type(rng.random()), rng.randrange(size))
+                for _ in range(lengths[team])] for _ in range(seasons)]
+        for team, size in sizes.items()
+    }
+
+def _simulate_python(inputs, games, seasons, rng, per_game=False, crop_count=1):
+    totals = {key: [[0] * seasons for _ in inputs] for key in ("points", "crops", "injuries", "missed")}
+    if per_game:
+        totals["games"] = [[[0] * games[f] for _ in range(seasons)] for f in range(len(inputs))]
+    team_rolls = _team_rolls(inputs, games, seasons, crop_count, rng) if inputs and "team" in inputs[0] else None
+    for f, farmer in enumerate(inputs):
+        values, cumulative = farmer["cdf"]
+        for s in range(seasons):
+            total = crop_total = injured_count = missed = miss_days = 0
+            for game in range(games[f]):
+                if miss_days > 0:
+                    miss_days -= 1
+                    missed += 1
+                    continue
+
+                if team_rolls is not None:
+                    crop, event_type, hit = team_rolls[farmer["team"]][s][game]
+                    preferred = crop in farmer["crops"]
+                    affected = event_type == 1 and hit == farmer["member"]
+                else:
+                    preferred = rng.random() < farmer["preference"]
+                    event_type = _event_type(rng.random())
+                    affected = event_type == 1 and rng.random() < AFFECTED_PROBABILITY
+                pts = values[bisect.bisect_right(cumulative, rng.random())]
+
+                injury_loss = 0
+                if rng.random() < 1 / 3 and rng.random() < farmer["injury"]:
+                    injury_loss = rng.randint(1, 2)
+                    injured_count += 1
+                    if rng.random() < 0.5:
+                        miss_days = rng.randint(1, 2)
+
+                crops = rng.randint(30, 50) if pts > 0 else rng.randint(5, 20)
+                if preferred:
+                    crops = int(crops * 1.5)
+                if injury_loss:
+                    crops = int(crops * 0.4)
+                if affected:
+                    crops = int(crops * 0.4)
+                elif event_type >= 2:
+                    crops = 0
+
+                if affected:
+                    pts -= 1
+                elif event_type == 2:
+                    pts -= 2
+                elif event_type == 3:
+                    pts = 0
+                game_points = max(0, pts - injury_loss) + crops
+                total += game_points
+                crop_total += crops
+                if per_game:
+                    totals["games"][f][s][game] = game_points
+            totals["points"][f][s] = total
+            totals["crops"][f][s] = crop_total
+            totals["injuries"][f][s] = injured_count
+            totals["missed"][f][s] = missed
+    return totals
+
+def _simulate_numpy(inputs, games, seasons, rng, per_game=False, crop_count=1):
+    n = len(inputs)
+    shape = (n, seasons)
+
+    team_of = None
+    if "team" in inputs[0]:
+        # Shared rolls are drawn per team and spread to its farmers by team_of
+        team_ids = {}
+        team_of = np.array([team_ids.setdefault(farmer["team"], len(team_ids)) for farmer in inputs])
+        team_shape = (len(team_ids), seasons)
+        team_size = np.bincount(team_of)[:, None]
+        member = np.array([farmer["member"] for farmer in inputs])[:, None]
+        preferred_crops = np.zeros((n, crop_count), dtype=bool)
+        for f, farmer in enumerate(inputs):
+            preferred_crops[f, farmer["crops"]] = True
+
+    # Row f's CDF is offset by f so one searchsorted samples every farmer at once
+    flat_cdf, flat_values = [], []
+    for f, farmer in enumerate(inputs):
+        values, cumulative = farmer["cdf"]
+        flat_cdf.extend(f + c for c in cumulative)
+        flat_values.extend(values)
+    flat_cdf = np.array(flat_cdf)
+    flat_values = np.array(flat_values)
+    row = np.arange(n)[:, None]
+
+    games = np.array(games)[:, None]
+    injury_p = np.array([farmer["injury"] for farmer in inputs])[:, None]
+    preference_p = np.array([farmer["preference"] for farmer in inputs])[:, None]
+
+    points = np.zeros(shape, dtype=np.int64)
+    crop_totals = np.zeros(shape, dtype=np.int64)
+    injuries = np.zeros(shape, dtype=np.int64)
+    missed = np.zeros(shape, dtype=np.int64)
+    miss_days = np.zeros(shape, dtype=np.int64)
+    per_game_points = []
+
+    for game in range(int(games.max(initial=0))):
+        in_season = game < games
+        playing = in_season & (miss_days == 0)
+        missing = in_season & ~playing
+        miss_days = np.where(missing, miss_days - 1, miss_days)
+        missed += missing
+
+        if team_of is not None:
+            preferred = preferred_crops[row, rng.integers(0, crop_count, team_shape)[team_of]]
+            event_type = np.searchsorted(CATASTROPHE_THRESHOLDS, rng.random(team_shape), side="right")[team_of]
+            hit = (rng.random(team_shape) * team_size).astype(np.int64)[team_of]
+        else:
+            preferred = rng.random(shape) < preference_p
+            event_type = np.searchsorted(CATASTROPHE_THRESHOLDS, rng.random(shape), side="right")
+        event_type = np.choose(event_type, (1, 0, 2, 3))
+        if team_of is not None:
+            affected = (event_type == 1) & (hit == member)
+        else:
+            affected = (event_type == 1) & (rng.random(shape) < AFFECTED_PROBABILITY)
+        pts = flat_values[np.minimum(np.searchsorted(flat_cdf, row + rng.random(shape), side="right"), len(flat_cdf) - 1)]
+
+        injured = playing & (rng.random(shape) < 1 / 3) & (rng.random(shape) < injury_p)
+        injury_loss = np.where(injured, rng.integers(1, 3, shape), 0)
+        new_miss = injured & (rng.random(shape) < 0.5)
+        miss_days = np.where(new_miss, rng.integers(1, 3, shape), miss_days)
+
+        crops = np.where(pts > 0, rng.integers(30, 51, shape), rng.integers(5, 21, shape))
+        crops = np.where(preferred, (crops * 1.5).astype(np.int64), crops)
+        crops = np.where(injured, (crops * 0.4).astype(np.int64), crops)
+        crops = np.where(affected, (crops * 0.4).astype(np.int64), crops)
+        crops = np.where(event_type >= 2, 0, crops)
+
+        pts = np.where(affected, pts - 1, pts)
+        pts = np.where(event_type == 2, pts - 2, pts)
+        pts = np.where(event_type == 3, 0, pts)
+        game_points = np.maximum(0, pts - injury_loss) + crops
+
+        game_points = np.where(playing, game_points, 0)
+        points += game_points
+        crop_totals += np.where(playing, crops, 0)
+        injuries += injured
+        if per_game:
+            per_game_points.append(game_points)
+    totals = {
+        "points": points.tolist(),
+        "crops": crop_totals.tolist(),
+        "injuries": injuries.tolist(),
+        "missed": missed.tolist()
+    }
+    if per_game:
+        stacked = np.stack(per_game_points, axis=2) if per_game_points else np.zeros(shape + (0,), dtype=np.int64)
+        totals["games"] = [stacked[f, :, :games[f, 0]].tolist() for f in range(n)]
+    return totals
+
+def season_totals(farmers, games, seasons=1, season="summer", seasonal_crops=None, farmer_preferences=None,
+                  roles=None, seed=None, use_numpy=None, per_game=False, teams=None):
+    """Simulate farmers playing alone for one or more seasons.
+
+    games is the number of games per season, either one int or one per farmer.
+    Each farmer plays roles[i], or their best role by expected task points.
+    Farmers with the same teams[i] share each game's crop and catastrophe.
+    Returns {"points", "crops", "injuries", "missed"}, each a list per farmer
+    of per-season totals (missed counts games sat out injured). With per_game,
+    "games" also holds each farmer's points per season and game.
+    """
+    if seasonal_crops is None or farmer_preferences is None:
+        import core
+        seasonal_crops = core.load_seasonal_crops() if seasonal_crops is None else seasonal_crops
+        farmer_preferences = core.load_farmer_crop_preferences() if farmer_preferences is None else farmer_preferences
+    if isinstance(games, int):
+        games = [games] * len(farmers)
+    if not farmers:
+        return {"points": [], "crops": [], "injuries": [], "missed": [], **({"games": []} if per_game else {})}
+
+    inputs, crop_count = _farmer_inputs(farmers, season, seasonal_crops, farmer_preferences, roles, teams)
+    if use_numpy is None:
+        use_numpy = np is not None and len(farmers) * seasons >= NUMPY_MIN_BATCH
+    if use_numpy:
+        return _simulate_numpy(inputs, games, seasons, np.random.default_rng(seed), per_game, crop_count)
+    return _simulate_python(inputs, games, seasons, random.Random(seed), per_game, crop_count)
+
+def simulate_seasons(farmers, games, seasons=1, **kwargs):
+    """(points, injuries) per farmer and season; see season_totals()"""
+    totals = season_totals(farmers, games, seasons, **kwargs)
+    return totals["points"], totals["injuries"]
@@ -0,0 +1,216 @@
+# Sharded farm stats: one JSON document per user plus a small index.
+# Select it with FARMINGTON_STORAGE=sharded; shards live under FARMINGTON_STATS_DIR.
+# Matchday history is kept out of the shard, in the append-only log in history.py.
+# Until the first write, reads fall back to the legacy single farm_stats.json.
+import json
+import os
+from urllib.parse import quote
+
+import history
+import storage
+
+STORAGE_BACKEND = os.environ.get("FARMINGTON_STORAGE", "json")
+STATS_DIR = os.environ.get("FARMINGTON_STATS_DIR", "farm_stats")
+LEGACY_STATS_FILE = "farm_stats.json"
+
+def enabled():
+    """True when the sharded stats layout is selected"""
+    return STORAGE_BACKEND == "sharded"
+
+def _index_path():
+    return os.path.join(STATS_DIR, "index.json")
+
+def _shard_name(username):
+    return quote(username, safe="") + ".json"
+
+def _shard_path(username):
+    return os.path.join(STATS_DIR, "users", _shard_name(username))
+
+def _default_user():
+    return {
+        "matchday": 0,
+        "drafted_team": {},
+        "data": []
+    }
+
+def _read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def write_json(path, data):
+    """Write a document through a temp file so readers never see it half-written"""
+    storage.write_json(path, data)
+
+def _index_entry(username, user_stats):
+    return {
+        "file": _shard_name(username),
+        "matchday": user_stats.get("matchday", 0),
+        "entries": user_stats.get("history_start", 0) + len(user_stats.get("data", []))
+    }
+
+def load_index():
+    """The index maps each username to its shard file, matchday and history length"""
+    try:
+        return _read_json(_index_path())
+    except FileNotFoundError:
+        return None
+
+def _load_legacy():
+    try:
+        return _read_json(LEGACY_STATS_FILE)
+    except FileNotFoundError:
+        return {"users": {}}
+
+def _require_index():
+    """Index for a write; splits the legacy file into shards the first time"""
+    index = load_index()
+    if index is None:
+        index = split_legacy_stats()
+    return index
+
+def _read_shard(username, with_history=True):
+    try:
+        user = _read_json(_shard_path(username))
+    except FileNotFoundError:
+        return _default_user()
+    if "data" not in user:
+        user["data"] = history.read_all(username) if with_history else []
+    return user
+
+def _shard_document(user_stats):
+    """The shard keeps everything but the matchday history, which goes to the history log"""
+    return {k: v for k, v in user_stats.items() if k not in ("data", "history_start")}
+
+def stage_history(users):
+    """Stage the history log writes of the given users (see history.prepare()); nothing is visible yet"""
+    pending = []
+    try:
+        for username, user_stats in users.items():
+            entries, start = user_stats.get("data", []), user_stats.get("history_start", 0)
+            if start and history.count(username) < start:
+                # Shard written before the history log: its inline history moves to the log first
+                entries, start = _read_shard(username)["data"][:start] + entries, 0
+            pending.append(history.prepare(username, entries, start))
+    except Exception:
+        discard_history(pending)
+        raise
+    return pending
+
+def publish_history(pending):
+    """Publish staged history writes once the shards they belong to are in place"""
+    for write in pending:
+        history.publish(write)
+
+def discard_history(pending):
+    for write in pending:
+        history.discard(write)
+
+def split_legacy_stats():
+    """Copy every user in the legacy farm_stats.json into its own shard and build the index.
+
+    The legacy file is left untouched.
+    """
+    users = _load_legacy().get("users", {})
+    index = {"users": {}}
+    for username, user_stats in users.items():
+        history.sync(username, user_stats.get("data", []))
+        write_json(_shard_path(username), _shard_document(user_stats))
+        index["users"][username] = _index_entry(username, user_stats)
+    write_json(_index_path(), index)
+    return index
+
+def load_stats():
+    index = load_index()
+    if index is None:
+        return _load_legacy()
+    return {"users": {username: _read_shard(username) for username in index["users"]}}
+
+def save_stats(data):
+    users = data.get("users", {})
+    with storage.locked(_index_path()):
+        index = _require_index()
+        for username in set(index["users"]) - set(users):
+            if os.path.exists(_shard_path(username)):
+                os.remove(_shard_path(username))
+            history.delete(username)
+        write_shards(users, {"users": {}})
+
+def get_user_stats(username):
+    index = load_index()
+    if index is None:
+        return _load_legacy()["users"].get(username, _default_user())
+    if username not in index["users"]:
+        return _default_user()
+    return _read_shard(username)
+
+def get_user_record(username):
+    """The user's shard without loading the matchday history"""
+    index = load_index()
+    if index is None:
+        user = get_user_stats(username)
+    elif username not in index["users"]:
+        user = _default_user()
+    else:
+        user = _read_shard(username, with_history=False)
+    user.pop("data", None)
+    return user
+
+def load_user_records():
+    """Username -> shard without the matchday history, for every user"""
+    index = load_index()
+    if index is None:
+        return {username: {k: v for k, v in user.items() if k != "data"}
+                for username, user in _load_legacy().get("users", {}).items()}
+    return {username: get_user_record(username) for username in index["users"]}
+
+def history_slice(username, start, stop=None):
+    """Matchday entries start..stop; seeks in the history log once shards exist"""
+    if load_index() is None:
+        return _load_legacy()["users"].get(username, _default_user())["data"][start:stop]
+    if not history.count(username):
+        # Shards written before the history log still carry their data inline
+        return _read_shard(username)["data"][start:stop]
+    return history.read_range(username, start, stop)
+
+def farmer_history(username, farmer_name):
+    """Matchday entries the farmer played in for this user"""
+    if load_index() is None:
+        entries = _load_legacy()["users"].get(username, _default_user())["data"]
+        return [e for e in entries if any(f.get("name") == farmer_name for f in e.get("farmers", []))]
+    if not history.count(username):
+        entries = _read_shard(username)["data"]
+        return [e for e in entries if any(f.get("name") == farmer_name for f in e.get("farmers", []))]
+    return history.read_for_farmer(username, farmer_name)
+
+def update_user_stats(username, user_stats):
+    # Hold the index lock so another worker's index update is not overwritten
+    with storage.locked(_index_path()):
+        write_shards({username: user_stats})
+
+def document_paths(usernames):
+    """The index and the given users' shards, for locking them across a read-modify-write"""
+    return [_index_path()] + [_shard_path(username) for username in usernames]
+
+def shard_documents(users, index=None):
+    """Path -> document for the given users' shards plus the updated index"""
+    if index is None:
+        index = _require_index()
+    os.makedirs(os.path.dirname(_shard_path("")), exist_ok=True)
+    documents = {}
+    for username, user_stats in users.items():
+        documents[_shard_path(username)] = _shard_document(user_stats)
+        index["users"][username] = _index_entry(username, user_stats)
+    documents[_index_path()] = index
+    return documents
+
+def write_shards(users, index=None):
+    """Write only the given users' shards, then the index; their history logs' offset indexes go last"""
+    documents = shard_documents(users, index)
+    pending = stage_history(users)
+    try:
+        for path, data in documents.items():
+            write_json(path, data)
+    except Exception:
+        discard_history(pending)
+        raise
+    publish_history(pending)
@@ -1,21 +1,50 @@
 import json
 import os
+from contextlib import contextmanager
+import db
+import farmer_index
+import history
+import leaderboard
+import shards
+import storage
+import totals
+from request_cache import cached_load, invalidate, invalidates
 
 STATS_FILE = "farm_stats.json"
+STORY_FILE = "story.json"
 
+@cached_load("stats")
 def load_stats():
+    if db.enabled():
+        return db.load_stats()
+    if shards.enabled():
+        return shards.load_stats()
     if not os.path.exists(STATS_FILE):
-        with open(STATS_FILE, "w") as f:
-            json.dump({"users": {}}, f)
+        storage.write_json(STATS_FILE, {"users": {}}, indent=None)
         return {"users": {}}
     with open(STATS_FILE, "r") as f:
         return json.load(f)
 
+@invalidates("stats")
 def save_stats(data):
-    with open(STATS_FILE, "w") as f:
-        json.dump(data, f, indent=4)
-
+    points = {username: totals.refresh(user_stats)["points"] for username, user_stats in data.get("users", {}).items()}
+    if db.enabled():
+        db.save_stats(data)
+    elif shards.enabled():
+        shards.save_stats(data)
+    else:
+        storage.write_json(STATS_FILE, data)
+    # The board may need every user's totals again, so read past this request's copies
+    invalidate("stats")
+    leaderboard.update_global(points)
+    farmer_index.save_index(farmer_index.build(data.get("users", {})))
+
+@cached_load("stats")
 def get_user_stats(username):
+    if db.enabled():
+        return db.get_user_stats(username)
+    if shards.enabled():
+        return shards.get_user_stats(username)
     data = load_stats()
     return data["users"].get(username, {
         "matchday": 0,
@@ -23,10 +52,165 @@ def get_user_stats(username):
         "data": []
     })
 
+@invalidates("stats")
 def update_user_stats(username, user_stats):
-    data = load_stats()
-    data["users"][username] = user_stats
-    save_stats(data)
+    points = totals.refresh(user_stats)["points"]
+    if db.enabled():
+        db.update_user_stats(username, user_stats)
+    elif shards.enabled():
+        shards.update_user_stats(username, user_stats)
+    else:
+        # Re-read under the lock so another worker's update to a different user is kept
+        with storage.transaction(STATS_FILE, {"users": {}}) as data:
+            data["users"][username] = user_stats
+    invalidate("stats")
+    leaderboard.update_global({username: points})
+    farmer_index.update_users({username: user_stats})
+
+@contextmanager
+def update_user(username):
+    """Read the user under their store's lock, yield the record to change and write it back.
+
+    Roster and profile edits go through here rather than update_user_stats(), so a
+    matchday committed since the page read the user is not overwritten.
+    """
+    if db.enabled():
+        with db.transaction():
+            user_stats = db.get_user_stats(username)
+            yield user_stats
+            points = totals.refresh(user_stats)["points"]
+            db.update_user_stats(username, user_stats)
+    elif shards.enabled():
+        with storage.locked_all(shards.document_paths([username])):
+            user_stats = shards.get_user_stats(username)
+            yield user_stats
+            points = totals.refresh(user_stats)["points"]
+            shards.update_user_stats(username, user_stats)
+    else:
+        with storage.transaction(STATS_FILE, {"users": {}}) as data:
+            user_stats = data["users"].setdefault(username, {"matchday": 0, "drafted_team": {}, "data": []})
+            yield user_stats
+            points = totals.refresh(user_stats)["points"]
+    invalidate("stats")
+    leaderboard.update_global({username: points})
+    farmer_index.update_users({username: user_stats})
+
+def reset_user(username):
+    """Clear the user's team and matchday history, keeping nothing of the old record"""
+    with update_user(username) as user_stats:
+        user_stats.clear()
+        user_stats.update({"matchday": 0, "drafted_team": {}, "data": []})
+
+@invalidates("stats")
+def rewrite_user_history(username, user_stats):
+    """Store the user with their whole matchday history rewritten, not only appended to"""
+    user_stats["totals"] = totals.build(user_stats.get("data", []))
+    if db.enabled():
+        db.update_user_stats(username, user_stats)
+        db.replace_history(username, user_stats.get("data", []))
+    elif shards.enabled():
+        if shards.load_index() is not None:
+            history.rewrite(username, user_stats.get("data", []))
+        shards.update_user_stats(username, user_stats)
+    else:
+        return update_user_stats(username, user_stats)
+    farmer_index.update_users({username: user_stats})
+
+@cached_load("stats")
+def get_user_record(username):
+    """A user's record (matchday, drafted team, ...) without the matchday history"""
+    if db.enabled():
+        return db.get_user_record(username)
+    if shards.enabled():
+        return shards.get_user_record(username)
+    user_stats = dict(get_user_stats(username))
+    user_stats.pop("data", None)
+    return user_stats
+
+@cached_load("stats")
+def get_user_totals(username):
+    """The user's running totals (see totals.py), read from their record when stored"""
+    record = get_user_record(username)
+    if record.get("totals", {}).get("version") == totals.VERSION:
+        return record["totals"]
+    return totals.of(get_user_stats(username))
+
+@cached_load("stats")
+def get_cycle_ledger(username, cycle):
+    """{"points", "matchdays", "farmers": {name: points}} of the user's cycle k"""
+    return totals.ledger_entry(get_user_totals(username), cycle)
+
+@cached_load("stats")
+def load_user_records():
+    """Username -> record with its running totals but without the history, for every user"""
+    if db.enabled():
+        records = db.load_user_records()
+    elif shards.enabled():
+        records = shards.load_user_records()
+    else:
+        records = {}
+        for username, user_stats in load_stats()["users"].items():
+            records[username] = {k: v for k, v in user_stats.items() if k != "data"}
+            records[username]["totals"] = totals.of(user_stats)
+        return records
+    for username, record in records.items():
+        if record.get("totals", {}).get("version") != totals.VERSION:
+            # Users last written before these totals were kept; totals.py stores them
+            record["totals"] = totals.of(get_user_stats(username))
+    return records
+
+def load_user_totals():
+    """Username -> running totals for every user"""
+    return {username: record["totals"] for username, record in load_user_records().items()}
+
+@cached_load("stats")
+def get_recent_matchdays(username, n):
+    """The user's last n matchday entries, oldest first"""
+    if n <= 0:
+        return []
+    if db.enabled():
+        return db.history_slice(username, -n)
+    if shards.enabled():
+        return shards.history_slice(username, -n)
+    return get_user_stats(username).get("data", [])[-n:]
+
+@cached_load("stats")
+def get_cycle_matchdays(username, cycle):
+    """The three matchday entries of matchup cycle k for the user"""
+    start = cycle * 3
+    if db.enabled():
+        return db.history_slice(username, start, start + 3)
+    if shards.enabled():
+        return shards.history_slice(username, start, start + 3)
+    return get_user_stats(username).get("data", [])[start:start + 3]
+
+@cached_load("stats")
+def get_farmer_matchdays(username, farmer_name):
+    """The user's matchday entries that the farmer played in"""
+    if db.enabled():
+        return db.farmer_history(username, farmer_name)
+    if shards.enabled():
+        return shards.farmer_history(username, farmer_name)
+    return [
+        entry for entry in get_user_stats(username).get("data", [])
+        if any(farmer.get("name") == farmer_name for farmer in entry.get("farmers", []))
+    ]
+
+@cached_load("stories")
+def load_stories():
+    if db.enabled():
+        return db.load_stories()
+    try:
+        with open(STORY_FILE, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+@invalidates("stories")
+def save_stories(stories):
+    if db.enabled():
+        return db.save_stories(stories)
+    storage.write_json(STORY_FILE, stories)
 
 def get_global_farmer_stats():
     """Get performance statistics for all farmers across all teams"""
@@ -69,125 +253,3 @@ def get_global_farmer_stats():
     # Sort by total points descending
     farmer_list.sort(key=lambda x: x["total_points"], reverse=True)
     return farmer_list
-
-def get_match_stats_html(username):
-    user_data = get_user_stats(username)
-    stats_data = user_data
-    html = ""
-
-    # Total points by farmer
-    final_totals = {}
-    final_matches = {}
-    final_jobs = {}
-    for entry in stats_data["data"]:
-        for farmer in entry["farmers"]:
-            name = farmer["name"]
-            job = farmer["job"]
-            pts = farmer["points_after_catastrophe"]
-            final_totals[name] = final_totals.get(name, 0) + pts
-            final_matches[name] = final_matches.get(name, 0) + 1
-            final_jobs[name] = job
-
-    html += "<h5>🏆 Total Points by Farmer</h5><ul>"
-    sorted_farmers = sorted(final_totals.items(), key=lambda x: x[1], reverse=True)
-    for farmer, total_pts in sorted_farmers:
-        job = final_jobs.get(farmer, "N/A")
-        html += f"<li><strong>{farmer}</strong>: {total_pts} points over {final_matches[farmer]} matchday(s) as {job}</li>"
-    html += "</ul>"
-
-    html += "<h4>🌾 Farmington Matchday History</h4><hr>"
-
-    # Averages
-    farmer_totals = {}
-    farmer_matches = {}
-    matchday_avgs = {}
-
-    # First pass to calculate cumulative injuries per matchday
-    cumulative_injuries_by_day = {}
-    cumulative_injury_points_by_day = {}
-    running_injuries = {}
-    running_injury_points = {}
-
-    for entry in stats_data["data"]:
-        matchday = entry["matchday"]
-        cumulative_injuries_by_day[matchday] = {}
-        cumulative_injury_points_by_day[matchday] = {}
-        for farmer in entry["farmers"]:
-            name = farmer["name"]
-            inj = farmer.get("injuries_this_season", 0)
-            injpts = farmer.get("injury_points_lost", 0)
-            running_injuries[name] = running_injuries.get(name, 0) + inj
-            running_injury_points[name] = running_injury_points.get(name, 0) + injpts
-            cumulative_injuries_by_day[matchday][name] = running_injuries[name]
-            cumulative_injury_points_by_day[matchday][name] = running_injury_points[name]
-
-    # Second pass for rendering
-    for entry in stats_data["data"]:
-        matchday = entry["matchday"]
-        matchday_avgs[matchday] = {}
-        for farmer in entry["farmers"]:
-            name = farmer["name"]
-            pts = farmer["points_after_catastrophe"]
-            farmer_totals[name] = farmer_totals.get(name, 0) + pts
-            farmer_matches[name] = farmer_matches.get(name, 0) + 1
-            avg = farmer_totals[name] / farmer_matches[name]
-            matchday_avgs[matchday][name] = avg
-
-    for entry in reversed(stats_data["data"]):
-        matchday = entry["matchday"]
-        season = entry["season"]
-        affected = entry["affected_farmer"]
-        farmers = entry["farmers"]
-
-        html += f"<h5>Matchday {matchday} — {season.title()}</h5>"
-        html += f"<p><strong>Daily Crop:</strong> {entry.get('daily_crop', 'N/A').title()}</p>"
-        html += "<div class='table-responsive'>"
-        html += "<table class='table table-sm table-bordered'><thead><tr>"
-        html += "<th>Name</th><th>Job</th><th>Total</th><th>Task Pts</th><th>Crop Pts</th><th>CatLoss</th><th>InjLoss</th><th>InjTot</th><th>InjPtTot</th><th>Avg</th></tr></thead><tbody>"
-
-        match_total = 0
-        for farmer in farmers:
-            name = farmer["name"]
-            job = farmer["job"]
-            total_pts = farmer["points_after_catastrophe"]
-            crop_pts = farmer.get("crop_points", 0)
-            task_pts = total_pts - crop_pts  # Calculate task points by subtracting crop points from total
-            catlost = farmer.get("catastrophe_loss", 0)
-            injlost = farmer.get("daily_injury_loss", 0)
-
-            injtot = cumulative_injuries_by_day[matchday].get(name, 0)
-            injptot = cumulative_injury_points_by_day[matchday].get(name, 0)
-
-            avg = matchday_avgs[matchday].get(name, 0.0)
-            cat_flag = "ABC" if affected == name else ""
-
-            # Add heart emoji if preferred crop matches daily crop
-            heart_emoji = ""
-            daily_crop = entry.get('daily_crop', 'N/A').lower()
-            
-            # Load farmer crop preferences
-            try:
-                import json
-                with open('farmer_crop_preferences.json', 'r') as f:
-                    farmer_preferences = json.load(f)
-                
-                # Get current season from the entry
-                current_season = season.lower()
-                
-                # Check if farmer has a preference for this season that matches daily crop
-                if name in farmer_preferences:
-                    preferred_crop = farmer_preferences[name].get(current_season, "").lower()
-                    if preferred_crop == daily_crop:
-                        heart_emoji = " ❤️"
-            except:
-                pass  # If file doesn't exist or other error, just skip the heart emoji
-
-            html += f"<tr><td>{name}{heart_emoji}</td><td>{job}</td><td>{total_pts}</td><td>{task_pts}</td><td>{crop_pts}</td><td>{catlost} {cat_flag}</td><td>{injlost}</td><td>{injtot}</td><td>{injptot}</td><td>{avg:.2f}</td></tr>"
-            match_total += total_pts
-
-        html += "</tbody></table>"
-        html += "</div>"
-        html += f"<p><strong>Total points this matchday:</strong> {match_total}</p><hr>"
-
-    return html
-
@@ -0,0 +1,84 @@
+# Atomic, lock-protected JSON files so several gunicorn workers can share them.
+# Writes go to a temp file next to the target and are swapped in with os.replace(),
+# so readers never see a truncated document. Writers serialize on an fcntl advisory
+# lock held on a sidecar "<path>.lock" file; transaction() holds that lock across a
+# read-modify-write so concurrent updates are not lost.
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager, ExitStack
+
+_held = threading.local()
+
+def _lock_path(path):
+    return os.path.abspath(path) + ".lock"
+
+@contextmanager
+def locked(path, shared=False):
+    """Hold the advisory lock for path (exclusive unless shared) for the block.
+
+    Re-entrant within a thread: nested writes under a transaction reuse its lock.
+    """
+    lock_path = _lock_path(path)
+    held = _held.__dict__.setdefault("paths", set())
+    if lock_path in held:
+        yield
+        return
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        held.add(lock_path)
+        try:
+            yield
+        finally:
+            held.discard(lock_path)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+@contextmanager
+def locked_all(paths):
+    """Exclusive locks on several paths, taken in a fixed order so writers cannot deadlock"""
+    with ExitStack() as stack:
+        for path in sorted(set(os.path.abspath(p) for p in paths)):
+            stack.enter_context(locked(path))
+        yield
+
+def stage_json(path, data, indent=4):
+    """Serialize data to a fsynced temp file next to path and return the temp path"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+def write_json(path, data, indent=4):
+    """Replace path with data atomically, under the path's lock"""
+    with locked(path):
+        os.replace(stage_json(path, data, indent), path)
+
+def read_json(path, default=None):
+    """Parsed contents of path, or default if it does not exist"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+@contextmanager
+def transaction(path, default=None, indent=4):
+    """Read path under its lock, yield the document and write it back if the block succeeds.
+
+    default is used (and written) when the file does not exist yet.
+    """
+    with locked(path):
+        data = read_json(path, default)
+        yield data
+        write_json(path, data, indent)
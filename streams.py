@@ -0,0 +1,29 @@
+# Deterministic random streams.
+# Each piece of simulation draws from its own random.Random seeded by hashing a
+# stable key such as (league seed, matchday, user, farmer). No process-wide random
+# state is shared, so leagues can be simulated in any worker process and a matchday
+# replays exactly when it is simulated again from the same inputs.
+import hashlib
+import random
+import secrets
+
+def new_seed():
+    """A fresh 64-bit seed for a league or season"""
+    return secrets.randbits(64)
+
+def derive_seed(*key):
+    """A 64-bit seed from a key of strings and ints; stable across processes and runs"""
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+def stream(*key):
+    """An independent random.Random for the key"""
+    return random.Random(derive_seed(*key))
+
+def league_seed(league):
+    """The league's seed; leagues created before seeds existed fall back to their code"""
+    return league.get("rng_seed", league.get("code", ""))
+
+def league_stream(league, *key):
+    """A stream for key within the league, e.g. league_stream(league, matchday, username)"""
+    return stream(league_seed(league), *key)
@@ -0,0 +1,75 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db
+import shards
+
+BACKENDS = ("json", "sqlite", "sharded")
+# Read-only game data the engine loads by relative path
+DATA_FILES = ("farmer_pool.json", "seasonal_crops.json", "farmer_crop_preferences.json")
+
+def _use_backend(backend, tmp_path, monkeypatch):
+    for name in DATA_FILES:
+        shutil.copy(os.path.join(ROOT, name), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db, "STORAGE_BACKEND", backend)
+    monkeypatch.setattr(db, "DATABASE_PATH", str(tmp_path / "farmington.db"))
+    monkeypatch.setattr(shards, "STORAGE_BACKEND", backend)
+    monkeypatch.setattr(shards, "STATS_DIR", str(tmp_path / "farm_stats"))
+    db._local.conn = None
+
+def _close_connection():
+    conn = getattr(db._local, "conn", None)
+    if conn is not None:
+        conn.close()
+    db._local.conn = None
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, tmp_path, monkeypatch):
+    """Each storage backend in turn, with every store in a fresh directory"""
+    _use_backend(request.param, tmp_path, monkeypatch)
+    yield request.param
+    _close_connection()
+
+@pytest.fixture
+def sharded(tmp_path, monkeypatch):
+    _use_backend("sharded", tmp_path, monkeypatch)
+    yield "sharded"
+    _close_connection()
+
+@pytest.fixture
+def use_backend(tmp_path, monkeypatch):
+    """use_backend(name) switches to that backend in a fresh directory, for comparing them"""
+    def use(name):
+        _close_connection()
+        path = tmp_path / name
+        path.mkdir()
+        _use_backend(name, path, monkeypatch)
+    yield use
+    _close_connection()
+
+@pytest.fixture
+def make_entry():
+    """make_entry(matchday, {farmer: points}) -> a matchday history entry"""
+    def make(matchday, points, jobs=None):
+        jobs = jobs or {}
+        return {
+            "matchday": matchday,
+            "season": "summer",
+            "daily_crop": "corn",
+            "catastrophe_loss": 0,
+            "affected_farmer": None,
+            "farmers": [
+                {"name": name, "job": jobs.get(name, "Lift Tender"), "points_after_catastrophe": p,
+                 "crop_points": p // 2, "daily_injury_loss": 0, "injuries_this_season": 0,
+                 "injury_points_lost": 0, "miss_days": 0}
+                for name, p in points.items()
+            ]
+        }
+    return make
@@ -0,0 +1,61 @@
+import threading
+
+import farmer_index
+import stats
+
+def _user(make_entry, team, points):
+    data = [make_entry(n, {name: p for name, p in points.items()}) for n in (1, 2)]
+    return {"matchday": 2, "drafted_team": {role: {"name": name} for role, name in team.items()}, "data": data}
+
+def test_index_follows_roster_changes(make_entry):
+    index = farmer_index.build({"alice": _user(make_entry, {"Lift Tender": "Ada"}, {"Ada": 4})})
+    assert index["users"] == {"alice": {"Lift Tender": "Ada"}}
+    assert index["farmers"]["Ada"]["alice"]["points"] == 8
+
+    farmer_index.apply_user(index, "alice", _user(make_entry, {"Lift Tender": "Bo"}, {"Bo": 1}))
+    assert set(index["farmers"]) == {"Bo"}
+    farmer_index.apply_user(index, "alice", None)
+    assert index == farmer_index.empty()
+
+def test_summary_combines_owners(make_entry):
+    index = farmer_index.build({
+        "alice": _user(make_entry, {"Lift Tender": "Ada", "Fix Meiser": "Bo"}, {"Ada": 4, "Bo": 1}),
+        "bob": _user(make_entry, {"Lift Tender": "Ada"}, {"Ada": 2})
+    })
+    summary = farmer_index.summarize("Ada", index["farmers"]["Ada"])
+    assert summary["total_points"] == 12
+    assert summary["matchdays"] == 4
+    assert summary["average"] == 3
+    assert summary["best"] == 4
+    assert summary["owner"] == "alice"
+
+def test_stored_index_tracks_user_writes(backend, make_entry):
+    stats.update_user_stats("alice", _user(make_entry, {"Lift Tender": "Ada"}, {"Ada": 4}))
+    stats.update_user_stats("bob", _user(make_entry, {"Lift Tender": "Cy"}, {"Cy": 6}))
+
+    summaries = farmer_index.farmer_summaries(viewer="alice")
+    assert set(summaries) == {"Ada", "Cy"}
+    assert summaries["Ada"]["vs_your_role_diff"] is None
+    assert summaries["Cy"]["vs_your_role_diff"] == 12 - 8
+    assert farmer_index.farmer_summary("Nobody") is None
+    rebuilt = farmer_index.build(stats.load_stats()["users"])
+    assert {k: farmer_index.get_index()[k] for k in rebuilt} == rebuilt
+
+def test_unchanged_shares_are_not_written(backend, make_entry):
+    user = _user(make_entry, {"Lift Tender": "Ada"}, {"Ada": 4})
+    stats.update_user_stats("alice", user)
+    written = farmer_index.load_index()["updated_at"]
+
+    farmer_index.update_users({"alice": {**user, "team_name": "Renamed"}})
+    assert farmer_index.load_index()["updated_at"] == written
+
+def test_concurrent_updates_are_all_kept(backend, make_entry):
+    farmer_index.save_index(farmer_index.empty())
+    users = {f"user{i}": _user(make_entry, {"Lift Tender": f"Farmer {i}"}, {f"Farmer {i}": i}) for i in range(8)}
+    threads = [threading.Thread(target=farmer_index.update_users, args=({u: s},)) for u, s in users.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(farmer_index.load_index()["users"]) == set(users)
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+import history
+import matchday
+import shards
+import stats
+
+def _entries(make_entry, matchdays):
+    return [make_entry(n, {"Ada": n, "Bo": 1} if n % 2 else {"Ada": n}) for n in matchdays]
+
+def _temp_files():
+    return [name for name in os.listdir(history.history_dir()) if name.startswith(".tmp_")]
+
+def test_sync_appends_and_seeks(sharded, make_entry):
+    entries = _entries(make_entry, range(1, 8))
+    history.sync("alice", entries[:3])
+    history.sync("alice", entries)
+
+    assert history.count("alice") == 7
+    assert history.read_all("alice") == entries
+    assert history.read_range("alice", -2) == entries[-2:]
+    assert history.read_range("alice", 3, 6) == entries[3:6]
+    assert history.read_for_farmer("alice", "Bo") == entries[::2]
+
+def test_reset_clears_the_log(sharded, make_entry):
+    history.sync("alice", _entries(make_entry, range(1, 6)))
+    history.sync("alice", [])
+
+    assert history.count("alice") == 0
+    assert history.read_all("alice") == []
+    assert _temp_files() == []
+
+def test_shorter_or_diverging_history_is_rewritten(sharded, make_entry):
+    entries = _entries(make_entry, range(1, 6))
+    history.sync("alice", entries)
+    history.sync("alice", entries[:2])
+    assert history.read_all("alice") == entries[:2]
+
+    replacement = _entries(make_entry, (7, 8, 9))
+    history.sync("alice", replacement)
+    assert history.read_all("alice") == replacement
+    assert history.read_for_farmer("alice", "Bo") == [replacement[0], replacement[2]]
+
+def test_discarded_writes_leave_the_log_unchanged(sharded, make_entry):
+    entries = _entries(make_entry, range(1, 5))
+    history.sync("alice", entries)
+
+    history.discard(history.prepare("alice", entries + _entries(make_entry, (5, 6))))
+    history.discard(history.prepare("alice", []))
+
+    assert history.read_all("alice") == entries
+    assert _temp_files() == []
+    # The bytes of the discarded append are overwritten by the next one
+    history.sync("alice", entries + _entries(make_entry, (5,)))
+    assert history.read_range("alice", -1)[0]["matchday"] == 5
+
+def test_tail_is_appended_after_the_stored_history(sharded, make_entry):
+    entries = _entries(make_entry, range(1, 7))
+    history.sync("alice", entries[:5])
+
+    history.publish(history.prepare("alice", entries[4:], start=4))
+    assert history.read_all("alice") == entries
+
+    with pytest.raises(ValueError):
+        history.prepare("alice", entries[1:2], start=1)
+    with pytest.raises(ValueError):
+        history.prepare("alice", _entries(make_entry, (40, 41)), start=5)
+
+def test_failed_commit_does_not_publish_history(sharded, make_entry, monkeypatch):
+    user = {"matchday": 3, "drafted_team": {}, "data": _entries(make_entry, range(1, 4))}
+    stats.update_user_stats("alice", user)
+
+    grown = {**user, "matchday": 4, "data": user["data"] + _entries(make_entry, (4,))}
+    documents = shards.shard_documents({"alice": grown})
+    documents[stats.STORY_FILE] = {}
+
+    replace = os.replace
+    def failing_replace(src, dst):
+        if dst == stats.STORY_FILE:
+            raise OSError("disk full")
+        return replace(src, dst)
+    monkeypatch.setattr(os, "replace", failing_replace)
+
+    with pytest.raises(OSError):
+        matchday._write_json_files(documents, {"alice": grown})
+    monkeypatch.setattr(os, "replace", replace)
+
+    assert history.count("alice") == 3
+    assert history.read_all("alice") == user["data"]
+    assert _temp_files() == []
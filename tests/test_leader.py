@@ -0,0 +1,42 @@
+import db
+import leader
+
+def _stored():
+    if db.enabled():
+        return db.load_scheduler_lease()
+    with open(leader.LEASE_FILE) as f:
+        return f.read()
+
+def test_lease_is_held_renewed_and_released(backend, monkeypatch):
+    monkeypatch.setattr(leader, "owner_id", lambda: "a")
+    assert leader.acquire()
+    first = leader.current()["lease"]
+    assert leader.acquire()
+    renewed = leader.current()["lease"]
+    assert renewed["acquired_at"] == first["acquired_at"]
+    assert renewed["expires_at"] >= first["expires_at"]
+
+    monkeypatch.setattr(leader, "owner_id", lambda: "b")
+    assert not leader.acquire()
+
+    monkeypatch.setattr(leader, "owner_id", lambda: "a")
+    leader.release()
+    assert leader.current()["lease"] is None
+    monkeypatch.setattr(leader, "owner_id", lambda: "b")
+    assert leader.acquire()
+    assert leader.current()["lease"]["owner"] == "b"
+
+def test_losing_workers_do_not_rewrite_the_lease(backend, monkeypatch):
+    monkeypatch.setattr(leader, "owner_id", lambda: "a")
+    leader.acquire()
+    stored = _stored()
+
+    writes = []
+    monkeypatch.setattr(leader.storage, "write_json", lambda *args: writes.append(args))
+    monkeypatch.setattr(leader.db, "save_scheduler_lease", lambda lease: writes.append(lease))
+    monkeypatch.setattr(leader, "owner_id", lambda: "b")
+    assert not leader.acquire()
+    leader.release()
+
+    assert writes == []
+    assert _stored() == stored
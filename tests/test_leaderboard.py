@@ -0,0 +1,61 @@
+import threading
+
+import leaderboard
+
+def _board(n):
+    return {"entries": [{"username": f"user{i:02}", "total_points": 100 - i} for i in range(n)]}
+
+def test_board_page_cursors():
+    board = _board(7)
+    first, cursor = leaderboard.board_page(board, limit=3)
+    assert [e["rank"] for e in first] == [1, 2, 3]
+    assert cursor == 3
+    second, cursor = leaderboard.board_page(board, cursor, limit=3)
+    assert [e["username"] for e in second] == ["user03", "user04", "user05"]
+    assert [e["rank"] for e in second] == [4, 5, 6]
+    last, cursor = leaderboard.board_page(board, cursor, limit=3)
+    assert [e["rank"] for e in last] == [7]
+    assert cursor is None
+
+def test_board_page_ends_exactly_and_past_the_end():
+    board = _board(6)
+    page, cursor = leaderboard.board_page(board, 3, limit=3)
+    assert len(page) == 3 and cursor is None
+    assert leaderboard.board_page(board, 10, limit=3) == ([], None)
+    assert leaderboard.board_page({"entries": []}) == ([], None)
+
+def test_global_board_is_updated_in_place(backend, monkeypatch):
+    monkeypatch.setattr(leaderboard, "LEADERBOARD_SIZE", 3)
+    leaderboard.rebuild_global({"a": {"points": 5}, "b": {"points": 9}})
+    board = leaderboard.update_global({"c": 7, "a": 1})
+    assert [(e["username"], e["total_points"]) for e in board["entries"]] == [("b", 9), ("c", 7), ("a", 1)]
+
+    # Past the size limit the lowest falls off and the board is no longer complete
+    board = leaderboard.update_global({"d": 8})
+    assert [e["username"] for e in board["entries"]] == ["b", "d", "c"]
+    assert board["complete"] is False
+    assert leaderboard.global_board() == board
+
+def test_concurrent_global_updates_are_all_kept(backend):
+    leaderboard.rebuild_global({})
+    threads = [threading.Thread(target=leaderboard.update_global, args=({f"user{i}": i + 1},)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {e["username"] for e in leaderboard.global_board()["entries"]} == {f"user{i}" for i in range(8)}
+
+def test_league_board_ranks_by_tier_wins_then_points():
+    league = {
+        "code": "ABC", "players": ["a", "b", "c", "d"], "use_playoffs": True, "brackets_created": True,
+        "playoff_brackets": {"winners": ["c", "d"], "losers": ["a", "b"]},
+        "playoff_records": {"a": {"wins": 5, "losses": 0, "ties": 0}, "b": {"wins": 1, "losses": 0, "ties": 0},
+                            "c": {"wins": 2, "losses": 0, "ties": 0}, "d": {"wins": 2, "losses": 0, "ties": 0}}
+    }
+    user_totals = {"a": {"points": 50}, "b": {"points": 10}, "c": {"points": 20}, "d": {"points": 30}}
+    board = leaderboard.build_league_board(league, user_totals)
+    assert [e["username"] for e in board["entries"]] == ["d", "c", "a", "b"]
+
+    no_playoffs = {**league, "use_playoffs": False}
+    assert [e["username"] for e in leaderboard.build_league_board(no_playoffs, user_totals)["entries"]] == ["a", "d", "c", "b"]
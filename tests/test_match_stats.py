@@ -0,0 +1,23 @@
+import match_stats
+import totals
+
+def test_rows_carry_the_running_figures(make_entry):
+    data = [make_entry(n, {"Ada": 2 * n, "Bo": 1}) for n in (1, 2, 3)]
+    rows = match_stats.matchday_rows(data, farmer_preferences={})
+
+    assert [row["matchday"] for row in rows] == [3, 2, 1]
+    assert rows[0]["total"] == 6 + 1
+    ada = rows[0]["farmers"][0]
+    assert ada["average"] == 4
+    assert ada["crop_points"] == 3
+    assert ada["task_points"] == 3
+
+def test_rows_do_not_change_the_history(make_entry):
+    data = [make_entry(n, {"Ada": n}) for n in (1, 2)]
+    rows = match_stats.matchday_rows(data, farmer_preferences={})
+    assert [row["farmers"][0]["average"] for row in rows] == [1.5, 1]
+    assert data == [make_entry(n, {"Ada": n}) for n in (1, 2)]
+
+def test_farmer_rows_are_ordered_by_points(make_entry):
+    user_totals = totals.build([make_entry(1, {"Ada": 2, "Bo": 5})])
+    assert match_stats.farmer_rows(user_totals) == [("Bo", 5, 1, "Lift Tender"), ("Ada", 2, 1, "Lift Tender")]
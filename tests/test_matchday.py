@@ -0,0 +1,154 @@
+import contextlib
+import importlib
+import io
+import json
+
+import core
+import db
+import matchday
+import stats
+import storage
+import totals
+from conftest import BACKENDS
+
+ROLES = ("Fix Meiser", "Lift Tender", "Speed Runner")
+PLAYERS = ("alice", "bob", "carl", "dana")
+SCHEDULE = {"alice": ["bob", "carl", "dana", "bob"], "bob": ["alice", "dana", "carl", "alice"],
+            "carl": ["dana", "alice", "bob", "dana"], "dana": ["carl", "bob", "alice", "carl"]}
+
+def save_leagues(leagues):
+    if db.enabled():
+        db.save_leagues(leagues)
+    else:
+        storage.write_json(matchday.LEAGUES_FILE, leagues)
+
+def setup_league(matchdays=12, others=("erin",)):
+    """League ABC of four drafted players plus an idle league XYZ of others"""
+    with open("farmer_pool.json") as f:
+        pool = json.load(f)
+    users = {}
+    for i, username in enumerate(PLAYERS + others):
+        team = {role: pool[(3 * i + j) % len(pool)] for j, role in enumerate(ROLES)}
+        users[username] = {"matchday": 0, "drafted_team": team, "data": []}
+    stats.save_stats({"users": users})
+    save_leagues({
+        "ABC": {"code": "ABC", "players": list(PLAYERS), "matchday": 0, "matchdays": matchdays, "season": "summer",
+                "use_playoffs": True, "draft_complete": True, "rng_seed": 7, "matchup_schedule": SCHEDULE},
+        "XYZ": {"code": "XYZ", "players": list(others), "matchday": 0, "matchdays": matchdays, "season": "summer",
+                "draft_complete": False}
+    })
+
+def run(times=1, league_code="ABC"):
+    # core.py narrates every roll
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(times):
+            matchday.run_leagues_matchday([league_code], workers=1)
+
+def test_state_loads_only_the_due_leagues_players(backend):
+    setup_league()
+    run(4)
+    state = matchday.MatchdayState(["ABC"])
+
+    assert set(state.stats["users"]) == set(PLAYERS)
+    for username, user in state.stats["users"].items():
+        if backend == "json":
+            assert len(user["data"]) == 4
+        else:
+            assert user["history_start"] == 3
+            assert [e["matchday"] for e in user["data"]] == [4]
+        assert totals.of(user) == stats.get_user_totals(username)
+
+def test_matchdays_extend_the_stored_history(backend):
+    setup_league()
+    run(5)
+
+    for username in PLAYERS:
+        user = stats.get_user_stats(username)
+        assert [e["matchday"] for e in user["data"]] == [1, 2, 3, 4, 5]
+        assert "history_start" not in stats.get_user_record(username)
+        assert stats.get_user_totals(username) == totals.build(user["data"])
+    assert core.load_leagues()["ABC"]["matchday"] == 5
+
+def test_results_do_not_depend_on_the_backend(use_backend):
+    results = []
+    for backend in BACKENDS:
+        use_backend(backend)
+        setup_league()
+        run(6)
+        histories = {username: stats.get_user_stats(username)["data"] for username in PLAYERS}
+        results.append((histories, core.load_leagues()["ABC"]["playoff_records"]))
+    # Streams come from the league seed, so every layout plays the same matchdays
+    assert all(result == results[0] for result in results)
+
+def test_reset_during_a_matchday_is_kept(backend, monkeypatch):
+    setup_league()
+    run(3)
+    advance = matchday.advance_leagues
+
+    def reset_meanwhile(state, league_codes, workers=None):
+        processed = advance(state, league_codes, workers)
+        stats.update_user_stats("carl", {**stats.get_user_record("carl"), "matchday": 0, "data": []})
+        return processed
+    monkeypatch.setattr(matchday, "advance_leagues", reset_meanwhile)
+    run()
+
+    assert [e["matchday"] for e in stats.get_user_stats("alice")["data"]] == [1, 2, 3, 4]
+    if backend != "json":
+        # The JSON layout holds whole histories and writes carl's back
+        assert stats.get_user_stats("carl")["data"] == []
+        assert stats.get_user_totals("carl")["entries"] == 0
+
+def test_writes_during_a_matchday_are_kept(backend, monkeypatch):
+    setup_league()
+    advance = matchday.advance_leagues
+
+    def write_meanwhile(state, league_codes, workers=None):
+        processed = advance(state, league_codes, workers)
+        leagues = core.load_leagues()
+        leagues["XYZ"]["players"].append("zed")
+        leagues["ABC"]["name"] = "Renamed"
+        save_leagues(leagues)
+        stats.update_user_stats("bob", {**stats.get_user_stats("bob"), "team_name": "Bobcats"})
+        return processed
+    monkeypatch.setattr(matchday, "advance_leagues", write_meanwhile)
+    run()
+
+    leagues = core.load_leagues()
+    assert leagues["XYZ"]["players"] == ["erin", "zed"]
+    assert leagues["ABC"]["name"] == "Renamed"
+    assert leagues["ABC"]["matchday"] == 1
+    bob = stats.get_user_stats("bob")
+    assert bob["team_name"] == "Bobcats"
+    assert len(bob["data"]) == 1
+
+def test_a_season_plays_every_matchday(backend):
+    setup_league(matchdays=12)
+    run(15)
+
+    league = core.load_leagues()["ABC"]
+    assert league["matchday"] == 12
+    assert not matchday.league_is_active(league)
+    for username in PLAYERS:
+        assert [e["matchday"] for e in stats.get_user_stats(username)["data"]] == list(range(1, 13))
+        # check_and_finish_league() ends the season once a player's matchday reaches the limit
+        assert stats.get_user_record(username)["matchday"] == 12
+    # Every cycle, the last one included, is recorded for every player
+    assert sum(sum(record.values()) for record in league["playoff_records"].values()) == 4 * len(PLAYERS)
+
+def test_new_season_resets_only_the_leagues_players(backend):
+    setup_league()
+    run(3)
+    with stats.update_user("erin") as erin:
+        erin["team_name"] = "Erins"
+    leagues = core.load_leagues()
+    leagues["ABC"].update({"name": "ABC", "host": "alice", "playoff_cutoff": 2, "lock_market_in_playoffs": False})
+    save_leagues(leagues)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert importlib.import_module("continue").reset_league_for_new_season("ABC")
+
+    for username in PLAYERS:
+        user = stats.get_user_stats(username)
+        assert (user["matchday"], user["drafted_team"], user["data"]) == (0, {}, [])
+        assert stats.get_user_totals(username)["entries"] == 0
+    assert stats.get_user_record("erin")["team_name"] == "Erins"
+    assert stats.get_user_record("erin")["drafted_team"]
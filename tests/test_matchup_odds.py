@@ -0,0 +1,42 @@
+import json
+
+import core
+import matchup_odds
+import stats
+from test_matchday import run, setup_league
+
+def _pool(league_code):
+    with open("farmer_pool.json") as f:
+        return json.load(f)
+
+def _league():
+    return core.load_leagues()["ABC"]
+
+def test_odds_add_up_and_a_bye_is_a_win(backend):
+    setup_league()
+    run(1)
+    odds = matchup_odds.current_cycle_odds("alice", "bob", _league(), _pool)
+    assert abs(odds["win"] + odds["tie"] + odds["loss"] - 1) < 1e-9
+    assert matchup_odds.current_cycle_odds("alice", None, _league(), _pool)["win"] == 1.0
+
+def test_odds_are_cached_until_the_league_or_a_roster_moves(backend, monkeypatch):
+    setup_league()
+    run(1)
+    monkeypatch.setattr(matchup_odds, "_odds_cache", matchup_odds.OrderedDict())
+    calls = []
+    cycle_odds = matchup_odds.cycle_odds
+    monkeypatch.setattr(matchup_odds, "cycle_odds", lambda *args: calls.append(args[:2]) or cycle_odds(*args))
+
+    first = matchup_odds.current_cycle_odds("alice", "bob", _league(), _pool)
+    assert matchup_odds.current_cycle_odds("alice", "bob", _league(), _pool) is first
+    assert len(calls) == 1
+
+    bob = stats.get_user_stats("bob")
+    bob["drafted_team"]["Lift Tender"] = stats.get_user_record("erin")["drafted_team"]["Lift Tender"]
+    stats.update_user_stats("bob", bob)
+    matchup_odds.current_cycle_odds("alice", "bob", _league(), _pool)
+    assert len(calls) == 2
+
+    run(1)
+    matchup_odds.current_cycle_odds("alice", "bob", _league(), _pool)
+    assert len(calls) == 3
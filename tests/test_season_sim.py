@@ -0,0 +1,27 @@
+import json
+
+import pytest
+
+import core
+import season_sim
+from conftest import ROOT
+
+def _team():
+    with open("farmer_pool.json") as f:
+        pool = json.load(f)
+    return [pool[3], pool[10], pool[17]], sorted(core.REQUIRED_ROLES)
+
+@pytest.mark.parametrize("use_numpy", [False, True] if season_sim.np is not None else [False])
+def test_teammates_share_the_catastrophe(use_numpy, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    farmers, roles = _team()
+    trials = 4000
+
+    def low_days(teams):
+        games = season_sim.season_totals(farmers, 1, seasons=trials, roles=roles, seed=11,
+                                         use_numpy=use_numpy, per_game=True, teams=teams)["games"]
+        return sum(sum(farmer[trial][0] for farmer in games) <= 10 for trial in range(trials)) / trials
+
+    # A type 2 or 3 catastrophe (about one matchday in five) leaves the whole team near nothing
+    assert low_days(["a", "a", "a"]) > 0.17
+    assert low_days(None) < 0.13
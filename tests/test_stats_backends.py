@@ -0,0 +1,96 @@
+import copy
+
+import stats
+import totals
+
+TEAM = {"Lift Tender": {"name": "Ada"}, "Fix Meiser": {"name": "Bo"}, "Speed Runner": {"name": "Cy"}}
+
+def _user(make_entry, matchdays):
+    data = [make_entry(n, {"Ada": n, "Bo": 2 * n, "Cy": 1}) for n in range(1, matchdays + 1)]
+    return {"matchday": matchdays, "drafted_team": copy.deepcopy(TEAM), "data": data}
+
+def test_user_round_trip(backend, make_entry):
+    user = _user(make_entry, 7)
+    stats.update_user_stats("alice", user)
+
+    stored = stats.get_user_stats("alice")
+    assert stored["data"] == user["data"]
+    assert stored["drafted_team"] == TEAM
+    assert stats.get_user_totals("alice") == totals.build(user["data"])
+
+    record = stats.get_user_record("alice")
+    assert "data" not in record
+    assert record["matchday"] == 7
+
+def test_history_reads(backend, make_entry):
+    user = _user(make_entry, 7)
+    stats.update_user_stats("alice", user)
+
+    assert stats.get_recent_matchdays("alice", 2) == user["data"][-2:]
+    assert stats.get_recent_matchdays("alice", 0) == []
+    assert stats.get_cycle_matchdays("alice", 1) == user["data"][3:6]
+    assert stats.get_cycle_matchdays("alice", 2) == user["data"][6:]
+    assert [e["matchday"] for e in stats.get_farmer_matchdays("alice", "Ada")] == list(range(1, 8))
+    assert stats.get_farmer_matchdays("alice", "Nobody") == []
+
+def test_appends_keep_earlier_history(backend, make_entry):
+    user = _user(make_entry, 4)
+    stats.update_user_stats("alice", user)
+    user = copy.deepcopy(user)
+    user["data"].append(make_entry(5, {"Ada": 9}))
+    user["matchday"] = 5
+    stats.update_user_stats("alice", user)
+
+    assert [e["matchday"] for e in stats.get_user_stats("alice")["data"]] == [1, 2, 3, 4, 5]
+    assert stats.get_user_totals("alice")["entries"] == 5
+
+def test_reset_truncates_history(backend, make_entry):
+    stats.update_user_stats("alice", _user(make_entry, 6))
+    stats.update_user_stats("alice", {"matchday": 0, "drafted_team": {}, "data": []})
+
+    assert stats.get_user_stats("alice")["data"] == []
+    assert stats.get_recent_matchdays("alice", 3) == []
+    assert stats.get_user_totals("alice")["entries"] == 0
+    assert stats.get_user_totals("alice")["points"] == 0
+
+    # A new season starts again from its first matchday
+    stats.update_user_stats("alice", _user(make_entry, 2))
+    assert [e["matchday"] for e in stats.get_user_stats("alice")["data"]] == [1, 2]
+
+def test_diverging_history_is_replaced(backend, make_entry):
+    stats.update_user_stats("alice", _user(make_entry, 5))
+    replacement = [make_entry(n, {"Ada": 1}) for n in (10, 11, 12)]
+    stats.update_user_stats("alice", {"matchday": 12, "drafted_team": TEAM, "data": replacement})
+
+    assert stats.get_user_stats("alice")["data"] == replacement
+    assert stats.get_user_totals("alice") == totals.build(replacement)
+
+def test_save_stats_round_trip(backend, make_entry):
+    users = {"alice": _user(make_entry, 3), "bob": _user(make_entry, 1)}
+    stats.save_stats({"users": users})
+    assert {u: s["data"] for u, s in stats.load_stats()["users"].items()} == {u: s["data"] for u, s in users.items()}
+
+    # Users missing from the saved document are removed
+    stats.save_stats({"users": {"bob": users["bob"]}})
+    assert set(stats.load_stats()["users"]) == {"bob"}
+    assert set(stats.load_user_records()) == {"bob"}
+
+def test_update_user_keeps_a_matchday_committed_meanwhile(backend, make_entry):
+    stats.update_user_stats("alice", _user(make_entry, 2))
+    page_copy = stats.get_user_record("alice")
+    stats.update_user_stats("alice", _user(make_entry, 3))
+
+    with stats.update_user("alice") as user_stats:
+        user_stats["team_chant"] = "Go " + page_copy["drafted_team"]["Lift Tender"]["name"]
+
+    assert [e["matchday"] for e in stats.get_user_stats("alice")["data"]] == [1, 2, 3]
+    assert stats.get_user_record("alice")["team_chant"] == "Go Ada"
+    assert stats.get_user_totals("alice")["entries"] == 3
+
+def test_reset_user(backend, make_entry):
+    stats.update_user_stats("alice", {**_user(make_entry, 4), "team_name": "Aces"})
+    stats.reset_user("alice")
+
+    assert stats.get_user_stats("alice")["data"] == []
+    assert "team_name" not in stats.get_user_record("alice")
+    assert stats.get_user_totals("alice")["entries"] == 0
@@ -0,0 +1,39 @@
+import os
+import threading
+
+import pytest
+
+import storage
+
+def test_transactions_do_not_lose_updates(tmp_path):
+    path = str(tmp_path / "counter.json")
+
+    def bump():
+        for _ in range(25):
+            with storage.transaction(path, {"n": 0}) as data:
+                data["n"] += 1
+    threads = [threading.Thread(target=bump) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert storage.read_json(path) == {"n": 200}
+
+def test_failed_transaction_writes_nothing(tmp_path):
+    path = str(tmp_path / "doc.json")
+    storage.write_json(path, {"kept": True})
+    with pytest.raises(RuntimeError):
+        with storage.transaction(path, {}) as data:
+            data["kept"] = False
+            raise RuntimeError("abort")
+    assert storage.read_json(path) == {"kept": True}
+
+def test_writes_leave_no_temp_files(tmp_path):
+    path = str(tmp_path / "doc.json")
+    storage.write_json(path, {"a": 1})
+    with storage.locked_all([path, str(tmp_path / "other.json")]):
+        # Re-entrant: writing under the held lock does not deadlock
+        storage.write_json(path, {"a": 2})
+    assert storage.read_json(path) == {"a": 2}
+    assert [name for name in os.listdir(tmp_path) if name.startswith(".tmp_")] == []
@@ -0,0 +1,8 @@
+import tasks
+
+def test_distributions_outside_the_table_are_not_kept():
+    size = len(tasks.TASK_DISTRIBUTIONS)
+    distribution = tasks.task_distribution("Lift Tender", 1000, 5, 5)
+    assert abs(sum(distribution["pmf"].values()) - 1) < 1e-9
+    assert len(tasks.TASK_DISTRIBUTIONS) == size
+    assert tasks.task_distribution("Lift Tender", 5, 5, 5) is tasks.TASK_DISTRIBUTIONS[("Lift Tender", 5, 5, 5)]
@@ -0,0 +1,68 @@
+import copy
+
+import pytest
+
+import stats
+import totals
+
+def _history(make_entry, matchdays):
+    return [make_entry(n, {"Ada": n, "Bo": 3}, jobs={"Bo": "Fix Meiser"}) for n in range(1, matchdays + 1)]
+
+def test_refresh_advances_only_new_entries(make_entry):
+    user = {"data": _history(make_entry, 4)}
+    totals.refresh(user)
+    user["data"] += _history(make_entry, 6)[4:]
+    assert totals.refresh(user) == totals.build(copy.deepcopy(user["data"]))
+    assert user["totals"]["entries"] == 6
+    assert user["totals"]["points"] == sum(range(1, 7)) + 3 * 6
+
+def test_refresh_rebuilds_after_a_reset(make_entry):
+    user = {"data": _history(make_entry, 5)}
+    totals.refresh(user)
+    user["data"] = [make_entry(1, {"Cy": 4})]
+    assert totals.refresh(user)["points"] == 4
+    assert set(user["totals"]["farmers"]) == {"Cy"}
+
+def test_build_leaves_the_entries_unchanged(make_entry):
+    data = _history(make_entry, 3)
+    farmer = totals.build(data)["farmers"]["Ada"]
+    assert data == _history(make_entry, 3)
+    assert farmer["recent"] == [1, 2, 3]
+    assert farmer["roles"] == {"Lift Tender": {"points": 6, "matchdays": 3}}
+
+def test_of_does_not_store(make_entry):
+    user = {"data": _history(make_entry, 3)}
+    assert totals.of(user)["entries"] == 3
+    assert "totals" not in user
+    assert totals.of({"totals": None})["entries"] == 0
+
+def test_cycle_ledger(make_entry):
+    user = {"data": _history(make_entry, 7)}
+    assert totals.cycle_ledger(user, 0) == {"points": 1 + 2 + 3 + 9, "matchdays": 3, "farmers": {"Ada": 6, "Bo": 9}}
+    assert totals.cycle_ledger(user, 2) == {"points": 7 + 3, "matchdays": 1, "farmers": {"Ada": 7, "Bo": 3}}
+    assert totals.cycle_ledger(user, 3) == totals.empty_cycle()
+    assert totals.cycle_points(user, 1) == 4 + 5 + 6 + 9
+
+def test_stored_ledger_matches_the_history(backend, make_entry):
+    data = _history(make_entry, 8)
+    stats.update_user_stats("alice", {"matchday": 8, "drafted_team": {}, "data": data})
+    for cycle in range(3):
+        entries = stats.get_cycle_matchdays("alice", cycle)
+        ledger = stats.get_cycle_ledger("alice", cycle)
+        assert ledger["matchdays"] == len(entries)
+        assert ledger["points"] == sum(f["points_after_catastrophe"] for e in entries for f in e["farmers"])
+
+def test_tail_refresh_matches_a_full_build(make_entry):
+    full = _history(make_entry, 6)
+    stored = totals.build(copy.deepcopy(full[:5]))
+    user = {"totals": stored, "data": copy.deepcopy(full[4:]), "history_start": 4}
+
+    assert totals.of(user) == totals.build(copy.deepcopy(full))
+    assert user["totals"]["entries"] == 5
+    assert totals.refresh(user) == totals.build(copy.deepcopy(full))
+
+def test_tail_the_totals_do_not_reach_is_refused(make_entry):
+    full = _history(make_entry, 6)
+    user = {"totals": totals.build(full[:2]), "data": full[4:], "history_start": 4}
+    with pytest.raises(ValueError):
+        totals.refresh(user)
@@ -0,0 +1,25 @@
+import stats
+from test_matchday import save_leagues
+from trading import TradingManager
+
+def _team(*names):
+    return {role: {"name": name} for role, name in zip(("Fix Meiser", "Lift Tender"), names)}
+
+def test_accepted_trade_swaps_and_keeps_history(backend, make_entry):
+    save_leagues({"ABC": {"code": "ABC", "players": ["alice", "bob"]}})
+    stats.update_user_stats("alice", {"matchday": 1, "drafted_team": _team("Ada", "Bo"), "data": [make_entry(1, {"Ada": 2})]})
+    stats.update_user_stats("bob", {"matchday": 0, "drafted_team": _team("Cy", "Di"), "data": []})
+    manager = TradingManager()
+    assert manager.propose_trade("alice", "bob", "Bo", "Cy")
+    trade_id = manager.load_trades()[0]["id"]
+
+    # A matchday lands between the proposal and its acceptance
+    user = stats.get_user_stats("alice")
+    stats.update_user_stats("alice", {**user, "matchday": 2, "data": user["data"] + [make_entry(2, {"Ada": 3})]})
+    assert manager.accept_trade(trade_id, "bob")
+
+    assert stats.get_user_record("alice")["drafted_team"] == {"Fix Meiser": {"name": "Ada"}, "Lift Tender": {"name": "Cy"}}
+    assert stats.get_user_record("bob")["drafted_team"] == {"Fix Meiser": {"name": "Bo"}, "Lift Tender": {"name": "Di"}}
+    assert [e["matchday"] for e in stats.get_user_stats("alice")["data"]] == [1, 2]
+    assert manager.load_trades()[0]["status"] == "accepted"
+    assert not manager.accept_trade(trade_id, "bob")
@@ -0,0 +1,175 @@
+# Running totals of a user's matchday history, stored in the user record as "totals".
+# They are advanced when a matchday is applied and brought up to date whenever the
+# user is written, so season points, crops, injuries, per-farmer totals and the
+# ledger of three-matchday cycles (points and per-farmer breakdown of each
+# head-to-head matchup) are read without walking the history. Per-farmer totals
+# also keep the farmer's last RECENT_MATCHDAYS scores and a split by role. History
+# only grows; when it is reset or rewritten the totals are rebuilt from it.
+# Usage: python totals.py [--check]
+import argparse
+import copy
+import os
+import sys
+import time
+
+# Bumped when the layout changes, so older stored totals are rebuilt
+VERSION = 4
+RECENT_MATCHDAYS = int(os.environ.get("FARMINGTON_RECENT_MATCHDAYS", 5))
+
+def empty():
+    return {
+        "version": VERSION,
+        "entries": 0,
+        "last_matchday": None,
+        "points": 0,
+        "crop_points": 0,
+        "injuries": 0,
+        "injury_points_lost": 0,
+        "farmers": {},
+        "cycles": []
+    }
+
+def add_entry(totals, entry):
+    """Advance totals by the next matchday entry of the history; the entry is not changed"""
+    cycle = totals["entries"] // 3
+    while len(totals["cycles"]) <= cycle:
+        totals["cycles"].append(empty_cycle())
+    ledger = totals["cycles"][cycle]
+    for farmer in entry.get("farmers", []):
+        name = farmer.get("name", "")
+        farmer_points = farmer.get("points_after_catastrophe", 0)
+        totals["points"] += farmer_points
+        totals["crop_points"] += farmer.get("crop_points", 0)
+        totals["injuries"] += farmer.get("injuries_this_season", 0)
+        totals["injury_points_lost"] += farmer.get("daily_injury_loss", 0)
+
+        record = totals["farmers"].setdefault(name, {
+            "job": None, "points": 0, "crop_points": 0, "matchdays": 0, "best": 0, "injuries": 0,
+            "injury_points": 0, "recent": [], "roles": {}
+        })
+        record["job"] = farmer.get("job", record["job"])
+        role = record["roles"].setdefault(record["job"], {"points": 0, "matchdays": 0})
+        role["points"] += farmer_points
+        role["matchdays"] += 1
+        record["recent"] = (record["recent"] + [farmer_points])[-RECENT_MATCHDAYS:]
+        record["points"] += farmer_points
+        record["crop_points"] += farmer.get("crop_points", 0)
+        record["matchdays"] += 1
+        record["best"] = max(record["best"], farmer_points)
+        record["injuries"] += farmer.get("injuries_this_season", 0)
+        record["injury_points"] += farmer.get("injury_points_lost", 0)
+
+        ledger["points"] += farmer_points
+        ledger["farmers"][name] = ledger["farmers"].get(name, 0) + farmer_points
+    ledger["matchdays"] += 1
+    totals["entries"] += 1
+    totals["last_matchday"] = entry.get("matchday")
+    return totals
+
+def empty_cycle():
+    return {"points": 0, "matchdays": 0, "farmers": {}}
+
+def build(entries):
+    totals = empty()
+    for entry in entries:
+        add_entry(totals, entry)
+    return totals
+
+def _covers(totals, entries, start=0):
+    """True when totals were built from a prefix of the history, of which entries
+    hold the positions from start on"""
+    count = totals.get("entries", 0) if totals and totals.get("version") == VERSION else -1
+    if count < start or count > start + len(entries):
+        return False
+    if count == start:
+        return start == 0
+    return entries[count - start - 1].get("matchday") == totals.get("last_matchday")
+
+def refresh(user_stats):
+    """Bring the user's stored totals up to date with their history and return them.
+
+    Only entries added since the totals were last advanced are read. A record
+    without its history keeps the totals it has, and a record holding only the
+    tail of its history (from position "history_start") must have totals that
+    reach into that tail.
+    """
+    entries = user_stats.get("data")
+    if entries is None:
+        return user_stats.get("totals")
+    start = user_stats.get("history_start", 0)
+    totals = user_stats.get("totals")
+    if not _covers(totals, entries, start):
+        if start:
+            raise ValueError(f"Totals do not reach the history loaded from position {start}")
+        totals = empty()
+    for entry in entries[totals["entries"] - start:]:
+        add_entry(totals, entry)
+    user_stats["totals"] = totals
+    return totals
+
+def of(user_stats):
+    """The user's totals; built from the history without storing them when missing or stale"""
+    totals = user_stats.get("totals")
+    entries = user_stats.get("data")
+    if entries is None:
+        return totals or empty()
+    start = user_stats.get("history_start", 0)
+    if _covers(totals, entries, start) and totals["entries"] == start + len(entries):
+        return totals
+    if start:
+        return refresh(copy.deepcopy(user_stats))
+    return build(entries)
+
+def total_points(user_stats):
+    return of(user_stats)["points"]
+
+def cycle_ledger(user_stats, cycle):
+    """{"points", "matchdays", "farmers": {name: points}} for a three-matchday cycle"""
+    return ledger_entry(of(user_stats), cycle)
+
+def ledger_entry(totals, cycle):
+    """The ledger record of a cycle from a totals document"""
+    cycles = totals.get("cycles", [])
+    return cycles[cycle] if 0 <= cycle < len(cycles) else empty_cycle()
+
+def cycle_points(user_stats, cycle):
+    return cycle_ledger(user_stats, cycle)["points"]
+
+def farmer_totals(user_stats, farmer_name):
+    return of(user_stats)["farmers"].get(farmer_name)
+
+def main():
+    from stats import load_stats, update_user_stats
+
+    parser = argparse.ArgumentParser(description="Rebuild every user's running totals from their matchday history")
+    parser.add_argument("--check", action="store_true", help="only report users whose stored totals are wrong")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    users = load_stats().get("users", {})
+    rows = []
+    for username, user_stats in users.items():
+        rebuilt = build(user_stats.get("data", []))
+        rows.append((username, user_stats.get("totals"), rebuilt))
+        if not args.check and user_stats.get("totals") != rebuilt:
+            update_user_stats(username, {**user_stats, "totals": rebuilt})
+
+    print(f"{'user':<24}{'matchdays':>10}{'points':>10}{'stored':>10}")
+    wrong = []
+    for username, stored, rebuilt in rows:
+        stored_points = stored["points"] if stored else "-"
+        print(f"{username:<24}{rebuilt['entries']:>10}{rebuilt['points']:>10}{stored_points:>10}")
+        if stored != rebuilt:
+            wrong.append(username)
+    print(f"{len(rows)} user(s) in {time.perf_counter() - start:.3f}s")
+
+    if args.check:
+        if wrong:
+            print(f"\n❌ {len(wrong)} user(s) have missing or stale totals: {', '.join(wrong)}")
+            sys.exit(1)
+        print("\n✅ Every user's totals match their history")
+        return
+    print(f"\n✅ Rebuilt totals for {len(wrong)} user(s)" if wrong else "\n✅ Every user's totals were already up to date")
+
+if __name__ == "__main__":
+    main()
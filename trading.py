@@ -1,8 +1,11 @@
 import json
 import os
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from stats import get_user_stats, update_user_stats
+import db
+import storage
+from stats import get_user_record, update_user, load_stories, save_stories
 
 TRADES_FILE = "trades.json"
 
@@ -12,6 +15,9 @@ class TradingManager:
     
     def get_user_league(self, username):
         """Get the league that a user belongs to"""
+        if db.enabled():
+            league_code = db.get_user_league_code(username)
+            return db.load_leagues().get(league_code) if league_code else None
         try:
             with open("leagues.json", "r") as f:
                 leagues = json.load(f)
@@ -23,19 +29,32 @@ class TradingManager:
         return None
     
     def load_trades(self):
+        if db.enabled():
+            return db.load_trades()
         if not os.path.exists(self.trades_file):
             return []
         with open(self.trades_file, "r") as f:
             return json.load(f)
     
     def save_trades(self, trades):
-        with open(self.trades_file, "w") as f:
-            json.dump(trades, f, indent=4)
+        if db.enabled():
+            return db.save_trades(trades)
+        storage.write_json(self.trades_file, trades)
+    
+    @contextmanager
+    def update_trades(self):
+        """Load, modify and save the trades under one lock; yields the trades list"""
+        if db.enabled():
+            with db.transaction():
+                trades = db.load_trades()
+                yield trades
+                db.save_trades(trades)
+        else:
+            with storage.transaction(self.trades_file, []) as trades:
+                yield trades
     
     def propose_trade(self, from_user, to_user, offered_farmer_name, requested_farmer_name, message=""):
         """Create a new trade proposal based on specific farmer names"""
-        trades = self.load_trades()
-        
         # Check if both users are in the same league
         from_user_league = self.get_user_league(from_user)
         to_user_league = self.get_user_league(to_user)
@@ -47,8 +66,8 @@ class TradingManager:
             return False  # Users are in different leagues
         
         # Get farmer details
-        from_user_data = get_user_stats(from_user)
-        to_user_data = get_user_stats(to_user)
+        from_user_data = get_user_record(from_user)
+        to_user_data = get_user_record(to_user)
         
         from_user_team = from_user_data.get("drafted_team", {})
         to_user_team = to_user_data.get("drafted_team", {})
@@ -90,81 +109,74 @@ class TradingManager:
             "responded_at": None
         }
         
-        trades.append(trade)
-        self.save_trades(trades)
+        with self.update_trades() as trades:
+            trades.append(trade)
         return True
     
     def accept_trade(self, trade_id, accepting_user):
         """Accept a trade proposal and execute the swap"""
-        trades = self.load_trades()
-        
-        trade = None
-        for t in trades:
-            if t["id"] == trade_id and t["to_user"] == accepting_user and t["status"] == "pending":
-                trade = t
-                break
-        
-        if not trade:
-            return False
-        
-        # Execute the trade
-        from_user_data = get_user_stats(trade["from_user"])
-        to_user_data = get_user_stats(trade["to_user"])
-        
-        # Get current teams
-        from_user_team = from_user_data.get("drafted_team", {})
-        to_user_team = to_user_data.get("drafted_team", {})
-        
-        # Validate that the exact farmers mentioned in the trade are still available
-        # Find the offered farmer by name in from_user's current team
-        offered_farmer = None
-        offered_role = None
-        for role, farmer_data in from_user_team.items():
-            if farmer_data and farmer_data.get("name") == trade["offered_farmer_name"]:
-                offered_farmer = farmer_data
-                offered_role = role
-                break
-        
-        # Find the requested farmer by name in to_user's current team
-        requested_farmer = None
-        requested_role = None
-        for role, farmer_data in to_user_team.items():
-            if farmer_data and farmer_data.get("name") == trade["requested_farmer_name"]:
-                requested_farmer = farmer_data
-                requested_role = role
-                break
-        
-        # If either farmer is no longer available or has been changed, reject the trade
-        if not offered_farmer or not requested_farmer:
-            return False
-        
-        # Preserve injury data during the trade
-        self._preserve_injury_data(trade["offered_farmer_name"], trade["requested_farmer_name"])
-        
-        # Perform the swap using the current roles where these farmers are located
-        from_user_team[offered_role] = requested_farmer
-        to_user_team[requested_role] = offered_farmer
-        
-        # Update user stats
-        update_user_stats(trade["from_user"], from_user_data)
-        update_user_stats(trade["to_user"], to_user_data)
-        
-        # Mark trade as completed
-        trade["status"] = "accepted"
-        trade["responded_at"] = datetime.now().isoformat()
-        
-        self.save_trades(trades)
-        return True
+        with self.update_trades() as trades:
+            trade = None
+            for t in trades:
+                if t["id"] == trade_id and t["to_user"] == accepting_user and t["status"] == "pending":
+                    trade = t
+                    break
+        
+            if not trade:
+                return False
+        
+            # Execute the trade
+            from_user_data = get_user_record(trade["from_user"])
+            to_user_data = get_user_record(trade["to_user"])
+        
+            # Get current teams
+            from_user_team = from_user_data.get("drafted_team", {})
+            to_user_team = to_user_data.get("drafted_team", {})
+        
+            # Validate that the exact farmers mentioned in the trade are still available
+            # Find the offered farmer by name in from_user's current team
+            offered_farmer = None
+            offered_role = None
+            for role, farmer_data in from_user_team.items():
+                if farmer_data and farmer_data.get("name") == trade["offered_farmer_name"]:
+                    offered_farmer = farmer_data
+                    offered_role = role
+                    break
+        
+            # Find the requested farmer by name in to_user's current team
+            requested_farmer = None
+            requested_role = None
+            for role, farmer_data in to_user_team.items():
+                if farmer_data and farmer_data.get("name") == trade["requested_farmer_name"]:
+                    requested_farmer = farmer_data
+                    requested_role = role
+                    break
+        
+            # If either farmer is no longer available or has been changed, reject the trade
+            if not offered_farmer or not requested_farmer:
+                return False
+        
+            # Preserve injury data during the trade
+            self._preserve_injury_data(trade["offered_farmer_name"], trade["requested_farmer_name"])
+        
+            # Perform the swap using the current roles where these farmers are located;
+            # each side is written under its lock so a matchday committed meanwhile is kept
+            with update_user(trade["from_user"]) as from_user_data:
+                from_user_data.setdefault("drafted_team", {})[offered_role] = requested_farmer
+            with update_user(trade["to_user"]) as to_user_data:
+                to_user_data.setdefault("drafted_team", {})[requested_role] = offered_farmer
+        
+            # Mark trade as completed
+            trade["status"] = "accepted"
+            trade["responded_at"] = datetime.now().isoformat()
+            return True
     
     def _preserve_injury_data(self, farmer1_name, farmer2_name):
         """Preserve injury data when farmers are traded"""
         try:
             # Load story data to get current miss_days
-            story_file = "story.json"
-            if os.path.exists(story_file):
-                with open(story_file, "r") as f:
-                    story_data = json.load(f)
-                
+            story_data = load_stories()
+            if story_data:
                 # Collect injury data for both farmers across all users
                 farmer1_miss_days = 0
                 farmer2_miss_days = 0
@@ -189,8 +201,7 @@ class TradingManager:
                     user_story["miss_days"] = miss_days
                 
                 # Save updated story data
-                with open(story_file, "w") as f:
-                    json.dump(story_data, f, indent=4)
+                save_stories(story_data)
                     
         except Exception as e:
             print(f"Error preserving injury data during trade: {e}")
@@ -198,15 +209,12 @@ class TradingManager:
     
     def reject_trade(self, trade_id):
         """Reject a trade proposal"""
-        trades = self.load_trades()
-        
-        for trade in trades:
-            if trade["id"] == trade_id and trade["status"] == "pending":
-                trade["status"] = "rejected"
-                trade["responded_at"] = datetime.now().isoformat()
-                break
-        
-        self.save_trades(trades)
+        with self.update_trades() as trades:
+            for trade in trades:
+                if trade["id"] == trade_id and trade["status"] == "pending":
+                    trade["status"] = "rejected"
+                    trade["responded_at"] = datetime.now().isoformat()
+                    break
         return True
     
     def get_incoming_trades(self, username):